@@ -14,6 +14,7 @@ from pathlib import Path
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 import platform
 
 IN_DOCKER = os.environ.get('RUNNING_IN_DOCKER', False)
@@ -190,6 +191,11 @@ CORS_ALLOWED_ORIGINS = [origin.strip() for origin in cors_origins_raw.split(',')
 # CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOW_CREDENTIALS = True
+
+# Range requests are used by the FlatGeobuf client to read only part of a layer file
+CORS_ALLOW_HEADERS = (*default_headers, 'range')
+CORS_EXPOSE_HEADERS = ['Content-Range', 'Accept-Ranges', 'Content-Length', 'ETag']
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -225,6 +231,17 @@ FRONTEND_BASE_URL = os.getenv('FRONTEND_BASE_URL')
 
 TEMP_UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'temp_uploads')
 
+# Cached per-layer export files (FlatGeobuf). Kept outside MEDIA_ROOT so exports of
+# private layers are only reachable through the permission-checked layer views.
+LAYER_EXPORT_DIR = os.getenv('LAYER_EXPORT_DIR', os.path.join(BASE_DIR, 'layer_exports'))
+
+# Cached FCC location vector tiles, per state and data version
+FCC_TILE_DIR = os.path.join(MEDIA_ROOT, 'fcc_tiles')
+
+# In-memory cache of FCC bounding-box results, in bytes. It is held separately
+# by every worker process, so the total is this times the number of workers.
+FCC_BBOX_CACHE_BYTES = int(os.getenv('FCC_BBOX_CACHE_BYTES', 64 * 1024 * 1024))
+
 # Ensure directory exists
 os.makedirs(TEMP_UPLOAD_DIR, exist_ok=True)
 
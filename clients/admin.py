@@ -1,6 +1,6 @@
 # clients/admin.py
 from django.contrib import admin
-from .models import Client, ClientProject
+from .models import Client, ClientProject, ClientDailyActivity
 
 
 @admin.register(Client)
@@ -34,4 +34,15 @@ class ClientProjectAdmin(admin.ModelAdmin):
         (None, {'fields': ('client', 'project', 'is_active')}),
         ('Access', {'fields': ('unique_link', 'expires_at')}),
         ('Important dates', {'fields': ('created_at', 'last_accessed')}),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(ClientDailyActivity)
+class ClientDailyActivityAdmin(admin.ModelAdmin):
+    """Admin configuration for ClientDailyActivity model."""
+
+    list_display = ('client', 'date', 'active_users', 'project_accesses', 'layer_data_requests', 'layer_data_bytes')
+    list_filter = ('date',)
+    search_fields = ('client__name',)
+    ordering = ('client__name', '-date')
+    readonly_fields = ('updated_at',)
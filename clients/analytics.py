@@ -0,0 +1,163 @@
+# clients/analytics.py
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import AuditLog
+from .models import Client, ClientAnalytics, ClientDailyActivity, AnalyticsCheckpoint
+
+User = get_user_model()
+
+CHECKPOINT_NAME = 'client_analytics'
+RECENT_ACTIVITY_LIMIT = 50
+
+# Audit rows from concurrent transactions can commit after newer rows are visible;
+# rows this recent are left for a later run so the high-water mark never skips them
+LATE_COMMIT_WINDOW = timedelta(minutes=2)
+
+# Audit actions that count as a client opening one of its projects
+PROJECT_ACCESS_ACTIONS = {
+    'Project accessed',
+    'Project accessed via shared link',
+    'Client accessed project',
+}
+LAYER_DATA_ACTION = 'Layer data accessed'
+
+
+def _client_for_log(log, user_clients):
+    """Resolve the client an audit log row belongs to, if any."""
+    details = log['action_details'] or {}
+    client_id = details.get('client_id') if isinstance(details, dict) else None
+    if client_id:
+        return client_id
+    return user_clients.get(log['user_id'])
+
+
+def _empty_day():
+    return {
+        'user_ids': set(),
+        'project_accesses': 0,
+        'layer_data_requests': 0,
+        'layer_data_bytes': 0,
+    }
+
+
+def _roll_up(logs, user_clients):
+    """Aggregate a batch of audit log rows into per-client daily buckets."""
+    days = defaultdict(_empty_day)
+    recent = defaultdict(list)
+
+    for log in logs:
+        client_id = _client_for_log(log, user_clients)
+        if not client_id:
+            continue
+
+        bucket = days[(client_id, timezone.localdate(log['occurred_at']))]
+        details = log['action_details'] if isinstance(log['action_details'], dict) else {}
+
+        # Only the client's own users count as active users or recent activity
+        if user_clients.get(log['user_id']) == client_id:
+            bucket['user_ids'].add(log['user_id'])
+            recent[client_id].append(log['id'])
+
+        if log['action'] in PROJECT_ACCESS_ACTIONS:
+            bucket['project_accesses'] += 1
+        elif log['action'] == LAYER_DATA_ACTION:
+            bucket['layer_data_requests'] += 1
+            bucket['layer_data_bytes'] += int(details.get('bytes_served') or 0)
+
+    return days, recent
+
+
+def _apply(days, recent, known_clients):
+    """Merge rolled-up buckets into the analytics tables."""
+    now = timezone.now()
+    totals = defaultdict(_empty_day)
+
+    for (client_id, day), bucket in days.items():
+        if client_id not in known_clients:
+            continue
+
+        activity, _ = ClientDailyActivity.objects.select_for_update().get_or_create(
+            client_id=client_id, date=day
+        )
+        user_ids = set(activity.active_user_ids) | bucket['user_ids']
+        activity.active_user_ids = sorted(user_ids)
+        activity.active_users = len(user_ids)
+        activity.project_accesses += bucket['project_accesses']
+        activity.layer_data_requests += bucket['layer_data_requests']
+        activity.layer_data_bytes += bucket['layer_data_bytes']
+        activity.save()
+
+        for key in ('project_accesses', 'layer_data_requests', 'layer_data_bytes'):
+            totals[client_id][key] += bucket[key]
+
+    for client_id in set(totals) | set(recent):
+        if client_id not in known_clients:
+            continue
+
+        analytics, _ = ClientAnalytics.objects.select_for_update().get_or_create(client_id=client_id)
+        analytics.project_accesses += totals[client_id]['project_accesses']
+        analytics.layer_data_requests += totals[client_id]['layer_data_requests']
+        analytics.layer_data_bytes += totals[client_id]['layer_data_bytes']
+        ids = sorted(set(recent[client_id]) | set(analytics.recent_activity_ids), reverse=True)
+        analytics.recent_activity_ids = ids[:RECENT_ACTIVITY_LIMIT]
+        analytics.refreshed_at = now
+        analytics.save()
+
+
+def _audit_log_batches(queryset, batch_size, after):
+    """Yield lists of audit log rows from ``queryset`` in (occurred_at, id) order, past ``after``."""
+    last_occurred_at, last_id = after
+    while True:
+        page = queryset
+        if last_occurred_at is not None:
+            page = page.filter(
+                Q(occurred_at__gt=last_occurred_at) | Q(occurred_at=last_occurred_at, id__gt=last_id)
+            )
+        logs = list(
+            page.order_by('occurred_at', 'id')
+            .values('id', 'user_id', 'action', 'action_details', 'occurred_at')[:batch_size]
+        )
+        if not logs:
+            return
+        yield logs
+        last_occurred_at, last_id = logs[-1]['occurred_at'], logs[-1]['id']
+
+
+def refresh_client_analytics(batch_size=5000):
+    """
+    Roll audit log rows written since the last run into the client analytics tables.
+
+    The checkpoint is a (last_occurred_at, last_audit_log_id) high-water mark and
+    rows are read in that order, so each row is rolled up exactly once. Rows newer
+    than LATE_COMMIT_WINDOW are held back until a later run, giving concurrent
+    transactions time to commit rows that sort below ones already visible.
+    Returns the number of audit log rows processed.
+    """
+    checkpoint, _ = AnalyticsCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+    user_clients = dict(
+        User.objects.filter(client__isnull=False).values_list('id', 'client_id')
+    )
+    known_clients = set(Client.objects.values_list('id', flat=True))
+    settled = AuditLog.objects.filter(occurred_at__lt=timezone.now() - LATE_COMMIT_WINDOW)
+    after = (checkpoint.last_occurred_at, checkpoint.last_audit_log_id)
+    processed = 0
+
+    for logs in _audit_log_batches(settled, batch_size, after):
+        days, recent = _roll_up(logs, user_clients)
+
+        with transaction.atomic():
+            _apply(days, recent, known_clients)
+            checkpoint.last_occurred_at = logs[-1]['occurred_at']
+            checkpoint.last_audit_log_id = logs[-1]['id']
+            checkpoint.refreshed_at = timezone.now()
+            checkpoint.save(update_fields=['last_occurred_at', 'last_audit_log_id', 'refreshed_at'])
+
+        processed += len(logs)
+
+    return processed
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from clients.analytics import refresh_client_analytics
+
+
+class Command(BaseCommand):
+    help = (
+        'Rolls new audit log entries into the per-client analytics tables. '
+        'Intended to run periodically (e.g. every few minutes from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of audit log rows to process per transaction'
+        )
+
+    def handle(self, *args, **options):
+        processed = refresh_client_analytics(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} audit log entries'))
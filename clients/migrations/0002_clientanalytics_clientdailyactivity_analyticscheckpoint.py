@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_audit_log_id', models.BigIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'analytics_checkpoints_wiroi_online',
+            },
+        ),
+        migrations.CreateModel(
+            name='ClientAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project_accesses', models.BigIntegerField(default=0)),
+                ('layer_data_requests', models.BigIntegerField(default=0)),
+                ('layer_data_bytes', models.BigIntegerField(default=0)),
+                ('recent_activity_ids', models.JSONField(blank=True, default=list)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analytics', to='clients.client')),
+            ],
+            options={
+                'verbose_name': 'Client Analytics',
+                'verbose_name_plural': 'Client Analytics',
+                'db_table': 'client_analytics_wiroi_online',
+            },
+        ),
+        migrations.CreateModel(
+            name='ClientDailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('active_user_ids', models.JSONField(blank=True, default=list)),
+                ('active_users', models.IntegerField(default=0)),
+                ('project_accesses', models.IntegerField(default=0)),
+                ('layer_data_requests', models.IntegerField(default=0)),
+                ('layer_data_bytes', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to='clients.client')),
+            ],
+            options={
+                'verbose_name': 'Client Daily Activity',
+                'verbose_name_plural': 'Client Daily Activity',
+                'db_table': 'client_daily_activity_wiroi_online',
+                'ordering': ['client', '-date'],
+                'unique_together': {('client', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_clientanalytics_clientdailyactivity_analyticscheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyticscheckpoint',
+            name='recent_audit_log_ids',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
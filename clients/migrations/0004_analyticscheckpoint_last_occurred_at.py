@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+def set_last_occurred_at(apps, schema_editor):
+    """Start existing checkpoints from the timestamp of the last row they rolled up."""
+    AnalyticsCheckpoint = apps.get_model('clients', 'AnalyticsCheckpoint')
+    AuditLog = apps.get_model('users', 'AuditLog')
+    for checkpoint in AnalyticsCheckpoint.objects.filter(last_audit_log_id__gt=0):
+        checkpoint.last_occurred_at = (
+            AuditLog.objects.filter(id=checkpoint.last_audit_log_id)
+            .values_list('occurred_at', flat=True).first()
+        )
+        checkpoint.save(update_fields=['last_occurred_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_analyticscheckpoint_recent_audit_log_ids'),
+        ('users', '0003_auditlog_occurred_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='analyticscheckpoint',
+            name='recent_audit_log_ids',
+        ),
+        migrations.AddField(
+            model_name='analyticscheckpoint',
+            name='last_occurred_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_last_occurred_at, migrations.RunPython.noop),
+    ]
@@ -60,4 +60,62 @@ class ClientProject(models.Model):
             hash_input = f"{self.client_id}-{self.project_id}-{unique_id}"
             self.unique_link = hashlib.sha256(hash_input.encode()).hexdigest()[:16]
 
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class ClientDailyActivity(models.Model):
+    """Per-client daily usage rolled up from the audit log."""
+
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='daily_activity')
+    date = models.DateField()
+    active_user_ids = models.JSONField(default=list, blank=True)
+    active_users = models.IntegerField(default=0)
+    project_accesses = models.IntegerField(default=0)
+    layer_data_requests = models.IntegerField(default=0)
+    layer_data_bytes = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'client_daily_activity_wiroi_online'
+        verbose_name = 'Client Daily Activity'
+        verbose_name_plural = 'Client Daily Activity'
+        ordering = ['client', '-date']
+        unique_together = ('client', 'date')
+
+    def __str__(self):
+        return f"{self.client.name} - {self.date}"
+
+
+class ClientAnalytics(models.Model):
+    """Running usage totals for a client, maintained by refresh_client_analytics."""
+
+    client = models.OneToOneField(Client, on_delete=models.CASCADE, related_name='analytics')
+    project_accesses = models.BigIntegerField(default=0)
+    layer_data_requests = models.BigIntegerField(default=0)
+    layer_data_bytes = models.BigIntegerField(default=0)
+    recent_activity_ids = models.JSONField(default=list, blank=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'client_analytics_wiroi_online'
+        verbose_name = 'Client Analytics'
+        verbose_name_plural = 'Client Analytics'
+
+    def __str__(self):
+        return f"{self.client.name} analytics"
+
+
+class AnalyticsCheckpoint(models.Model):
+    """High-water mark of audit log rows already rolled up into analytics."""
+
+    name = models.CharField(max_length=100, unique=True)
+    # (last_occurred_at, last_audit_log_id) of the last row rolled up, in that sort order
+    last_occurred_at = models.DateTimeField(null=True, blank=True)
+    last_audit_log_id = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'analytics_checkpoints_wiroi_online'
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_audit_log_id}"
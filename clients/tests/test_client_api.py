@@ -2,10 +2,13 @@
 import pytest
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
-from clients.models import Client, ClientProject
+from clients.analytics import LATE_COMMIT_WINDOW, refresh_client_analytics
+from clients.models import AnalyticsCheckpoint, Client, ClientAnalytics, ClientProject
 from projects.models import Project
+from users.models import AuditLog
 
 User = get_user_model()
 
@@ -165,4 +168,64 @@ class TestClientAPI:
         # Check if the test project is in the paginated results
         assert 'results' in response.data
         project_ids = [project['id'] for project in response.data['results']]
-        assert test_project.id in project_ids
\ No newline at end of file
+        assert test_project.id in project_ids
+
+    def test_client_analytics_from_rolled_up_audit_log(self, api_client, admin_user, test_client, client_user):
+        """Test analytics are served from the tables filled by refresh_client_analytics."""
+        AuditLog.objects.create(user=client_user, action='Project accessed', action_details={'project_id': 1})
+        AuditLog.objects.create(
+            user=client_user,
+            action='Layer data accessed',
+            action_details={'layer_id': 1, 'bytes_served': 2048}
+        )
+        AuditLog.objects.update(occurred_at=timezone.now() - LATE_COMMIT_WINDOW * 2)
+
+        assert refresh_client_analytics() == 2
+
+        api_client.force_authenticate(user=admin_user)
+        url = reverse('client-analytics', args=[test_client.id])
+        response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        usage = response.data['usage']
+        assert usage['project_accesses'] == 1
+        assert usage['layer_data_requests'] == 1
+        assert usage['layer_data_bytes'] == 2048
+        assert usage['daily'][0]['active_users'] == 1
+        assert len(response.data['recent_activity']) == 2
+
+    def test_client_analytics_second_run_does_not_double_count(self, test_client, client_user):
+        """Test re-running the refresh leaves the rolled-up counts unchanged."""
+        AuditLog.objects.create(user=client_user, action='Project accessed', action_details={})
+        AuditLog.objects.create(
+            user=client_user,
+            action='Layer data accessed',
+            action_details={'bytes_served': 512}
+        )
+        AuditLog.objects.update(occurred_at=timezone.now() - LATE_COMMIT_WINDOW * 2)
+
+        assert refresh_client_analytics() == 2
+        assert refresh_client_analytics() == 0
+
+        analytics = ClientAnalytics.objects.get(client=test_client)
+        assert analytics.project_accesses == 1
+        assert analytics.layer_data_requests == 1
+        assert analytics.layer_data_bytes == 512
+
+        checkpoint = AnalyticsCheckpoint.objects.get()
+        assert checkpoint.last_audit_log_id == AuditLog.objects.order_by('occurred_at', 'id').last().id
+
+    def test_client_analytics_holds_back_uncommitted_window(self, test_client, client_user):
+        """Test rows inside the late-commit window wait for a later run instead of being skipped."""
+        AuditLog.objects.create(user=client_user, action='Project accessed', action_details={})
+        AuditLog.objects.update(occurred_at=timezone.now() - LATE_COMMIT_WINDOW * 2)
+        assert refresh_client_analytics() == 1
+
+        # Too recent: a concurrent transaction may still commit a row that sorts before it
+        recent = AuditLog.objects.create(user=client_user, action='Project accessed', action_details={})
+        assert refresh_client_analytics() == 0
+
+        AuditLog.objects.filter(id=recent.id).update(occurred_at=timezone.now() - LATE_COMMIT_WINDOW)
+        assert refresh_client_analytics() == 1
+        assert refresh_client_analytics() == 0
+        assert ClientAnalytics.objects.get(client=test_client).project_accesses == 2
@@ -6,7 +6,8 @@ from django.utils import timezone
 from django.db import transaction
 
 from users.models import AuditLog
-from .models import Client, ClientProject
+from users.serializers import AuditLogSerializer
+from .models import Client, ClientProject, ClientAnalytics
 from .serializers import (
     ClientSerializer,
     ClientDetailSerializer,
@@ -97,18 +98,23 @@ class ClientViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def analytics(self, request, pk=None):
-        """Get client usage analytics."""
+        """Get client usage analytics from the precomputed analytics tables."""
         client = self.get_object()
 
         # Get basic stats
         projects = client.client_projects.all()
         users = client.users.all()
 
-        # Get recent activity
-        user_ids = users.values_list('id', flat=True)
-        recent_activity = AuditLog.objects.filter(
-            user_id__in=user_ids
-        ).order_by('-occurred_at')[:50]
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response({'error': 'Invalid days'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Usage rolled up from the audit log by refresh_client_analytics
+        summary = ClientAnalytics.objects.filter(client=client).first()
+        daily = client.daily_activity.order_by('-date')[:max(days, 0)]
+        recent_ids = summary.recent_activity_ids if summary else []
+        recent_activity = AuditLog.objects.filter(id__in=recent_ids).order_by('-occurred_at')
 
         analytics = {
             'project_count': projects.count(),
@@ -121,8 +127,24 @@ class ClientViewSet(viewsets.ModelViewSet):
                     'name': cp.project.name,
                     'last_accessed': cp.last_accessed
                 }
-                for cp in projects.order_by('-last_accessed')[:5]
+                for cp in projects.select_related('project').order_by('-last_accessed')[:5]
             ],
+            'usage': {
+                'project_accesses': summary.project_accesses if summary else 0,
+                'layer_data_requests': summary.layer_data_requests if summary else 0,
+                'layer_data_bytes': summary.layer_data_bytes if summary else 0,
+                'last_refreshed': summary.refreshed_at if summary else None,
+                'daily': [
+                    {
+                        'date': day.date,
+                        'active_users': day.active_users,
+                        'project_accesses': day.project_accesses,
+                        'layer_data_requests': day.layer_data_requests,
+                        'layer_data_bytes': day.layer_data_bytes
+                    }
+                    for day in daily
+                ]
+            },
             'recent_activity': AuditLogSerializer(recent_activity, many=True).data
         }
 
@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import FCCLocationGridCell
+from .utils import bump_data_version
+
+# Cell sizes in degrees, coarsest first: roughly state, county and town views
+GRID_RESOLUTIONS = (0.1, 0.02, 0.005)
+
+# Bounding boxes larger than this (square degrees) are answered with grid cells
+AGGREGATE_MIN_AREA = getattr(settings, 'FCC_AGGREGATE_MIN_AREA', 0.25)
+
+# Pick the finest resolution that keeps a response under this many cells
+MAX_RESPONSE_CELLS = 20000
+
+
+def build_state_grid(source):
+    """
+    Rebuild the grid cells of one state at every resolution.
+
+    One INSERT ... SELECT per resolution groups the state's locations by cell
+    in PostgreSQL, and the state's data version is bumped in the same
+    transaction. Returns the number of cells written.
+    """
+    grid_table = FCCLocationGridCell._meta.db_table
+    where, where_params = source.where('t')
+    written = 0
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {grid_table} WHERE state = %s", [source.state])
+
+        for resolution in GRID_RESOLUTIONS:
+            cursor.execute(
+                f"""
+                INSERT INTO {grid_table} (state, resolution, cell_x, cell_y, location_count, geom)
+                SELECT %s, %s, c.cell_x, c.cell_y, count(*),
+                       ST_SetSRID(ST_MakePoint(avg(c.x), avg(c.y)), 4326)
+                FROM (
+                    SELECT ST_X(t.geom) AS x, ST_Y(t.geom) AS y,
+                           floor(ST_X(t.geom) / %s)::int AS cell_x,
+                           floor(ST_Y(t.geom) / %s)::int AS cell_y
+                    FROM {source.table} t
+                    WHERE t.geom IS NOT NULL AND {where}
+                ) c
+                GROUP BY c.cell_x, c.cell_y
+                """,
+                [source.state, resolution, resolution, resolution, *where_params]
+            )
+            written += cursor.rowcount
+
+        bump_data_version([source.state])
+
+    return written
+
+
+def resolution_for_bbox(bbox):
+    """Grid resolution to answer a bbox with, or None when raw locations should be sent."""
+    xmin, ymin, xmax, ymax = bbox
+    area = (xmax - xmin) * (ymax - ymin)
+    if area < AGGREGATE_MIN_AREA:
+        return None
+
+    for resolution in reversed(GRID_RESOLUTIONS):
+        if area / (resolution * resolution) <= MAX_RESPONSE_CELLS:
+            return resolution
+    return GRID_RESOLUTIONS[0]
+
+
+def grid_cells_in_bbox(state, resolution, bbox):
+    """Return the grid cells of a state inside a bbox, or None if the grid hasn't been built."""
+    cells = FCCLocationGridCell.objects.filter(
+        state=state,
+        resolution=resolution,
+        cell_x__gte=int(bbox[0] // resolution),
+        cell_x__lte=int(bbox[2] // resolution),
+        cell_y__gte=int(bbox[1] // resolution),
+        cell_y__lte=int(bbox[3] // resolution),
+    ).values_list('cell_x', 'cell_y', 'location_count', 'geom')
+
+    cells = list(cells)
+    if not cells and not FCCLocationGridCell.objects.filter(state=state).exists():
+        return None
+    return cells
+
+
+def grid_response(cells, resolution, output_format='json'):
+    """Build the response body for aggregated grid cells."""
+    total = sum(cell[2] for cell in cells)
+    if output_format == 'geojson':
+        return {
+            'type': 'FeatureCollection',
+            'features': [
+                {
+                    'type': 'Feature',
+                    'geometry': {'type': 'Point', 'coordinates': [round(geom.x, 6), round(geom.y, 6)]},
+                    'properties': {'cell_x': cell_x, 'cell_y': cell_y, 'location_count': count},
+                }
+                for cell_x, cell_y, count, geom in cells
+            ],
+            'aggregated': True,
+            'resolution': resolution,
+            'count': len(cells),
+            'location_count': total,
+        }
+    return {
+        'results': [
+            {
+                'cell_x': cell_x,
+                'cell_y': cell_y,
+                'lng': round(geom.x, 6),
+                'lat': round(geom.y, 6),
+                'location_count': count,
+            }
+            for cell_x, cell_y, count, geom in cells
+        ],
+        'aggregated': True,
+        'resolution': resolution,
+        'count': len(cells),
+        'location_count': total,
+    }
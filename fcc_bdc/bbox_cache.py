@@ -0,0 +1,176 @@
+import json
+import math
+
+from django.conf import settings
+from django.db import connection
+
+from layers.utils import LRUCache
+
+from .utils import data_version
+
+# Bounding boxes are snapped to square tiles of this many degrees
+BBOX_TILE_SIZE = 0.05
+
+# Boxes spanning more tiles than this bypass the cache and stream directly
+MAX_CACHED_TILES = 64
+
+# Tiles holding more locations than this (dense metro areas) are streamed, not cached
+MAX_TILE_ROWS = getattr(settings, 'FCC_BBOX_CACHE_TILE_ROWS', 20000)
+
+STREAM_BATCH_SIZE = 5000
+
+
+def _tile_weight(tile):
+    xs, ys, rows = tile
+    return sum(len(row) for row in rows) + 16 * len(rows)
+
+
+# The cache lives in each worker process, so total memory is FCC_BBOX_CACHE_BYTES x workers
+_tiles = LRUCache(
+    maxsize=getattr(settings, 'FCC_BBOX_CACHE_TILES', 4096),
+    maxweight=getattr(settings, 'FCC_BBOX_CACHE_BYTES', 64 * 1024 * 1024),
+    weigh=_tile_weight,
+)
+
+
+def bbox_tiles(bbox):
+    """Tile coordinates (tx, ty) covering a bbox on the BBOX_TILE_SIZE grid."""
+    xmin, ymin, xmax, ymax = bbox
+    tx0, tx1 = math.floor(xmin / BBOX_TILE_SIZE), math.floor(xmax / BBOX_TILE_SIZE)
+    ty0, ty1 = math.floor(ymin / BBOX_TILE_SIZE), math.floor(ymax / BBOX_TILE_SIZE)
+    return [(tx, ty) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)]
+
+
+def cacheable(bbox):
+    return len(bbox_tiles(bbox)) <= MAX_CACHED_TILES
+
+
+def _tile_predicate(source, tx, ty, bbox=None):
+    """WHERE clause selecting one tile's locations (tiles are half-open so none overlap), optionally trimmed to a bbox."""
+    x0, y0 = tx * BBOX_TILE_SIZE, ty * BBOX_TILE_SIZE
+    x1, y1 = x0 + BBOX_TILE_SIZE, y0 + BBOX_TILE_SIZE
+    where, where_params = source.where('t')
+    sql = f"""
+        t.geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326)
+        AND ST_X(t.geom) >= %s AND ST_X(t.geom) < %s
+        AND ST_Y(t.geom) >= %s AND ST_Y(t.geom) < %s
+        AND {where}
+    """
+    params = [x0, y0, x1, y1, x0, x1, y0, y1, *where_params]
+    if bbox is not None:
+        sql += " AND t.geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326)"
+        params += list(bbox)
+    return sql, params
+
+
+def _fetch_tile(source, tx, ty, row_sql):
+    """
+    Load one tile's locations as (xs, ys, encoded rows).
+
+    Returns None when the tile holds more than MAX_TILE_ROWS locations; such
+    tiles are too dense to keep in memory and are streamed instead.
+    """
+    predicate, params = _tile_predicate(source, tx, ty)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT ST_X(t.geom), ST_Y(t.geom), {row_sql} FROM {source.table} t WHERE {predicate} LIMIT %s",
+            [*params, MAX_TILE_ROWS + 1]
+        )
+        rows = cursor.fetchall()
+
+    if len(rows) > MAX_TILE_ROWS:
+        return None
+    return (
+        [row[0] for row in rows],
+        [row[1] for row in rows],
+        [row[2] for row in rows],
+    )
+
+
+def _stream_tile(source, tx, ty, bbox, row_sql, limit):
+    """Yield batches of encoded rows of a dense tile inside the bbox, at most ``limit`` rows."""
+    predicate, params = _tile_predicate(source, tx, ty, bbox)
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(f"SELECT {row_sql} FROM {source.table} t WHERE {predicate} LIMIT %s", [*params, limit])
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            yield [row[0] for row in rows]
+
+
+def _tile_has_rows(source, tx, ty, bbox):
+    predicate, params = _tile_predicate(source, tx, ty, bbox)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {source.table} t WHERE {predicate})", params)
+        return cursor.fetchone()[0]
+
+
+def _tile_rows(source, version, output_format, tx, ty, bbox, row_sql, limit):
+    """Yield batches of the encoded rows of one tile inside the bbox, from the cache when possible."""
+    key = (source.table, version, source.state, output_format, tx, ty)
+    tile = _tiles.get(key)
+    if tile is None:
+        tile = _fetch_tile(source, tx, ty, row_sql)
+        if tile is None:
+            yield from _stream_tile(source, tx, ty, bbox, row_sql, limit)
+            return
+        _tiles.set(key, tile)
+
+    xmin, ymin, xmax, ymax = bbox
+    xs, ys, rows = tile
+    inside = tx * BBOX_TILE_SIZE >= xmin and (tx + 1) * BBOX_TILE_SIZE <= xmax \
+        and ty * BBOX_TILE_SIZE >= ymin and (ty + 1) * BBOX_TILE_SIZE <= ymax
+    if not inside:
+        rows = [
+            row for x, y, row in zip(xs, ys, rows)
+            if xmin <= x <= xmax and ymin <= y <= ymax
+        ]
+    yield rows[:limit]
+
+
+def cached_bbox_rows(source, bbox, limit, output_format, row_sql):
+    """
+    Yield the same document as ``stream_bbox_rows``, assembled from cached tiles.
+
+    Each tile's encoded rows are cached under the state's data version, so
+    panning back over the same area re-uses earlier results, and reloading the
+    state invalidates them. Edge tiles are trimmed to the requested bbox.
+    Memory stays bounded: tiles are read one at a time, tiles with more than
+    MAX_TILE_ROWS locations are streamed rather than cached, and no tile is
+    read once ``limit`` rows have been sent.
+    """
+    version = data_version(source.state)
+
+    if output_format == 'geojson':
+        yield '{"type": "FeatureCollection", "aggregated": false, "features": ['
+    else:
+        yield '{"aggregated": false, "results": ['
+
+    count = 0
+    truncated = False
+    tiles = bbox_tiles(bbox)
+    for position, (tx, ty) in enumerate(tiles):
+        if count >= limit:
+            # Only check whether anything was left out, without reading it
+            truncated = any(_tile_has_rows(source, rx, ry, bbox) for rx, ry in tiles[position:])
+            break
+
+        # One extra row tells a tile that overflows the limit from one that fills it exactly
+        for rows in _tile_rows(source, version, output_format, tx, ty, bbox, row_sql, limit - count + 1):
+            if count + len(rows) > limit:
+                rows = rows[:limit - count]
+                truncated = True
+            if rows:
+                yield (',' if count else '') + ','.join(rows)
+                count += len(rows)
+            if truncated:
+                break
+        if truncated:
+            break
+
+    yield '], "count": ' + json.dumps(count) + ', "truncated": ' + json.dumps(truncated) + '}'
+
+
+def clear_bbox_cache():
+    _tiles.clear()
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from fcc_bdc.aggregation import build_state_grid
+from fcc_bdc.utils import STATE_FIPS, StateSource
+
+
+class Command(BaseCommand):
+    help = 'Builds the FCC location count grids used for low-zoom bounding box queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--state',
+            action='append',
+            help='State abbreviation to rebuild (repeatable); defaults to every state'
+        )
+
+    def handle(self, *args, **options):
+        states = [state.upper() for state in options.get('state') or STATE_FIPS]
+
+        for state in states:
+            try:
+                source = StateSource(state)
+            except ValueError as e:
+                raise CommandError(str(e))
+
+            written = build_state_grid(source)
+            self.stdout.write(f'{state} ({source.table}): {written} grid cells')
+
+        self.stdout.write(self.style.SUCCESS('FCC location grids built'))
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from fcc_bdc.models import FCCLocations
+from fcc_bdc.utils import STATE_FIPS, table_exists
+
+# Index access method and columns to cluster on for each --using choice
+CLUSTER_INDEXES = {
+    'gist': ('gist', 'geom'),
+    'county': ('btree', 'state_geoid, county_geoid'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Physically reorders FCC location tables on an index (CLUSTER) and analyzes them, so '
+            'bbox and county queries read neighbouring pages. Takes an exclusive lock while it runs.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--state',
+            action='append',
+            help='Cluster the per-state fcc_<state> table (repeatable); defaults to the national table'
+        )
+        parser.add_argument(
+            '--using',
+            choices=sorted(CLUSTER_INDEXES),
+            default='gist',
+            help='Order rows spatially (gist on geom) or by state and county GEOID'
+        )
+
+    def handle(self, *args, **options):
+        tables = []
+        for state in options.get('state') or []:
+            state = state.upper()
+            if state not in STATE_FIPS:
+                raise CommandError(f'Unknown state: {state}')
+            tables.append(f'fcc_{state.lower()}')
+        if not tables:
+            tables = [FCCLocations._meta.db_table]
+
+        method, columns = CLUSTER_INDEXES[options['using']]
+        for table in tables:
+            if not table_exists(table):
+                raise CommandError(f'Table {table} does not exist')
+
+            index = self._find_index(table, method, columns)
+            if index is None:
+                raise CommandError(f'{table} has no {method} index on ({columns}); run migrate or load_fcc_bdc first')
+
+            with connection.cursor() as cursor:
+                cursor.execute(f'CLUSTER {table} USING {index}')
+                cursor.execute(f'ANALYZE {table}')
+            self.stdout.write(f'{table}: clustered on {index}')
+
+        self.stdout.write(self.style.SUCCESS('FCC location tables clustered'))
+
+    def _find_index(self, table, method, columns):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT i.relname
+                FROM pg_index ix
+                JOIN pg_class i ON i.oid = ix.indexrelid
+                JOIN pg_am am ON am.oid = i.relam
+                WHERE ix.indrelid = to_regclass(%s) AND am.amname = %s
+                  AND pg_get_indexdef(ix.indexrelid) LIKE %s
+                ORDER BY i.relname
+                LIMIT 1
+                """,
+                [table, method, f'%({columns})']
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
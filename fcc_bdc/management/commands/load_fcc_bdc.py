@@ -0,0 +1,289 @@
+import csv
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from fcc_bdc.aggregation import build_state_grid
+from fcc_bdc.bbox_cache import clear_bbox_cache
+from fcc_bdc.models import FCCLocations
+from fcc_bdc.utils import STATE_FIPS, StateSource, bump_data_version, table_exists
+
+# Target column -> CSV header names it can be loaded from, in order of preference
+COLUMN_SOURCES = {
+    'fcc_location_id': ('location_id', 'fcc_location_id'),
+    'lat': ('latitude', 'lat'),
+    'long': ('longitude', 'long', 'lon'),
+    'state_name': ('state_name', 'state', 'state_abbr'),
+    'county_name': ('county_name', 'county'),
+    'county_geoid': ('county_geoid', 'county_fips'),
+    'state_geoid': ('state_geoid', 'state_fips'),
+}
+
+IDENTIFIER = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+# Text accepted by _numeric for each cast; anything else loads as NULL
+NUMERIC_PATTERNS = {
+    'bigint': r'^\s*[-+]?[0-9]{1,18}\s*$',
+    'double precision': r'^\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$',
+}
+
+# Target columns that are NOT NULL in the locations table; rows missing one are skipped
+REQUIRED_COLUMNS = ('fcc_location_id', 'lat', 'long', 'state_name', 'county_geoid')
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _numeric(expression, cast):
+    """``expression`` cast to ``cast``, or NULL when it is blank or not a valid number."""
+    return f"CASE WHEN {expression} ~ '{NUMERIC_PATTERNS[cast]}' THEN trim({expression})::{cast} END"
+
+
+class Command(BaseCommand):
+    help = ('Bulk-loads FCC BDC location CSVs with COPY into a fresh table, indexes it '
+            'and swaps it in place of the live table in one transaction')
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_files', nargs='+', help='Location CSV files (same header)')
+        parser.add_argument(
+            '--state',
+            help='Load into the per-state fcc_<state> table instead of the national table'
+        )
+        parser.add_argument(
+            '--skip-grid',
+            action='store_true',
+            help="Don't rebuild the location count grid after the swap"
+        )
+
+    def handle(self, *args, **options):
+        state = (options.get('state') or '').upper() or None
+        if state and state not in STATE_FIPS:
+            raise CommandError(f'Unknown state: {state}')
+
+        target = f'fcc_{state.lower()}' if state else FCCLocations._meta.db_table
+        staging = f'{target}_staging'
+        swap = f'{target}_swap'
+
+        header = self._read_header(options['csv_files'])
+        select = self._select_list(header, state)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {staging}')
+            cursor.execute(f'DROP TABLE IF EXISTS {swap}')
+            try:
+                self._copy_to_staging(cursor, staging, header, options['csv_files'])
+                loaded = self._build_swap_table(cursor, target, staging, swap, select)
+                index_names = self._build_indexes(cursor, target, swap)
+                cursor.execute(f'ANALYZE {swap}')
+                self._swap(cursor, target, swap, index_names, self._served_states(state))
+            except Exception:
+                cursor.execute(f'DROP TABLE IF EXISTS {swap}')
+                raise
+            finally:
+                cursor.execute(f'DROP TABLE IF EXISTS {staging}')
+
+        self.stdout.write(f'{target}: {loaded} locations loaded')
+        clear_bbox_cache()
+
+        if not options['skip_grid']:
+            for grid_state in [state] if state else self._loaded_states(target):
+                written = build_state_grid(StateSource(grid_state))
+                self.stdout.write(f'{grid_state}: {written} grid cells')
+
+        self.stdout.write(self.style.SUCCESS(f'FCC BDC locations loaded into {target}'))
+
+    def _read_header(self, paths):
+        header = None
+        for path in paths:
+            try:
+                with open(path, newline='', encoding='utf-8-sig') as f:
+                    columns = [column.strip().lower() for column in next(csv.reader(f), [])]
+            except OSError as e:
+                raise CommandError(f'Cannot read {path}: {e}')
+            if header is not None and columns != header:
+                raise CommandError(f'{path} has a different header from {paths[0]}')
+            header = columns
+
+        bad = [column for column in header if not IDENTIFIER.match(column)]
+        if bad:
+            raise CommandError(f"Unsupported CSV column names: {', '.join(bad)}")
+        return header
+
+    def _select_list(self, header, state):
+        """SQL expressions (over the all-text staging table) for each target column."""
+        source = {
+            column: next((_quote(name) for name in names if name in header), None)
+            for column, names in COLUMN_SOURCES.items()
+        }
+        for required in ('fcc_location_id', 'lat', 'long'):
+            if source[required] is None:
+                names = ' or '.join(COLUMN_SOURCES[required])
+                raise CommandError(f'CSV needs a {names} column')
+        if source['state_name'] is None and not state:
+            names = ' or '.join(COLUMN_SOURCES['state_name'])
+            raise CommandError(f'CSV needs a {names} column, or pass --state')
+
+        if source['county_geoid'] is None:
+            if 'block_geoid' not in header:
+                raise CommandError('CSV needs a county_geoid, county_fips or block_geoid column')
+            county_geoid = _numeric('left(trim(block_geoid), 5)', 'bigint')
+        else:
+            county_geoid = _numeric(source['county_geoid'], 'bigint')
+
+        if state:
+            state_geoid = str(STATE_FIPS[state])
+        elif source['state_geoid'] is not None:
+            state_geoid = _numeric(source['state_geoid'], 'bigint')
+        else:
+            state_geoid = f'({county_geoid}) / 1000'
+
+        lat = _numeric(source['lat'], 'double precision')
+        lng = _numeric(source['long'], 'double precision')
+        return {
+            'fcc_location_id': _numeric(source['fcc_location_id'], 'bigint'),
+            'lat': lat,
+            'long': lng,
+            'state_name': f"NULLIF(trim({source['state_name']}), '')" if source['state_name'] else f"'{state}'",
+            'county_name': source['county_name'] or 'NULL',
+            'state_geoid': state_geoid,
+            'county_geoid': county_geoid,
+            'geom': f'ST_SetSRID(ST_MakePoint({lng}, {lat}), 4326)',
+        }
+
+    def _copy_to_staging(self, cursor, staging, header, paths):
+        columns = ', '.join(_quote(column) for column in header)
+        cursor.execute(f"CREATE UNLOGGED TABLE {staging} ({', '.join(f'{_quote(c)} text' for c in header)})")
+        for path in paths:
+            with open(path, encoding='utf-8-sig') as f:
+                cursor.copy_expert(f'COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, HEADER true)', f)
+            self.stdout.write(f'Copied {path}')
+
+    def _build_swap_table(self, cursor, target, staging, swap, select):
+        template = target if table_exists(target) else FCCLocations._meta.db_table
+        # Defaults and identity, but no indexes: those are built after the load
+        cursor.execute(
+            f'CREATE TABLE {swap} (LIKE {template} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS)'
+        )
+        columns = ', '.join(_quote(column) for column in select)
+        complete = ' AND '.join(f'{select[column]} IS NOT NULL' for column in REQUIRED_COLUMNS)
+        # County then geohash order keeps nearby locations on the same pages
+        cursor.execute(
+            f"""
+            INSERT INTO {swap} ({columns})
+            SELECT {', '.join(select.values())}
+            FROM {staging}
+            WHERE {complete}
+            ORDER BY {select['county_geoid']}, ST_GeoHash({select['geom']}, 10)
+            """
+        )
+        loaded = cursor.rowcount
+
+        cursor.execute(f'SELECT count(*) FROM {staging}')
+        skipped = cursor.fetchone()[0] - loaded
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {skipped} rows with a missing or invalid {', '.join(REQUIRED_COLUMNS)}"
+            ))
+        return loaded
+
+    def _build_indexes(self, cursor, target, swap):
+        """
+        Recreate the live table's indexes on the swap table, plus GiST and BRIN if missing.
+
+        Returns {temporary name: final name} for the indexes built.
+        """
+        cursor.execute(f'ALTER TABLE {swap} ADD PRIMARY KEY (id)')
+
+        definitions = []
+        if table_exists(target):
+            cursor.execute(
+                """
+                SELECT i.relname, pg_get_indexdef(i.oid), ix.indisprimary
+                FROM pg_index ix JOIN pg_class i ON i.oid = ix.indexrelid
+                WHERE ix.indrelid = to_regclass(%s)
+                """,
+                [target]
+            )
+            definitions = [(name, sql) for name, sql, primary in cursor.fetchall() if not primary]
+
+        methods = ' '.join(sql for _, sql in definitions)
+        if 'USING gist (geom)' not in methods:
+            definitions.append((f'{target}_geom_id', f'CREATE INDEX {target}_geom_id ON {target} USING gist (geom)'))
+        if 'USING brin' not in methods:
+            definitions.append((
+                f'{target}_geoid_brin',
+                f'CREATE INDEX {target}_geoid_brin ON {target} USING brin (state_geoid, county_geoid)'
+            ))
+
+        index_names = {}
+        for name, sql in definitions:
+            swap_name = f'{name[:58]}_swap'
+            index_names[swap_name] = name
+            sql = re.sub(r'^(CREATE (?:UNIQUE )?INDEX )\S+ ON (?:ONLY )?\S+',
+                         lambda m: f'{m.group(1)}{swap_name} ON {swap}', sql)
+            self.stdout.write(f'Building index {name}')
+            cursor.execute(sql)
+        return index_names
+
+    def _dependent_views(self, cursor, target):
+        """(name, definition, index definitions) of materialized views that read the table."""
+        cursor.execute(
+            """
+            SELECT DISTINCT v.oid, v.relname, pg_get_viewdef(v.oid)
+            FROM pg_depend d
+            JOIN pg_rewrite r ON r.oid = d.objid
+            JOIN pg_class v ON v.oid = r.ev_class
+            WHERE d.refobjid = to_regclass(%s) AND v.relkind = 'm'
+            """,
+            [target]
+        )
+        views = []
+        for oid, name, definition in cursor.fetchall():
+            cursor.execute("SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s", [oid])
+            views.append((name, definition, [row[0] for row in cursor.fetchall()]))
+        return views
+
+    def _served_states(self, state):
+        """States whose locations the target table holds: one, or every state without its own table."""
+        if state:
+            return [state]
+        return [abbr for abbr in STATE_FIPS if not table_exists(f'fcc_{abbr.lower()}')]
+
+    def _swap(self, cursor, target, swap, index_names, states):
+        """
+        Replace the live table with the swap table, keeping index and constraint names,
+        and bump the data version of the states it serves.
+
+        Materialized views over the table (e.g. fcc_county_summary) are dropped
+        and recreated from the new data inside the same transaction, so readers
+        never see them empty.
+        """
+        views = []
+        with transaction.atomic():
+            if table_exists(target):
+                cursor.execute(f'LOCK TABLE {target} IN ACCESS EXCLUSIVE MODE')
+                views = self._dependent_views(cursor, target)
+                for name, _, _ in views:
+                    cursor.execute(f'DROP MATERIALIZED VIEW {name}')
+                cursor.execute(f'DROP TABLE {target}')
+
+            cursor.execute(f'ALTER TABLE {swap} RENAME TO {target}')
+            # Renaming the constraint renames its index too
+            cursor.execute(f'ALTER TABLE {target} RENAME CONSTRAINT {swap}_pkey TO {target}_pkey')
+            for swap_name, name in index_names.items():
+                cursor.execute(f'ALTER INDEX {swap_name} RENAME TO {name}')
+            bump_data_version(states)
+
+            for name, definition, indexes in views:
+                self.stdout.write(f'Rebuilding {name}')
+                cursor.execute(f'CREATE MATERIALIZED VIEW {name} AS {definition.rstrip().rstrip(";")}')
+                for index_sql in indexes:
+                    cursor.execute(index_sql)
+
+    def _loaded_states(self, target):
+        fips_states = {fips: abbr for abbr, fips in STATE_FIPS.items()}
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT DISTINCT state_geoid FROM {target} WHERE state_geoid IS NOT NULL')
+            return [fips_states[row[0]] for row in cursor.fetchall() if row[0] in fips_states]
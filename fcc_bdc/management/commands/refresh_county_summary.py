@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from fcc_bdc.models import CountySummary
+
+
+class Command(BaseCommand):
+    help = 'Refreshes the fcc_county_summary materialized view without blocking readers'
+
+    def handle(self, *args, **options):
+        view = CountySummary._meta.db_table
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT ispopulated FROM pg_matviews WHERE matviewname = %s", [view])
+            row = cursor.fetchone()
+            # CONCURRENTLY needs the view to have been populated once already
+            concurrently = 'CONCURRENTLY ' if row and row[0] else ''
+            cursor.execute(f'REFRESH MATERIALIZED VIEW {concurrently}{view}')
+
+        count = CountySummary.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'{view} refreshed: {count} counties'))
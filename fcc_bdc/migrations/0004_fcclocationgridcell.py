@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:10
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fcc_bdc", "0003_fcclocations_county_name_fcclocations_state_geoid"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FCCLocationGridCell",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("state", models.CharField(max_length=2)),
+                ("resolution", models.FloatField(help_text="Cell size in degrees")),
+                ("cell_x", models.IntegerField()),
+                ("cell_y", models.IntegerField()),
+                ("location_count", models.IntegerField()),
+                ("geom", django.contrib.gis.db.models.fields.PointField(srid=4326)),
+            ],
+            options={
+                "db_table": "fcc_location_grid",
+                "indexes": [models.Index(fields=["state", "resolution"], name="fcc_grid_state_res_idx")],
+                "unique_together": {("state", "resolution", "cell_x", "cell_y")},
+            },
+        ),
+    ]
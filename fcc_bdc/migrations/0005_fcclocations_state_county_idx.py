@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fcc_bdc", "0004_fcclocationgridcell"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fcclocations",
+            index=models.Index(fields=["state_geoid", "county_geoid"], name="fcc_rel6_state_county_idx"),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:40
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fcc_bdc", "0005_fcclocations_state_county_idx"),
+        ("layers", "0012_trigram_search"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+        CREATE MATERIALIZED VIEW fcc_county_summary AS
+            WITH states (state_abbr, state_fips) AS (
+                VALUES
+                    ('AL', 1), ('AK', 2), ('AZ', 4), ('AR', 5), ('CA', 6), ('CO', 8), ('CT', 9), ('DE', 10), ('DC', 11),
+                    ('FL', 12), ('GA', 13), ('HI', 15), ('ID', 16), ('IL', 17), ('IN', 18), ('IA', 19), ('KS', 20), ('KY', 21),
+                    ('LA', 22), ('ME', 23), ('MD', 24), ('MA', 25), ('MI', 26), ('MN', 27), ('MS', 28), ('MO', 29), ('MT', 30),
+                    ('NE', 31), ('NV', 32), ('NH', 33), ('NJ', 34), ('NM', 35), ('NY', 36), ('NC', 37), ('ND', 38), ('OH', 39),
+                    ('OK', 40), ('OR', 41), ('PA', 42), ('RI', 44), ('SC', 45), ('SD', 46), ('TN', 47), ('TX', 48), ('UT', 49),
+                    ('VT', 50), ('VA', 51), ('WA', 53), ('WV', 54), ('WI', 55), ('WY', 56), ('AS', 60), ('GU', 66), ('MP', 69),
+                    ('PR', 72), ('VI', 78)
+            ),
+            licenses AS (
+                SELECT CASE WHEN length(l.county_fips) = 5 THEN l.county_fips::bigint
+                            ELSE s.state_fips * 1000 + l.county_fips::bigint END AS county_geoid,
+                       min(l.county_name) AS county_name,
+                       count(*) AS license_count,
+                       jsonb_agg(
+                           jsonb_build_object('channel', l.channel, 'bidder', l.bidder,
+                                              'license_date', l.license_date, 'frequency_mhz', l.frequency_mhz)
+                           ORDER BY l.channel, l.bidder
+                       ) AS licenses
+                FROM cbrs_licenses l
+                JOIN states s ON s.state_abbr = upper(l.state_abbr)
+                WHERE l.county_fips ~ '^[0-9]{1,5}$'
+                GROUP BY 1
+            ),
+            locations AS (
+                SELECT county_geoid, min(county_name) AS county_name, count(*) AS location_count
+                FROM fcc_rel6
+                WHERE county_geoid IS NOT NULL
+                GROUP BY county_geoid
+            ),
+            polygons AS (
+                -- County polygons loaded as layers, matched on a 5-digit GEOID property
+                SELECT DISTINCT ON (raw.geoid) raw.geoid, raw.project_layer_id, raw.geometry
+                FROM (
+                    SELECT CASE WHEN g.geoid_text ~ '^[0-9]{5}$' THEN g.geoid_text::bigint END AS geoid,
+                           d.project_layer_id, d.geometry, d.id
+                    FROM project_layer_data_wiroi_online d
+                    CROSS JOIN LATERAL (
+                        SELECT COALESCE(d.properties ->> 'GEOID', d.properties ->> 'geoid') AS geoid_text
+                    ) g
+                    WHERE GeometryType(d.geometry) IN ('POLYGON', 'MULTIPOLYGON')
+                ) raw
+                WHERE raw.geoid IS NOT NULL
+                ORDER BY raw.geoid, raw.id
+            )
+            SELECT c.county_geoid,
+                   s.state_fips,
+                   s.state_abbr,
+                   COALESCE(l.county_name, f.county_name) AS county_name,
+                   COALESCE(f.location_count, 0) AS location_count,
+                   COALESCE(l.license_count, 0) AS license_count,
+                   COALESCE(l.licenses, '[]'::jsonb) AS licenses,
+                   p.project_layer_id AS county_layer_id,
+                   p.geometry AS geom
+            FROM (SELECT county_geoid FROM licenses UNION SELECT county_geoid FROM locations) c
+            LEFT JOIN licenses l ON l.county_geoid = c.county_geoid
+            LEFT JOIN locations f ON f.county_geoid = c.county_geoid
+            LEFT JOIN states s ON s.state_fips = c.county_geoid / 1000
+            LEFT JOIN polygons p ON p.geoid = c.county_geoid;
+
+        CREATE UNIQUE INDEX fcc_county_summary_geoid_idx ON fcc_county_summary (county_geoid);
+        CREATE INDEX fcc_county_summary_state_idx ON fcc_county_summary (state_abbr);
+            """,
+            reverse_sql="DROP MATERIALIZED VIEW IF EXISTS fcc_county_summary;",
+        ),
+        migrations.CreateModel(
+            name="CountySummary",
+            fields=[
+                ("county_geoid", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("state_fips", models.IntegerField(null=True)),
+                ("state_abbr", models.CharField(max_length=2, null=True)),
+                ("county_name", models.CharField(max_length=100, null=True)),
+                ("location_count", models.BigIntegerField()),
+                ("license_count", models.IntegerField()),
+                ("licenses", models.JSONField()),
+                ("county_layer_id", models.IntegerField(null=True)),
+                ("geom", django.contrib.gis.db.models.fields.GeometryField(null=True, srid=4326)),
+            ],
+            options={
+                "db_table": "fcc_county_summary",
+                "managed": False,
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fcc_bdc", "0006_county_summary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FCCDataVersion",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("state", models.CharField(max_length=2, unique=True)),
+                ("version", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "fcc_data_version",
+            },
+        ),
+    ]
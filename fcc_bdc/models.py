@@ -23,10 +23,85 @@ class FCCLocations(models.Model):
     class Meta:
         db_table = 'fcc_rel6'
         # ordering = ['state_name']
+        indexes = [
+            models.Index(fields=['state_geoid', 'county_geoid'], name='fcc_rel6_state_county_idx'),
+        ]
 
     def __str__(self):
         return f"{self.fcc_location_id} ({self.state_name})"
 
     def save(self, *args, **kwargs):
         self.updated_at = timezone.now()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class FCCLocationGridCell(models.Model):
+    """
+    Precomputed count of a state's FCC locations in one cell of a degree grid.
+
+    Built by the build_fcc_grid management command at each of
+    ``fcc_bdc.aggregation.GRID_RESOLUTIONS`` and served instead of individual
+    locations when a bounding box is too large to be useful point by point.
+    """
+    state = models.CharField(max_length=2)
+    resolution = models.FloatField(help_text="Cell size in degrees")
+    cell_x = models.IntegerField()
+    cell_y = models.IntegerField()
+    location_count = models.IntegerField()
+    # Mean position of the locations in the cell
+    geom = gis_models.PointField(srid=4326)
+
+    class Meta:
+        db_table = 'fcc_location_grid'
+        unique_together = ('state', 'resolution', 'cell_x', 'cell_y')
+        indexes = [
+            models.Index(fields=['state', 'resolution'], name='fcc_grid_state_res_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.state} {self.resolution}° ({self.cell_x}, {self.cell_y}): {self.location_count}"
+
+
+class FCCDataVersion(models.Model):
+    """
+    Version of a state's FCC location data, bumped whenever it is reloaded.
+
+    load_fcc_bdc and build_fcc_grid increment it in the same transaction as
+    their writes; the tile and bounding box caches are keyed on it.
+    """
+    state = models.CharField(max_length=2, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'fcc_data_version'
+
+    def __str__(self):
+        return f"{self.state} v{self.version}"
+
+
+class CountySummary(models.Model):
+    """
+    Per-county FCC location counts, CBRS licenses and county polygon.
+
+    Read-only model over the fcc_county_summary materialized view (created
+    by migration 0006); refresh it with the refresh_county_summary command.
+    """
+    county_geoid = models.BigIntegerField(primary_key=True)
+    state_fips = models.IntegerField(null=True)
+    state_abbr = models.CharField(max_length=2, null=True)
+    county_name = models.CharField(max_length=100, null=True)
+    location_count = models.BigIntegerField()
+    license_count = models.IntegerField()
+    # [{"channel", "bidder", "license_date", "frequency_mhz"}, ...]
+    licenses = models.JSONField()
+    # Layer the county polygon was taken from, if any
+    county_layer_id = models.IntegerField(null=True)
+    geom = gis_models.GeometryField(srid=4326, null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'fcc_county_summary'
+
+    def __str__(self):
+        return f"{self.county_name}, {self.state_abbr} ({self.county_geoid})"
@@ -1,5 +1,14 @@
+import json
+
 from rest_framework import serializers
 
+from .models import CountySummary
+from .utils import STATE_FIPS
+
+DEFAULT_BBOX_LIMIT = 100000
+MAX_BBOX_LIMIT = 1000000
+
+
 class BoundingBoxRequestSerializer(serializers.Serializer):
     state = serializers.CharField(max_length=2)
     bbox = serializers.ListField(
@@ -7,4 +16,46 @@ class BoundingBoxRequestSerializer(serializers.Serializer):
         min_length=4,
         max_length=4,
         help_text="Bounding box [xmin, ymin, xmax, ymax]"
-    )
\ No newline at end of file
+    )
+    format = serializers.ChoiceField(
+        choices=['json', 'geojson', 'arrow', 'parquet'],
+        default='json',
+        help_text="Response encoding; arrow and parquet are columnar with a WKB geometry column"
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=MAX_BBOX_LIMIT,
+        default=DEFAULT_BBOX_LIMIT,
+        help_text="Maximum number of locations returned; the response says if it was truncated"
+    )
+    aggregate = serializers.ChoiceField(
+        choices=['auto', 'never'],
+        default='auto',
+        help_text="auto returns grid cell counts for large bounding boxes"
+    )
+
+    def validate_state(self, value):
+        value = value.upper()
+        if value not in STATE_FIPS:
+            raise serializers.ValidationError(f"Unknown state: {value}")
+        return value
+
+    def validate_bbox(self, value):
+        xmin, ymin, xmax, ymax = value
+        if xmin >= xmax or ymin >= ymax:
+            raise serializers.ValidationError("bbox must be [xmin, ymin, xmax, ymax]")
+        return value
+
+
+class CountySummarySerializer(serializers.ModelSerializer):
+    geometry = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CountySummary
+        fields = ['county_geoid', 'state_fips', 'state_abbr', 'county_name', 'location_count',
+                  'license_count', 'licenses', 'county_layer_id', 'geometry']
+
+    def get_geometry(self, obj):
+        if not self.context.get('with_geometry') or obj.geom is None:
+            return None
+        return json.loads(obj.geom.json)
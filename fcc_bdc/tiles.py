@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+
+from .models import FCCLocationGridCell
+from .utils import data_version
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+MAX_TILE_FEATURES = 50000
+
+# Below this zoom tiles carry grid cell counts instead of individual locations
+MIN_POINT_ZOOM = 10
+
+# (max zoom, grid resolution in degrees) for aggregated tiles
+ZOOM_RESOLUTIONS = (
+    (6, 0.1),
+    (8, 0.02),
+    (MIN_POINT_ZOOM - 1, 0.005),
+)
+
+
+def _tile_dir():
+    return getattr(settings, 'FCC_TILE_DIR', os.path.join(settings.MEDIA_ROOT, 'fcc_tiles'))
+
+
+def tiles_version(source):
+    """Cache version for a state's tiles: its FCCDataVersion, bumped when its locations or grid are rebuilt."""
+    return str(data_version(source.state))
+
+
+def _resolution_for_zoom(z):
+    for max_zoom, resolution in ZOOM_RESOLUTIONS:
+        if z <= max_zoom:
+            return resolution
+    return None
+
+
+_BOUNDS_SQL = """
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(%s, %s, %s) AS tile
+    ),
+    search AS (
+        -- Expanded by the tile buffer so features just outside still render at the edges
+        SELECT tile, ST_Transform(ST_Expand(tile, (ST_XMax(tile) - ST_XMin(tile)) * %s / %s), 4326) AS area
+        FROM bounds
+    )
+"""
+
+
+def _render_locations(source, z, x, y):
+    where, where_params = source.where('t')
+    sql = _BOUNDS_SQL + f"""
+        , features AS (
+            SELECT ST_AsMVTGeom(ST_Transform(t.geom, 3857), s.tile, %s, %s, true) AS geom,
+                   t.fcc_location_id AS location_id,
+                   t.county_geoid
+            FROM {source.table} t, search s
+            WHERE t.geom && s.area AND {where}
+            LIMIT %s
+        )
+        SELECT ST_AsMVT(features.*, 'locations', %s, 'geom') FROM features
+    """
+    params = [z, x, y, TILE_BUFFER, TILE_EXTENT, TILE_EXTENT, TILE_BUFFER, *where_params,
+              MAX_TILE_FEATURES, TILE_EXTENT]
+    return sql, params
+
+
+def _render_cells(source, resolution, z, x, y):
+    grid_table = FCCLocationGridCell._meta.db_table
+    sql = _BOUNDS_SQL + f"""
+        , features AS (
+            SELECT ST_AsMVTGeom(ST_Transform(g.geom, 3857), s.tile, %s, %s, true) AS geom,
+                   g.location_count
+            FROM {grid_table} g, search s
+            WHERE g.state = %s AND g.resolution = %s AND g.geom && s.area
+        )
+        SELECT ST_AsMVT(features.*, 'cells', %s, 'geom') FROM features
+    """
+    params = [z, x, y, TILE_BUFFER, TILE_EXTENT, TILE_EXTENT, TILE_BUFFER, source.state, resolution,
+              TILE_EXTENT]
+    return sql, params
+
+
+def render_tile(source, z, x, y):
+    """
+    Render one Mapbox vector tile for a state's FCC locations.
+
+    At MIN_POINT_ZOOM and above the 'locations' layer holds individual points
+    with their location id and county GEOID; below it, the 'cells' layer holds
+    the precomputed grid counts (falling back to points if the state's grid
+    hasn't been built).
+    """
+    resolution = _resolution_for_zoom(z)
+    if resolution is not None and FCCLocationGridCell.objects.filter(state=source.state).exists():
+        sql, params = _render_cells(source, resolution, z, x, y)
+    else:
+        sql, params = _render_locations(source, z, x, y)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        tile = cursor.fetchone()[0]
+    return bytes(tile) if tile else b''
+
+
+def get_tile(source, z, x, y, version):
+    """
+    Return a tile's bytes, serving from the on-disk cache when possible.
+
+    Tiles live under FCC_TILE_DIR/<state>/<version>/<z>/<x>/<y>.mvt, where
+    ``version`` is tiles_version(source); when a state's version changes,
+    the directories of older versions are removed.
+    """
+    state_dir = os.path.join(_tile_dir(), source.state)
+    version_dir = os.path.join(state_dir, version)
+    path = os.path.join(version_dir, str(z), str(x), f"{y}.mvt")
+
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    if not os.path.isdir(version_dir) and os.path.isdir(state_dir):
+        for stale in os.listdir(state_dir):
+            shutil.rmtree(os.path.join(state_dir, stale), ignore_errors=True)
+
+    tile = render_tile(source, z, x, y)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.mvt', dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(tile)
+    os.replace(tmp_path, path)
+
+    return tile
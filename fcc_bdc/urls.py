@@ -6,9 +6,11 @@ from . import views
 
 router = DefaultRouter()
 router.register(r'fcc-query', views.FCCQueryViewSet,basename = 'fcc-query')
+router.register(r'county-summary', views.CountySummaryViewSet, basename='county-summary')
 
 urlpatterns = [
     path('', include(router.urls)),  #/fcc-query/bounding_box_query/
+    path('fcc-tiles/<str:state>/<int:z>/<int:x>/<int:y>.mvt', views.FCCTileView.as_view(), name='fcc-tile'),
 
 ]
 
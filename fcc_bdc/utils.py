@@ -0,0 +1,76 @@
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import FCCDataVersion, FCCLocations
+
+# State/territory abbreviation -> FIPS code
+STATE_FIPS = {
+    'AL': 1, 'AK': 2, 'AZ': 4, 'AR': 5, 'CA': 6, 'CO': 8, 'CT': 9, 'DE': 10, 'DC': 11,
+    'FL': 12, 'GA': 13, 'HI': 15, 'ID': 16, 'IL': 17, 'IN': 18, 'IA': 19, 'KS': 20,
+    'KY': 21, 'LA': 22, 'ME': 23, 'MD': 24, 'MA': 25, 'MI': 26, 'MN': 27, 'MS': 28,
+    'MO': 29, 'MT': 30, 'NE': 31, 'NV': 32, 'NH': 33, 'NJ': 34, 'NM': 35, 'NY': 36,
+    'NC': 37, 'ND': 38, 'OH': 39, 'OK': 40, 'OR': 41, 'PA': 42, 'RI': 44, 'SC': 45,
+    'SD': 46, 'TN': 47, 'TX': 48, 'UT': 49, 'VT': 50, 'VA': 51, 'WA': 53, 'WV': 54,
+    'WI': 55, 'WY': 56, 'AS': 60, 'GU': 66, 'MP': 69, 'PR': 72, 'VI': 78,
+}
+
+
+def data_version(state):
+    """Current FCCDataVersion of a state's locations and grid (0 before the first load)."""
+    row = FCCDataVersion.objects.filter(state=state).values_list('version', flat=True).first()
+    return row or 0
+
+
+def bump_data_version(states):
+    """Increment the data version of each state, e.g. inside a load's transaction."""
+    for state in states:
+        FCCDataVersion.objects.get_or_create(state=state)
+        FCCDataVersion.objects.filter(state=state).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def table_exists(table):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [table])
+        return cursor.fetchone()[0]
+
+
+def table_columns(table):
+    """Column names of a table, in order."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT attname FROM pg_attribute "
+            "WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped ORDER BY attnum",
+            [table]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class StateSource:
+    """
+    Where a state's FCC locations live: its own fcc_<state> table, or the
+    national FCCLocations table filtered by state_geoid.
+
+    ``where(alias)`` returns an extra (sql, params) predicate restricting rows
+    to the state; table names only ever come from the STATE_FIPS whitelist.
+    """
+
+    def __init__(self, state):
+        state = (state or '').upper()
+        if state not in STATE_FIPS:
+            raise ValueError(f'Unknown state: {state}')
+
+        self.state = state
+        self.fips = STATE_FIPS[state]
+        state_table = f'fcc_{state.lower()}'
+        if table_exists(state_table):
+            self.table = state_table
+            self.per_state = True
+        else:
+            self.table = FCCLocations._meta.db_table
+            self.per_state = False
+
+    def where(self, alias='t'):
+        if self.per_state:
+            return 'TRUE', []
+        return f'{alias}.state_geoid = %s', [self.fips]
@@ -1,49 +1,212 @@
-from rest_framework.viewsets import ViewSet
+import json
+
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.views import APIView
+from rest_framework import permissions
+from rest_framework.viewsets import ReadOnlyModelViewSet, ViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db import connection
-from django.contrib.gis.geos import Polygon
-from .serializers import BoundingBoxRequestSerializer
+from .bbox_cache import cacheable, cached_bbox_rows
+from .aggregation import grid_cells_in_bbox, grid_response, resolution_for_bbox
+from .models import CountySummary
+from .serializers import BoundingBoxRequestSerializer, CountySummarySerializer
+from .tiles import get_tile, tiles_version
+from .utils import StateSource, table_columns
+from layers.columnar import COLUMNAR_CONTENT_TYPES, columnar_stream, query_batches
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+STREAM_BATCH_SIZE = 5000
+MAX_TILE_ZOOM = 22
+
+
+def _row_sql(output_format, alias='t'):
+    """SQL that encodes one location row as JSON text."""
+    if output_format == 'geojson':
+        return f"ST_AsGeoJSON({alias}.*, 'geom', 6)"
+    return f"(to_jsonb({alias}) - 'geom')::text"
+
+
+def stream_bbox_rows(source, bbox, limit, output_format='json'):
+    """
+    Yield a JSON (or GeoJSON FeatureCollection) document of the locations in a bbox.
+
+    Rows are encoded by PostgreSQL and read from a server-side cursor in
+    batches, so memory stays flat however large the bbox is. At most ``limit``
+    rows are sent; ``truncated`` in the trailer says whether more matched.
+    """
+    where, where_params = source.where('t')
+    sql = f"""
+        SELECT {_row_sql(output_format)}
+        FROM {source.table} t
+        WHERE t.geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326) AND {where}
+        LIMIT %s
+    """
+    params = [*bbox, *where_params, limit + 1]
+
+    if output_format == 'geojson':
+        yield '{"type": "FeatureCollection", "aggregated": false, "features": ['
+    else:
+        yield '{"aggregated": false, "results": ['
+
+    count = 0
+    truncated = False
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            if count + len(rows) > limit:
+                rows = rows[:limit - count]
+                truncated = True
+            if rows:
+                yield (',' if count else '') + ','.join(row[0] for row in rows)
+                count += len(rows)
+            if truncated:
+                break
+
+    yield '], "count": ' + json.dumps(count) + ', "truncated": ' + json.dumps(truncated) + '}'
+
+
+def columnar_bbox_response(source, bbox, limit, output_format):
+    """Stream the locations in a bbox as Arrow IPC or Parquet, geometry as WKB."""
+    where, where_params = source.where('t')
+    columns = ', '.join(f't."{column}"' for column in table_columns(source.table) if column != 'geom')
+    schema, batches = query_batches(
+        f"""
+        SELECT {columns}, ST_AsBinary(t.geom) AS geometry
+        FROM {source.table} t
+        WHERE t.geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326) AND {where}
+        LIMIT %s
+        """,
+        [*bbox, *where_params, limit],
+        geometry_column='geometry',
+        batch_size=STREAM_BATCH_SIZE
+    )
+    response = StreamingHttpResponse(
+        columnar_stream(batches, schema, output_format),
+        content_type=COLUMNAR_CONTENT_TYPES[output_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="fcc_{source.state.lower()}.{output_format}"'
+    return response
+
+
 class FCCQueryViewSet(ViewSet):
 
 
     @swagger_auto_schema(
         method='post',
         request_body=BoundingBoxRequestSerializer,
-        operation_description="Returns FCC features filtered by state and bounding box",
+        operation_description="Streams FCC locations filtered by state and bounding box as JSON or GeoJSON",
         responses={200: openapi.Response(description="Filtered results")}
     )
     @action(detail=False, methods=['post'])
-    @action(detail=False, methods=['post'])
-    
     def bounding_box_query(self, request):
         """
         Accepts: {
           "state": "VA",
-          "bbox": [-79.5, 37.9, -78.7, 38.3]
+          "bbox": [-79.5, 37.9, -78.7, 38.3],
+          "format": "json" | "geojson" | "arrow" | "parquet",
+          "limit": 100000,
+          "aggregate": "auto" | "never"
         }
+
+        Large boxes are answered with precomputed grid cell counts
+        ("aggregated": true) once build_fcc_grid has run for the state.
+        Columnar formats are meant for bulk pulls and always return the
+        locations themselves, at most ``limit`` rows.
         """
-         
         serializer = BoundingBoxRequestSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=400)
-       
-        state = request.data.get("state")
-        bbox = request.data.get("bbox")
+        data = serializer.validated_data
+
+        try:
+            source = StateSource(data['state'])
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        if data['format'] in COLUMNAR_CONTENT_TYPES:
+            return columnar_bbox_response(source, data['bbox'], data['limit'], data['format'])
+
+        # State and county views get grid cell counts instead of millions of points
+        resolution = resolution_for_bbox(data['bbox']) if data['aggregate'] == 'auto' else None
+        if resolution is not None:
+            cells = grid_cells_in_bbox(source.state, resolution, data['bbox'])
+            if cells is not None:
+                return Response(grid_response(cells, resolution, data['format']))
+
+        # Small boxes are assembled from cached tiles; anything bigger streams straight from the DB
+        if cacheable(data['bbox']):
+            rows = cached_bbox_rows(source, data['bbox'], data['limit'], data['format'], _row_sql(data['format']))
+        else:
+            rows = stream_bbox_rows(source, data['bbox'], data['limit'], data['format'])
+
+        content_type = 'application/geo+json' if data['format'] == 'geojson' else 'application/json'
+        return StreamingHttpResponse(rows, content_type=content_type)
+
+
+class FCCTileView(APIView):
+    """
+    Mapbox vector tiles of a state's FCC locations for map display.
+
+    GET /fcc-tiles/<state>/<z>/<x>/<y>.mvt
+    Tiles are cached on disk per state and data version, so the ETag changes
+    whenever the state's locations (or its grid) are reloaded.
+    """
+
+    def get(self, request, state, z, x, y):
+        if z > MAX_TILE_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            return Response({"error": "Tile coordinates out of range"}, status=400)
+
+        try:
+            source = StateSource(state)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        # Answer revalidations from the version alone, before touching the tile
+        version = tiles_version(source)
+        etag = f'"{source.state}-{version}"'
+        if request.headers.get('If-None-Match') == etag:
+            return HttpResponse(status=304)
+
+        tile = get_tile(source, z, x, y, version)
+
+        response = HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=3600'
+        return response
+
+
+class CountySummaryViewSet(ReadOnlyModelViewSet):
+    """
+    County-level FCC location counts and CBRS licenses, for county popups.
+
+    GET /county-summary/?state_abbr=VA[&geometry=true]
+    GET /county-summary/<county_geoid>/
+    Served from the fcc_county_summary materialized view.
+    """
+    serializer_class = CountySummarySerializer
+    permission_classes = [permissions.AllowAny]  # Allow public access
+    pagination_class = None
+
+    def _with_geometry(self):
+        return self.request.query_params.get('geometry', '').lower() in ('1', 'true', 'yes')
 
-        if not state or not bbox or len(bbox) != 4:
-            return Response({"error": "Missing or invalid state/bbox"}, status=400)
+    def get_queryset(self):
+        queryset = CountySummary.objects.all()
 
-        table = f"fcc_{state.lower()}"
-        envelope = f"ST_MakeEnvelope({bbox[0]}, {bbox[1]}, {bbox[2]}, {bbox[3]}, 4326)"
-        query = f"SELECT * FROM {table} WHERE geom && {envelope}"
+        state_abbr = self.request.query_params.get('state_abbr')
+        if state_abbr:
+            queryset = queryset.filter(state_abbr=state_abbr.upper())
 
-        with connection.cursor() as cursor:
-            cursor.execute(query)
-            columns = [col[0] for col in cursor.description]
-            data = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        if not self._with_geometry():
+            queryset = queryset.defer('geom')
+        return queryset.order_by('county_name')
 
-        return Response({"results": data})
\ No newline at end of file
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['with_geometry'] = self._with_geometry()
+        return context
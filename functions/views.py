@@ -4,6 +4,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db import transaction
 
+from layers.aggregation import DEFAULT_CELL_PIXELS, aggregate_points
+from layers.clustering import get_cluster_index
+from layers.filters import apply_filter, parse_filter
 from layers.models import ProjectLayer
 from .models import LayerFunction, ProjectLayerFunction, MapTool, ProjectTool
 from .serializers import (
@@ -121,6 +124,10 @@ class LayerFunctionViewSet(viewsets.ModelViewSet):
             # Execute based on function type
             if function.function_type == 'clustering':
                 result = self._execute_clustering(function, layer, request.data)
+            elif function.function_type == 'filtering':
+                result = self._execute_filtering(function, layer, request.data)
+            elif function.function_type == 'heatmap':
+                result = self._execute_heatmap(function, layer, request.data)
             elif function.function_type == 'styling':
                 result = self._execute_styling(function, layer, request.data)
             elif function.function_type == 'analysis':
@@ -141,6 +148,8 @@ class LayerFunctionViewSet(viewsets.ModelViewSet):
 
         except ProjectLayer.DoesNotExist:
             return Response({'error': 'Layer not found'}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     def _execute_clustering(self, function, layer, data):
         """Execute clustering function."""
@@ -156,11 +165,43 @@ class LayerFunctionViewSet(viewsets.ModelViewSet):
         }
         layer.save()
 
+        # Build the cluster index now so the first map request doesn't pay for it
+        index = get_cluster_index(layer)
+
         return {
             'message': 'Clustering enabled',
-            'settings': layer.clustering_options
+            'settings': layer.clustering_options,
+            'point_count': index.point_count,
+            'zoom_levels': len(index.levels)
+        }
+
+    def _execute_filtering(self, function, layer, data):
+        """Execute filtering function: return the ids of the features matching a filter."""
+        conditions = parse_filter(data.get('filter'))
+        limit = min(int(data.get('limit', 10000)), 100000)
+
+        matches = apply_filter(layer.features.all(), conditions)
+        return {
+            'matched_count': matches.count(),
+            'feature_ids': list(matches.order_by('id').values_list('feature_id', flat=True)[:limit]),
+            'filter': data.get('filter')
         }
 
+    def _execute_heatmap(self, function, layer, data):
+        """Execute heatmap function: bin the layer's features into a grid."""
+        bbox = data.get('bbox', [-180, -85, 180, 85])
+        if isinstance(bbox, str):
+            bbox = bbox.split(',')
+
+        return aggregate_points(
+            layer,
+            [float(value) for value in bbox],
+            int(data.get('zoom', 0)),
+            shape=data.get('shape', 'hex'),
+            cell_pixels=int(data.get('cell_size', DEFAULT_CELL_PIXELS)),
+            sum_field=data.get('sum')
+        )
+
     def _execute_styling(self, function, layer, data):
         """Execute styling function."""
         # For demo, just return success
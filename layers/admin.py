@@ -1,7 +1,7 @@
 # layers/admin.py
 from django.contrib import admin
 from django.contrib.gis.admin import GISModelAdmin
-from .models import LayerType, ProjectLayerGroup, ProjectLayer, ProjectLayerData, LayerPermission
+from .models import LayerType, ProjectLayerGroup, ProjectLayer, ProjectLayerData, LayerPermission, LayerJob
 
 
 @admin.register(LayerType)
@@ -71,4 +71,12 @@ class ProjectLayerDataAdmin(GISModelAdmin):
 class LayerPermissionAdmin(admin.ModelAdmin):
     list_display = ('project_layer', 'client_project', 'can_view', 'can_edit', 'can_export')
     list_filter = ('can_view', 'can_edit', 'can_export')
-    search_fields = ('project_layer__name', 'client_project__client__name')
\ No newline at end of file
+    search_fields = ('project_layer__name', 'client_project__client__name')
+
+
+@admin.register(LayerJob)
+class LayerJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'job_type', 'source_layer', 'result_layer', 'status', 'progress', 'created_at')
+    list_filter = ('job_type', 'status')
+    search_fields = ('source_layer__name', 'result_layer__name')
+    readonly_fields = ('created_at', 'updated_at', 'completed_at')
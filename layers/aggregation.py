@@ -0,0 +1,155 @@
+# layers/aggregation.py
+import json
+import math
+
+from django.db import connection
+
+from .models import ProjectLayerData
+from .queries import numeric_property_sql
+
+# Cell geometry builders; cell (i, j) numbering matches ST_HexagonGrid / ST_SquareGrid
+GRID_FUNCTIONS = {
+    'hex': 'ST_Hexagon',
+    'square': 'ST_Square',
+}
+
+DEFAULT_CELL_PIXELS = 32
+MAX_CELLS = 20000
+
+# Web Mercator constants
+EARTH_CIRCUMFERENCE = 40075016.68557849
+MAX_LATITUDE = 85.05112878
+
+
+def cell_size_for_zoom(zoom, cell_pixels=DEFAULT_CELL_PIXELS):
+    """Grid cell size in EPSG:3857 metres for cells ``cell_pixels`` wide on 256px tiles."""
+    return EARTH_CIRCUMFERENCE / (256 * 2 ** zoom) * cell_pixels
+
+
+def _mercator_extent(bbox):
+    west, south, east, north = bbox
+    south = max(south, -MAX_LATITUDE)
+    north = min(north, MAX_LATITUDE)
+
+    def y(lat):
+        return EARTH_CIRCUMFERENCE / (2 * math.pi) * math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+
+    width = (east - west) / 360.0 * EARTH_CIRCUMFERENCE
+    return width, y(north) - y(south)
+
+
+def _cell_key_sql(shape, size):
+    """
+    SQL (over ``p.x``, ``p.y`` in EPSG:3857) giving the (i, j) grid cell of each point.
+
+    Squares are a floor division. Hexagons are the flat-topped cells of
+    ST_HexagonGrid: column i is centred at x = 1.5 * size * i and odd columns
+    are shifted up half a cell, so a point belongs to whichever of the two
+    candidate columns' nearest centres is closer. Every point gets exactly one
+    cell, including points on a shared edge.
+    """
+    if shape == 'square':
+        return f"floor(p.x / {size!r})::int", f"floor(p.y / {size!r})::int", ''
+
+    width = 1.5 * size
+    height = math.sqrt(3) * size
+
+    def shift(column):
+        return f"(mod(abs({column}), 2) * {height / 2!r})"
+
+    lateral = f"""
+        CROSS JOIN LATERAL (SELECT floor(p.x / {width!r})::int AS a) c0
+        CROSS JOIN LATERAL (
+            SELECT c0.a AS ia, round((p.y - {shift('c0.a')}) / {height!r})::int AS ja,
+                   c0.a + 1 AS ib, round((p.y - {shift('c0.a + 1')}) / {height!r})::int AS jb
+        ) c1
+        CROSS JOIN LATERAL (
+            SELECT (p.x - {width!r} * c1.ia) ^ 2 + (p.y - {height!r} * c1.ja - {shift('c1.ia')}) ^ 2 AS da,
+                   (p.x - {width!r} * c1.ib) ^ 2 + (p.y - {height!r} * c1.jb - {shift('c1.ib')}) ^ 2 AS db
+        ) c2
+    """
+    return (
+        "CASE WHEN c2.da <= c2.db THEN c1.ia ELSE c1.ib END",
+        "CASE WHEN c2.da <= c2.db THEN c1.ja ELSE c1.jb END",
+        lateral,
+    )
+
+
+def aggregate_points(layer, bbox, zoom, shape='hex', cell_pixels=DEFAULT_CELL_PIXELS, sum_field=None):
+    """
+    Bin a layer's features into a hexagon or square grid covering ``bbox``.
+
+    The grid is laid out in EPSG:3857 so cells look regular on the map. Each
+    feature inside the bbox (found through the geometry index) gets its cell
+    key arithmetically, features are grouped by key, and cell polygons are
+    built only for the non-empty cells. Returns a GeoJSON
+    FeatureCollection dict with ``count`` and, when ``sum_field`` is given,
+    ``sum`` of that numeric property per non-empty cell. Raises ValueError for
+    invalid arguments or a grid that would be too large.
+    """
+    if shape not in GRID_FUNCTIONS:
+        raise ValueError(f"shape must be one of: {', '.join(GRID_FUNCTIONS)}")
+
+    west, south, east, north = bbox
+    if west >= east or south >= north:
+        raise ValueError('bbox must be west,south,east,north')
+    south = max(south, -MAX_LATITUDE)
+    north = min(north, MAX_LATITUDE)
+
+    size = cell_size_for_zoom(zoom, cell_pixels)
+    width, height = _mercator_extent((west, south, east, north))
+    if (width / size) * (height / size) > MAX_CELLS:
+        raise ValueError('Too many grid cells for this bbox; zoom in or use a larger cell size')
+
+    if sum_field:
+        value_sql = numeric_property_sql('d')
+        value_params = [sum_field, sum_field]
+    else:
+        value_sql = 'NULL::double precision'
+        value_params = []
+
+    cell_i, cell_j, lateral = _cell_key_sql(shape, size)
+    table = ProjectLayerData._meta.db_table
+    sql = f"""
+        WITH points AS (
+            SELECT ST_X(t.geom) AS x, ST_Y(t.geom) AS y, t.value
+            FROM (
+                SELECT ST_Transform(ST_PointOnSurface(d.geometry), 3857) AS geom, {value_sql} AS value
+                FROM {table} d
+                WHERE d.project_layer_id = %s AND d.geometry && ST_MakeEnvelope(%s, %s, %s, %s, 4326)
+            ) t
+        ),
+        cells AS (
+            SELECT {cell_i} AS i, {cell_j} AS j, p.value
+            FROM points p
+            {lateral}
+        )
+        SELECT ST_AsGeoJSON(ST_Transform({GRID_FUNCTIONS[shape]}(%s, cells.i, cells.j), 4326), 6),
+               count(*), sum(cells.value)
+        FROM cells
+        GROUP BY cells.i, cells.j
+    """
+    params = [*value_params, layer.id, west, south, east, north, size]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    features = []
+    for geometry, count, total in rows:
+        properties = {'count': count}
+        if sum_field:
+            properties['sum'] = total
+        features.append({
+            'type': 'Feature',
+            'geometry': json.loads(geometry),
+            'properties': properties,
+        })
+
+    return {
+        'type': 'FeatureCollection',
+        'features': features,
+        'shape': shape,
+        'cell_size': size,
+        'max_count': max((f['properties']['count'] for f in features), default=0),
+    }
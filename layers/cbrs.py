@@ -0,0 +1,235 @@
+# layers/cbrs.py
+import json
+import threading
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+from django.db import connection
+
+from .models import CBRSLicense
+from .utils import LRUCache
+
+_state_cache = LRUCache(maxsize=getattr(settings, 'CBRS_STATE_CACHE_SIZE', 64))
+
+# How often (seconds) a process re-checks the table version behind its index and cached payloads
+INDEX_CHECK_INTERVAL = getattr(settings, 'CBRS_INDEX_CHECK_SECONDS', 30)
+
+# A license as CBRSLicenseSerializer renders it
+_LICENSE_JSON = """
+    json_build_object(
+        'id', l.id,
+        'county_fips', l.county_fips,
+        'county_name', l.county_name,
+        'state_abbr', l.state_abbr,
+        'channel', l.channel,
+        'bidder', l.bidder,
+        'license_date', l.license_date,
+        'frequency_mhz', l.frequency_mhz,
+        'created_at', to_char(l.created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"'),
+        'updated_at', to_char(l.updated_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"')
+    )
+"""
+
+
+def cbrs_table_version():
+    """
+    Cheap version of the cbrs_licenses table from its row count, highest id and latest update.
+
+    Saves and deletes through the ORM or load_cbrs_licenses also invalidate the
+    current process directly (see invalidate_cbrs_index).
+    """
+    table = CBRSLicense._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*), max(id), max(updated_at) FROM {table}")
+        count, max_id, updated = cursor.fetchone()
+    return f"{count}-{max_id or 0}-{updated.isoformat() if updated else ''}"
+
+
+def _build_state_json(state_abbr):
+    table = CBRSLicense._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH counties AS (
+                SELECT l.county_fips,
+                       min(l.county_name) AS county_name,
+                       min(l.state_abbr) AS state_abbr,
+                       count(*) AS license_count,
+                       json_agg({_LICENSE_JSON} ORDER BY l.county_name, l.channel, l.id) AS licenses
+                FROM {table} l
+                WHERE upper(l.state_abbr) = %s
+                GROUP BY l.county_fips
+            )
+            SELECT count(*),
+                   COALESCE(sum(license_count), 0),
+                   COALESCE(
+                       json_agg(
+                           json_build_object(
+                               'county_fips', county_fips,
+                               'county_name', county_name,
+                               'state_abbr', state_abbr,
+                               'licenses', licenses,
+                               'license_count', license_count
+                           ) ORDER BY county_name, county_fips
+                       )::text,
+                       '[]'
+                   )
+            FROM counties
+            """,
+            [state_abbr]
+        )
+        total_counties, total_licenses, counties = cursor.fetchone()
+
+    if not total_counties:
+        return (
+            '{"state_abbr": ' + json.dumps(state_abbr) + ', "counties": [], "total_counties": 0, '
+            '"total_licenses": 0, "message": '
+            + json.dumps(f'No CBRS licenses found for state {state_abbr}') + '}'
+        )
+    return (
+        '{"state_abbr": ' + json.dumps(state_abbr)
+        + ', "total_counties": ' + str(total_counties)
+        + ', "total_licenses": ' + str(total_licenses)
+        + ', "counties": ' + counties + '}'
+    )
+
+
+def state_licenses_json(state_abbr):
+    """
+    The by_state_abbr response for a state, as JSON text.
+
+    Licenses are grouped by county and encoded in one query; the result is
+    cached per state until cbrs_table_version() changes.
+    """
+    state_abbr = state_abbr.upper()
+    with _lock:
+        version = _current_version()
+    cached = _state_cache.get(state_abbr)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    payload = _build_state_json(state_abbr)
+    _state_cache.set(state_abbr, (version, payload))
+    return payload
+
+
+def _license_dict(license):
+    """A license as CBRSLicenseSerializer renders it, read-only."""
+    def timestamp(value):
+        return value.isoformat().replace('+00:00', 'Z') if value else None
+
+    return MappingProxyType({
+        'id': license.id,
+        'county_fips': license.county_fips,
+        'county_name': license.county_name,
+        'state_abbr': license.state_abbr,
+        'channel': license.channel,
+        'bidder': license.bidder,
+        'license_date': license.license_date.isoformat() if license.license_date else None,
+        'frequency_mhz': license.frequency_mhz,
+        'created_at': timestamp(license.created_at),
+        'updated_at': timestamp(license.updated_at),
+    })
+
+
+class CBRSIndex:
+    """
+    Immutable in-memory copy of the CBRS licenses.
+
+    ``states`` maps an upper-cased state abbreviation to county FIPS to the
+    county's licenses ordered by channel; ``bidders`` maps each lower-cased
+    bidder name to the positions of its licenses in ``licenses``, so bidder
+    substring searches only scan the distinct names.
+    """
+
+    def __init__(self, licenses, version):
+        self.version = version
+        ordered = sorted(licenses, key=lambda l: (l.state_abbr, l.county_name, l.channel, l.id))
+        self.licenses = tuple(_license_dict(license) for license in ordered)
+
+        states = {}
+        bidders = {}
+        for position, license in enumerate(self.licenses):
+            county = states.setdefault(license['state_abbr'].upper(), {}).setdefault(license['county_fips'], [])
+            county.append(license)
+            bidders.setdefault(license['bidder'].lower(), []).append(position)
+
+        self.states = MappingProxyType({
+            state: MappingProxyType({
+                fips: tuple(sorted(county, key=lambda l: (l['channel'], l['id'])))
+                for fips, county in counties.items()
+            })
+            for state, counties in states.items()
+        })
+        self.bidders = MappingProxyType({bidder: tuple(positions) for bidder, positions in bidders.items()})
+
+    def county(self, state_abbr, county_fips):
+        return self.states.get(state_abbr.upper(), {}).get(county_fips, ())
+
+    def search(self, state_abbr=None, county_fips=None, county_name=None, bidder=None):
+        """Licenses matching the CBRSLicenseViewSet filters, ordered by state, county and channel."""
+        if bidder:
+            needle = bidder.lower()
+            positions = sorted(
+                position
+                for name, name_positions in self.bidders.items() if needle in name
+                for position in name_positions
+            )
+            licenses = [self.licenses[position] for position in positions]
+        else:
+            licenses = self.licenses
+
+        if state_abbr:
+            state_abbr = state_abbr.upper()
+            licenses = [l for l in licenses if l['state_abbr'].upper() == state_abbr]
+        if county_fips:
+            licenses = [l for l in licenses if l['county_fips'] == county_fips]
+        elif county_name:
+            county_name = county_name.lower()
+            licenses = [l for l in licenses if county_name in l['county_name'].lower()]
+        return list(licenses)
+
+
+_index = None
+_version = None
+_version_checked = 0.0
+_lock = threading.Lock()
+
+
+def _current_version():
+    """cbrs_table_version(), re-read at most every INDEX_CHECK_INTERVAL seconds. Call with _lock held."""
+    global _version, _version_checked
+
+    now = time.monotonic()
+    if _version is None or now - _version_checked >= INDEX_CHECK_INTERVAL:
+        _version = cbrs_table_version()
+        _version_checked = now
+    return _version
+
+
+def get_cbrs_index():
+    """
+    The process's CBRS index, built on first use.
+
+    The table version is re-checked at most every INDEX_CHECK_INTERVAL
+    seconds and the index rebuilt when it has changed; invalidate_cbrs_index()
+    forces a rebuild on the next call.
+    """
+    global _index
+
+    with _lock:
+        version = _current_version()
+        if _index is None or _index.version != version:
+            _index = CBRSIndex(CBRSLicense.objects.all(), version)
+        return _index
+
+
+def invalidate_cbrs_index():
+    """Drop the in-memory index and cached state payloads after licenses are loaded or edited."""
+    global _index, _version
+
+    with _lock:
+        _index = None
+        _version = None
+    _state_cache.clear()
@@ -0,0 +1,221 @@
+# layers/clustering.py
+import math
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from .formats import layer_data_version
+from .models import ProjectLayerData
+from .utils import LRUCache
+
+DEFAULT_RADIUS = 60     # cluster radius in pixels
+DEFAULT_EXTENT = 512    # tile extent the radius is relative to
+DEFAULT_MIN_ZOOM = 0
+DEFAULT_MAX_ZOOM = 16   # above this every point is returned individually
+DEFAULT_MIN_POINTS = 2
+
+
+def _lng_to_x(lng):
+    return np.asarray(lng, dtype=np.float64) / 360.0 + 0.5
+
+
+def _lat_to_y(lat):
+    sin = np.sin(np.radians(np.asarray(lat, dtype=np.float64)))
+    y = 0.5 - 0.25 * np.log((1 + sin) / (1 - sin)) / math.pi
+    return np.clip(y, 0.0, 1.0)
+
+
+def _x_to_lng(x):
+    return (x - 0.5) * 360.0
+
+
+def _y_to_lat(y):
+    return np.degrees(2 * np.arctan(np.exp((0.5 - y) * 2 * math.pi)) - math.pi / 2)
+
+
+class ClusterIndex:
+    """
+    Hierarchical point clusters for every zoom level, in the style of supercluster.
+
+    Points are projected to unit Web Mercator. Starting from the individual
+    points, each zoom level merges the level above it on a grid whose cell
+    size equals the cluster radius at that zoom, using weighted centroids.
+    Each level is kept sorted by x so bbox queries are a binary search plus a
+    mask over the matching slice.
+    """
+
+    def __init__(self, lngs, lats, feature_ids, radius=DEFAULT_RADIUS, extent=DEFAULT_EXTENT,
+                 min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM, min_points=DEFAULT_MIN_POINTS):
+        self.radius = radius
+        self.extent = extent
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.min_points = min_points
+        self.feature_ids = np.asarray(feature_ids, dtype=object)
+        self.levels = {}
+
+        # Individual points live one level above max_zoom; point_index -1 marks a cluster
+        x = _lng_to_x(lngs)
+        y = _lat_to_y(lats)
+        level = {
+            'x': x,
+            'y': y,
+            'count': np.ones(len(x), dtype=np.int64),
+            'point_index': np.arange(len(x), dtype=np.int64),
+        }
+        self.levels[max_zoom + 1] = self._sorted(level)
+
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            level = self._cluster(level, zoom)
+            self.levels[zoom] = self._sorted(level)
+
+    @property
+    def point_count(self):
+        return len(self.feature_ids)
+
+    @staticmethod
+    def _sorted(level):
+        order = np.argsort(level['x'], kind='stable')
+        return {key: values[order] for key, values in level.items()}
+
+    def _cluster(self, level, zoom):
+        """Merge the previous (finer) level into grid clusters for ``zoom``."""
+        if len(level['x']) == 0:
+            return level
+
+        cell = self.radius / (self.extent * 2 ** zoom)
+        cells_per_row = int(math.ceil(1.0 / cell)) + 1
+        cell_x = np.floor(level['x'] / cell).astype(np.int64)
+        cell_y = np.floor(level['y'] / cell).astype(np.int64)
+        keys = cell_y * cells_per_row + cell_x
+
+        _, group, members = np.unique(keys, return_inverse=True, return_counts=True)
+        weights = level['count'].astype(np.float64)
+        totals = np.bincount(group, weights=weights)
+        cx = np.bincount(group, weights=level['x'] * weights) / totals
+        cy = np.bincount(group, weights=level['y'] * weights) / totals
+
+        # Groups too small to form a cluster keep their entries unchanged
+        clustered = (totals >= self.min_points) & (members > 1)
+        keep = ~clustered[group]
+
+        return {
+            'x': np.concatenate([cx[clustered], level['x'][keep]]),
+            'y': np.concatenate([cy[clustered], level['y'][keep]]),
+            'count': np.concatenate([totals[clustered].astype(np.int64), level['count'][keep]]),
+            'point_index': np.concatenate([
+                np.full(int(clustered.sum()), -1, dtype=np.int64),
+                level['point_index'][keep]
+            ]),
+        }
+
+    def get_clusters(self, bbox, zoom):
+        """
+        Return GeoJSON features for the clusters and points inside ``bbox`` at ``zoom``.
+
+        ``bbox`` is (west, south, east, north) in degrees; a bbox crossing the
+        antimeridian has west > east and is searched as two ranges.
+        """
+        zoom = max(self.min_zoom, min(int(zoom), self.max_zoom + 1))
+        level = self.levels[zoom]
+
+        west, south, east, north = bbox
+        # y grows southwards in Web Mercator
+        min_y, max_y = float(_lat_to_y(north)), float(_lat_to_y(south))
+        spans = [(west, 180.0), (-180.0, east)] if west > east else [(west, east)]
+
+        features = []
+        for span_west, span_east in spans:
+            start = np.searchsorted(level['x'], float(_lng_to_x(span_west)), side='left')
+            end = np.searchsorted(level['x'], float(_lng_to_x(span_east)), side='right')
+            y = level['y'][start:end]
+            mask = (y >= min_y) & (y <= max_y)
+
+            xs = level['x'][start:end][mask]
+            ys = y[mask]
+            counts = level['count'][start:end][mask]
+            point_indexes = level['point_index'][start:end][mask]
+            lngs = _x_to_lng(xs)
+            lats = _y_to_lat(ys)
+
+            for lng, lat, count, point_index in zip(lngs.tolist(), lats.tolist(), counts.tolist(),
+                                                    point_indexes.tolist()):
+                feature = {
+                    'type': 'Feature',
+                    'geometry': {'type': 'Point', 'coordinates': [round(lng, 6), round(lat, 6)]},
+                    'properties': {'cluster': point_index < 0, 'point_count': count},
+                }
+                if point_index >= 0:
+                    feature['id'] = self.feature_ids[point_index]
+                features.append(feature)
+        return features
+
+
+def _load_points(layer):
+    """Fetch the layer's feature ids and representative point coordinates."""
+    table = ProjectLayerData._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT feature_id, ST_X(ST_PointOnSurface(geometry)), ST_Y(ST_PointOnSurface(geometry)) "
+            f"FROM {table} WHERE project_layer_id = %s AND NOT ST_IsEmpty(geometry)",
+            [layer.id]
+        )
+        rows = cursor.fetchall()
+
+    if not rows:
+        return [], np.empty(0), np.empty(0)
+    feature_ids, lngs, lats = zip(*rows)
+    return list(feature_ids), np.array(lngs, dtype=np.float64), np.array(lats, dtype=np.float64)
+
+
+def _int_option(options, key, default, low, high=None):
+    """An integer clustering option clamped to [low, high], or ``default`` when missing or invalid."""
+    try:
+        value = int(options.get(key, default))
+    except (TypeError, ValueError):
+        return default
+    value = max(value, low)
+    return min(value, high) if high is not None else value
+
+
+def _index_options(layer):
+    options = layer.clustering_options if isinstance(layer.clustering_options, dict) else {}
+    max_zoom = _int_option(options, 'maxZoom', DEFAULT_MAX_ZOOM, 0, 22)
+    return {
+        'radius': _int_option(options, 'radius', DEFAULT_RADIUS, 1),
+        'extent': _int_option(options, 'extent', DEFAULT_EXTENT, 1),
+        'min_zoom': _int_option(options, 'minZoom', DEFAULT_MIN_ZOOM, 0, max_zoom),
+        'max_zoom': max_zoom,
+        'min_points': _int_option(options, 'minPoints', DEFAULT_MIN_POINTS, 1),
+    }
+
+
+_indexes = LRUCache(maxsize=getattr(settings, 'CLUSTER_INDEX_CACHE_SIZE', 8))
+_build_lock = threading.Lock()
+
+
+def get_cluster_index(layer):
+    """
+    Return the cluster index for a layer, building it if the cached one is stale.
+
+    Indexes are kept per process and keyed on the layer's data version and
+    clustering options.
+    """
+    options = _index_options(layer)
+    version = (layer_data_version(layer), tuple(sorted(options.items())))
+
+    entry = _indexes.get(layer.id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    with _build_lock:
+        entry = _indexes.get(layer.id)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        feature_ids, lngs, lats = _load_points(layer)
+        index = ClusterIndex(lngs, lats, feature_ids, **options)
+        _indexes.set(layer.id, (version, index))
+        return index
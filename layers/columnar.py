@@ -0,0 +1,234 @@
+# layers/columnar.py
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.db import connection
+
+from .models import ProjectLayerData
+
+COLUMNAR_CONTENT_TYPES = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+COLUMNAR_BATCH_SIZE = 10000
+
+# PostgreSQL type oids -> Arrow types; anything else is sent as text
+PG_ARROW_TYPES = {
+    16: pa.bool_(),
+    17: pa.binary(),
+    20: pa.int64(),
+    21: pa.int16(),
+    23: pa.int32(),
+    700: pa.float32(),
+    701: pa.float64(),
+    1700: pa.float64(),
+    25: pa.string(),
+    1043: pa.string(),
+    1082: pa.date32(),
+    1114: pa.timestamp('us'),
+    1184: pa.timestamp('us', tz='UTC'),
+}
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def geo_metadata(geometry_column='geometry'):
+    """GeoParquet metadata marking a WKB column (lon/lat, EPSG:4326) as the geometry."""
+    return {
+        b'geo': json.dumps({
+            'version': '1.0.0',
+            'primary_column': geometry_column,
+            'columns': {geometry_column: {'encoding': 'WKB', 'geometry_types': []}},
+        }).encode()
+    }
+
+
+def schema_from_description(description, geometry_column=None):
+    """Arrow schema for a DB-API cursor description, using PG_ARROW_TYPES."""
+    fields = [
+        pa.field(column.name, PG_ARROW_TYPES.get(column.type_code, pa.string()))
+        for column in description
+    ]
+    metadata = geo_metadata(geometry_column) if geometry_column else None
+    return pa.schema(fields, metadata=metadata)
+
+
+def batch_from_rows(rows, schema):
+    """Build a record batch from row tuples laid out as ``schema``."""
+    arrays = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if pa.types.is_binary(field.type):
+            values = [bytes(value) if value is not None else None for value in values]
+        elif pa.types.is_string(field.type):
+            values = [str(value) if value is not None else None for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def columnar_stream(batches, schema, output_format):
+    """
+    Yield an Arrow IPC stream or a Parquet file, one chunk per record batch.
+
+    ``batches`` is any iterable of record batches matching ``schema``; nothing
+    beyond the current batch is held in memory.
+    """
+    sink = _ChunkSink()
+    if output_format == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    for batch in batches:
+        writer.write_batch(batch)
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+
+    writer.close()
+    yield sink.drain()
+
+
+def query_batches(sql, params, geometry_column=None, batch_size=COLUMNAR_BATCH_SIZE):
+    """
+    Return (schema, batches) for a query read on a server-side cursor.
+
+    The schema comes from the description of the query run with LIMIT 0; the
+    server-side cursor is only opened once the returned iterator is consumed,
+    and closed when it is exhausted or closed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT * FROM ({sql}) q LIMIT 0", params)
+        schema = schema_from_description(cursor.description, geometry_column)
+
+    def batches():
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield batch_from_rows(rows, schema)
+
+    return schema, batches()
+
+
+def _property_types(layer):
+    """Arrow type per property key of a layer, from the JSON types stored for it."""
+    table = ProjectLayerData._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT p.key,
+                   array_agg(DISTINCT jsonb_typeof(p.value)) FILTER (WHERE jsonb_typeof(p.value) <> 'null'),
+                   bool_and(jsonb_typeof(p.value) <> 'number' OR p.value::text ~ '^-?[0-9]+$')
+            FROM {table} d, jsonb_each(d.properties) p
+            WHERE d.project_layer_id = %s
+            GROUP BY p.key
+            ORDER BY min(d.id), p.key
+            """,
+            [layer.id]
+        )
+        rows = cursor.fetchall()
+
+    types = {}
+    for key, json_types, integral in rows:
+        json_types = json_types or []
+        if json_types == ['number']:
+            types[key] = pa.int64() if integral else pa.float64()
+        elif json_types == ['boolean']:
+            types[key] = pa.bool_()
+        else:
+            # Strings, and mixed or nested values as JSON text
+            types[key] = pa.string()
+    return types
+
+
+def _property_value(value, arrow_type):
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type) and not isinstance(value, str):
+        return json.dumps(value)
+    return value
+
+
+def layer_record_batches(layer, batch_size=COLUMNAR_BATCH_SIZE):
+    """
+    A layer's features as (schema, iterator of record batches).
+
+    Columns are ``feature_id``, ``geometry`` (WKB) and one typed column per
+    property key; a property called feature_id or geometry is suffixed with an
+    underscore so it doesn't clash. Rows are read on a server-side cursor as
+    the batches are consumed.
+    """
+    property_types = _property_types(layer)
+    columns = [(key, key if key not in ('feature_id', 'geometry') else f'{key}_') for key in property_types]
+    schema = pa.schema(
+        [pa.field('feature_id', pa.string()), pa.field('geometry', pa.binary())]
+        + [pa.field(name, property_types[key]) for key, name in columns],
+        metadata=geo_metadata('geometry')
+    )
+
+    def batches():
+        table = ProjectLayerData._meta.db_table
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(
+                f"SELECT feature_id, ST_AsBinary(geometry), properties FROM {table} "
+                f"WHERE project_layer_id = %s ORDER BY id",
+                [layer.id]
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                properties = [
+                    json.loads(row[2]) if isinstance(row[2], str) else (row[2] or {})
+                    for row in rows
+                ]
+                arrays = [
+                    pa.array([row[0] for row in rows], type=pa.string()),
+                    pa.array([bytes(row[1]) if row[1] is not None else None for row in rows], type=pa.binary()),
+                ]
+                for key, name in columns:
+                    arrow_type = property_types[key]
+                    arrays.append(pa.array(
+                        [_property_value(props.get(key), arrow_type) for props in properties],
+                        type=arrow_type
+                    ))
+                yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    return schema, batches()
+
+
+def layer_columnar_stream(layer, output_format, batch_size=COLUMNAR_BATCH_SIZE):
+    """Yield a layer's features (see layer_record_batches) as Arrow IPC or Parquet."""
+    schema, batches = layer_record_batches(layer, batch_size)
+    return columnar_stream(batches, schema, output_format)
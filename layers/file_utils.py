@@ -1,19 +1,28 @@
 # layers/file_utils.py
 
+import io
+import json
 import os
 import uuid
 import tempfile
 import shutil
+from contextlib import contextmanager
 from pathlib import Path
 import geopandas as gpd
+import pandas as pd
+import shapely
 from django.conf import settings
+from django.db import connection, transaction
 from django.contrib.gis.geos import GEOSGeometry
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 import zipfile
 from django.utils import timezone
+from pyogrio.raw import open_arrow
 
-from layers.models import ProjectLayerData
+from layers.generalization import build_layer_generalization
+from layers.models import ProjectLayerData, GeneralizedGeometry
+from layers.search import build_layer_search_index
 
 
 def get_crs_from_file(file_path, file_type):
@@ -134,97 +143,146 @@ def detect_file_type(file_obj):
         return None
 
 
-def import_file_to_layer(layer, file_path, file_type, source_crs=None, target_crs='EPSG:4326'):
-    """
-    Import geospatial file contents to a layer.
-    """
-    try:
-        # Read the file with geopandas
-        if file_type == 'shp':
-            # Check if it's a zip file containing shapefile
-            if file_path.endswith('.zip'):
-                temp_dir = tempfile.mkdtemp()
-                try:
-                    with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                        zip_ref.extractall(temp_dir)
+IMPORT_BATCH_SIZE = 5000
 
-                    # Find .shp file in the extracted directory
-                    shp_files = list(Path(temp_dir).glob('**/*.shp'))
 
-                    if not shp_files:
-                        raise ValueError("No .shp file found in zip archive")
+def _zip_shapefile_member(zip_source):
+    """Name of the first .shp file inside a zip archive (path or file object)."""
+    with zipfile.ZipFile(zip_source) as archive:
+        for name in archive.namelist():
+            if name.lower().endswith('.shp') and not name.startswith('__MACOSX/'):
+                return name
+    raise ValueError("No .shp file found in zip archive")
 
-                    gdf = gpd.read_file(shp_files[0])
-                finally:
-                    shutil.rmtree(temp_dir)
-            else:
-                # Direct shapefile
-                gdf = gpd.read_file(file_path)
 
-        elif file_type == 'kml':
-            gdf = gpd.read_file(file_path, driver='KML')
+@contextmanager
+def readable_source(source):
+    """
+    Yield a path or bytes that pyogrio can read for an uploaded or stored file.
 
-        elif file_type == 'sqlite':
-            gdf = gpd.read_file(file_path)
-            print(gdf.head())
-            print(gdf.columns)
-            import fiona
-            print(fiona.listlayers(file_path))
+    Files on disk (including Django's temporary uploads) are read in place, with
+    zipped shapefiles opened through GDAL's /vsizip/ instead of being extracted.
+    In-memory uploads are handed over as bytes. GDAL can only find a shapefile at
+    the root of an in-memory zip, so nested in-memory archives are spilled to a
+    temporary file first.
+    """
+    if hasattr(source, 'temporary_file_path'):
+        source = source.temporary_file_path()
 
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if zipfile.is_zipfile(path):
+            yield f"/vsizip/{path}/{_zip_shapefile_member(path)}"
         else:
-            raise ValueError(f"Unsupported file type: {file_type}")
+            yield path
+        return
+
+    source.seek(0)
+    data = source.read()
+    buffer = io.BytesIO(data)
+    if zipfile.is_zipfile(buffer):
+        member = _zip_shapefile_member(buffer)
+        if '/' in member:
+            with tempfile.NamedTemporaryFile(suffix='.zip') as tmp:
+                tmp.write(data)
+                tmp.flush()
+                yield f"/vsizip/{tmp.name}/{member}"
+            return
+    yield data
+
+
+def delete_layer_features(layer):
+    """Delete all of a layer's features in bulk, skipping per-row delete signals."""
+    data_table = ProjectLayerData._meta.db_table
+    generalized_table = GeneralizedGeometry._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {generalized_table} g USING {data_table} d "
+            f"WHERE g.feature_id = d.id AND d.project_layer_id = %s",
+            [layer.id]
+        )
+        cursor.execute(f"DELETE FROM {data_table} WHERE project_layer_id = %s", [layer.id])
+        return cursor.rowcount
+
+
+def _batch_frame(batch, geometry_column, crs):
+    """GeoDataFrame for one Arrow record batch read by pyogrio (geometry as WKB)."""
+    frame = batch.to_pandas()
+    geometries = shapely.from_wkb(frame.pop(geometry_column).values)
+    return gpd.GeoDataFrame(frame, geometry=geometries, crs=crs)
+
+
+def _frame_features(layer, gdf, source_crs, target_crs):
+    """ProjectLayerData rows for one chunk of a file, reprojected to ``target_crs``."""
+    # Set CRS if specified and not defined in file
+    if source_crs and gdf.crs is None:
+        gdf = gdf.set_crs(source_crs)
+
+    # If CRS is still None, raise an error
+    if gdf.crs is None:
+        raise ValueError("No CRS defined in file and none provided")
+
+    # Reproject to target CRS if needed
+    if gdf.crs != target_crs:
+        gdf = gdf.to_crs(target_crs)
+    # A CRS without an EPSG code has no SRID; store it under the geometry column's SRID
+    srid = gdf.crs.to_epsg() or ProjectLayerData._meta.get_field('geometry').srid
+
+    # Rows without a geometry can't be stored
+    gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty]
+
+    # Convert whole columns at once: WKB for geometries, JSON-safe records for properties
+    geometries = shapely.to_wkb(gdf.geometry.values, include_srid=False)
+    properties = json.loads(
+        pd.DataFrame(gdf.drop(columns=gdf.geometry.name)).to_json(orient='records', date_format='iso')
+    )
+    return [
+        ProjectLayerData(project_layer=layer, geometry=GEOSGeometry(memoryview(wkb), srid=srid), properties=props)
+        for wkb, props in zip(geometries, properties)
+    ]
 
-        # Set CRS if specified and not defined in file
-        if source_crs and gdf.crs is None:
-            gdf.crs = source_crs
 
-        # If CRS is still None, raise an error
-        if gdf.crs is None:
-            raise ValueError("No CRS defined in file and none provided")
-
-        # Reproject to target CRS if needed
-        if gdf.crs != target_crs:
-            gdf = gdf.to_crs(target_crs)
-
-        # Import features to layer
-        features = []
-        for _, row in gdf.iterrows():
-            try:
-                wkt = row.geometry.wkt
-                geom = GEOSGeometry(wkt)
-
-                properties = {}
-                for col in gdf.columns:
-                    if col != 'geometry':
-                        value = row[col]
-                        if hasattr(value, 'item'):
-                            value = value.item()
-                        properties[col] = value
-
-                # Create feature object but don't save yet
-                feature = ProjectLayerData(
-                    project_layer=layer,
-                    geometry=geom,
-                    properties=properties
-                )
-                features.append(feature)
-
-            except Exception as e:
-                print(f"Error processing row: {e}")
-                continue
-
-        # Bulk insert in batches (PostgreSQL has a limit on parameters)
-        batch_size = 1000
-        for i in range(0, len(features), batch_size):
-            batch = features[i:i + batch_size]
-            ProjectLayerData.objects.bulk_create(batch)
-
-        features_count = len(features)
-        # Update layer with import stats
-        layer.feature_count = features_count
-        layer.last_data_update = timezone.now()
-        layer.upload_status = 'complete'
-        layer.save()
+def import_file_to_layer(layer, source, file_type, source_crs=None, target_crs='EPSG:4326', mode='append'):
+    """
+    Import geospatial file contents to a layer.
+
+    ``source`` is a file path or an uploaded file. The source is opened once
+    and read as a stream of IMPORT_BATCH_SIZE-feature Arrow batches; each is
+    reprojected, converted column-wise and written with bulk_create, so only
+    one batch is held in memory. With
+    ``mode='replace'`` the layer's existing features are deleted first; the
+    delete and the import happen in one transaction, so a failed import
+    leaves the layer as it was.
+    """
+    if mode not in ('append', 'replace'):
+        return False, 0, f"Unsupported import mode: {mode}"
+
+    try:
+        if file_type not in ('shp', 'kml', 'sqlite'):
+            raise ValueError(f"Unsupported file type: {file_type}")
+
+        with readable_source(source) as readable, transaction.atomic():
+            if mode == 'replace':
+                delete_layer_features(layer)
+
+            features_count = 0
+            with open_arrow(readable, batch_size=IMPORT_BATCH_SIZE, use_pyarrow=True) as (meta, reader):
+                geometry_column = meta['geometry_name'] or 'wkb_geometry'
+                for batch in reader:
+                    gdf = _batch_frame(batch, geometry_column, meta['crs'])
+                    features = _frame_features(layer, gdf, source_crs, target_crs)
+                    ProjectLayerData.objects.bulk_create(features)
+                    features_count += len(features)
+
+            build_layer_generalization(layer)
+            build_layer_search_index(layer)
+
+            # Update layer with import stats
+            layer.feature_count = layer.features.count()
+            layer.last_data_update = timezone.now()
+            layer.upload_status = 'complete'
+            layer.upload_error = None
+            layer.save()
 
         return True, features_count, None
 
@@ -234,4 +292,4 @@ def import_file_to_layer(layer, file_path, file_type, source_crs=None, target_cr
         layer.upload_error = str(e)
         layer.save()
 
-        return False, 0, str(e)
\ No newline at end of file
+        return False, 0, str(e)
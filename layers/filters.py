@@ -0,0 +1,135 @@
+# layers/filters.py
+import json
+import math
+
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+
+from .models import ProjectLayerData
+
+FILTER_OPS = ('eq', 'in', 'range', 'exists')
+MAX_CONDITIONS = 20
+MAX_IN_VALUES = 500
+MAX_FIELD_LENGTH = 255
+
+
+def _check_scalar(value, field):
+    if value is not None and not isinstance(value, (str, int, float, bool)):
+        raise ValueError(f'Filter value for "{field}" must be a string, number, boolean or null')
+    return value
+
+
+def _check_number(value, field):
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f'Range bounds for "{field}" must be numbers or null')
+    return value
+
+
+def parse_filter(raw):
+    """
+    Parse a feature filter expression.
+
+    The expression is JSON: a list of conditions (all of which must match), each
+    ``{"field": "carrier", "op": "eq", "value": "AT&T"}``. Supported ops are
+    ``eq``, ``in`` (value is a list), ``range`` (value is ``[min, max]``, either
+    bound may be null) and ``exists``. Returns a list of (field, op, value)
+    tuples and raises ValueError for anything malformed.
+    """
+    if raw in (None, '', []):
+        return []
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            raise ValueError('filter must be valid JSON')
+    if isinstance(raw, dict):
+        raw = [raw]
+    if not isinstance(raw, list):
+        raise ValueError('filter must be a list of conditions')
+    if len(raw) > MAX_CONDITIONS:
+        raise ValueError(f'At most {MAX_CONDITIONS} filter conditions are allowed')
+
+    conditions = []
+    for condition in raw:
+        if not isinstance(condition, dict):
+            raise ValueError('Each filter condition must be an object')
+
+        field = condition.get('field')
+        op = condition.get('op', 'eq')
+        value = condition.get('value')
+        if not isinstance(field, str) or not field or len(field) > MAX_FIELD_LENGTH:
+            raise ValueError('Each filter condition needs a field name')
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unknown filter op: {op}. Use one of: {', '.join(FILTER_OPS)}")
+
+        if op == 'eq':
+            value = _check_scalar(value, field)
+        elif op == 'in':
+            if not isinstance(value, list) or not value or len(value) > MAX_IN_VALUES:
+                raise ValueError(f'"in" filter for "{field}" needs a list of 1 to {MAX_IN_VALUES} values')
+            value = [_check_scalar(item, field) for item in value]
+        elif op == 'range':
+            if not isinstance(value, list) or len(value) != 2:
+                raise ValueError(f'"range" filter for "{field}" needs [min, max]')
+            value = [_check_number(bound, field) for bound in value]
+            if value == [None, None]:
+                raise ValueError(f'"range" filter for "{field}" needs at least one bound')
+        else:
+            value = None
+
+        conditions.append((field, op, value))
+    return conditions
+
+
+def _jsonpath_member(field):
+    escaped = field.replace('\\', '\\\\').replace('"', '\\"')
+    return f'$."{escaped}"'
+
+
+def compile_filter(conditions, alias='d'):
+    """
+    Compile parsed conditions into an SQL predicate over ``<alias>.properties``.
+
+    ``eq`` and ``in`` become JSONB containment (``@>``) tests, which the
+    ``jsonb_path_ops`` GIN index on properties answers directly. ``range``
+    and ``exists`` become jsonpath ``@?`` tests; that opclass supports the
+    operator but can't narrow a comparison or a bare key lookup, so only
+    equality/containment filters are index-assisted and the others are
+    checked row by row. All values are passed as parameters. Returns
+    (sql, params).
+    """
+    column = f'{alias}.properties'
+    clauses = []
+    params = []
+
+    for field, op, value in conditions:
+        if op == 'eq':
+            clauses.append(f'{column} @> %s::jsonb')
+            params.append(json.dumps({field: value}))
+        elif op == 'in':
+            clauses.append('(' + ' OR '.join([f'{column} @> %s::jsonb'] * len(value)) + ')')
+            params.extend(json.dumps({field: item}) for item in value)
+        elif op == 'range':
+            low, high = value
+            bounds = []
+            if low is not None:
+                bounds.append(f'@ >= {float(low)!r}')
+            if high is not None:
+                bounds.append(f'@ <= {float(high)!r}')
+            clauses.append(f'{column} @? %s::jsonpath')
+            params.append(f"{_jsonpath_member(field)} ? ({' && '.join(bounds)})")
+        elif op == 'exists':
+            clauses.append(f'{column} @? %s::jsonpath')
+            params.append(_jsonpath_member(field))
+
+    return ' AND '.join(clauses) or 'TRUE', params
+
+
+def apply_filter(queryset, conditions):
+    """Filter a ProjectLayerData queryset with parsed conditions."""
+    if not conditions:
+        return queryset
+    sql, params = compile_filter(conditions, alias=f'"{ProjectLayerData._meta.db_table}"')
+    return queryset.filter(RawSQL(sql, params, output_field=BooleanField()))
@@ -0,0 +1,86 @@
+# layers/formats.py
+import fcntl
+import glob
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pyarrow as pa
+from django.conf import settings
+from pyogrio.raw import write_arrow
+
+from .columnar import layer_record_batches
+
+
+def layer_data_version(layer):
+    """Version string that changes whenever a layer's features change."""
+    updated = layer.last_data_update or layer.updated_at
+    stamp = updated.strftime('%Y%m%d%H%M%S%f') if updated else '0'
+    return f"{stamp}-{layer.feature_count}"
+
+
+def _export_dir(layer):
+    # Not under MEDIA_ROOT: exports of private layers must only be served through the layer views
+    export_root = getattr(settings, 'LAYER_EXPORT_DIR', os.path.join(settings.BASE_DIR, 'layer_exports'))
+    path = os.path.join(export_root, str(layer.id))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@contextmanager
+def _export_lock(export_dir):
+    """Exclusive lock on a layer's export directory, held across threads and processes on this host."""
+    with open(os.path.join(export_dir, '.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_layer_flatgeobuf(layer):
+    """
+    Return the path of a FlatGeobuf file for the layer, building it if needed.
+
+    Files are written with a packed Hilbert R-tree so clients can fetch only the
+    features in their view with HTTP range requests. One file is kept per layer
+    and rebuilt when the layer's data version changes. Features are streamed
+    from the database to GDAL in record batches, so building the file never
+    holds the whole layer in memory, and concurrent requests for a version
+    that isn't built yet wait for a single build.
+    """
+    export_dir = _export_dir(layer)
+    path = os.path.join(export_dir, f"{layer_data_version(layer)}.fgb")
+    if os.path.exists(path):
+        return path
+
+    # Simultaneous first requests wait for one build instead of each exporting the layer
+    with _export_lock(export_dir):
+        if os.path.exists(path):
+            return path
+
+        schema, batches = layer_record_batches(layer)
+
+        # Not *.fgb, so the stale-file cleanup below can never match a build in progress
+        fd, tmp_path = tempfile.mkstemp(suffix='.fgb.tmp', dir=export_dir)
+        os.close(fd)
+        try:
+            write_arrow(
+                pa.RecordBatchReader.from_batches(schema, batches), tmp_path,
+                driver='FlatGeobuf', geometry_name='geometry', geometry_type='Unknown', crs='EPSG:4326',
+                SPATIAL_INDEX='YES'
+            )
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        # Drop files from older versions of the layer
+        for stale in glob.glob(os.path.join(export_dir, '*.fgb')):
+            if stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    return path
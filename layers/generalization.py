@@ -0,0 +1,85 @@
+# layers/generalization.py
+from django.db import connection, transaction
+
+from .models import ProjectLayerData, GeneralizedGeometry
+from .utils import simplify_geometry
+
+# (zoom_band, max_zoom): band N serves every zoom up to and including max_zoom.
+# Zooms above the last band get full-resolution geometry.
+ZOOM_BANDS = (
+    (0, 5),
+    (1, 8),
+    (2, 11),
+)
+
+# Features with fewer vertices than this are served as-is at every zoom
+MIN_POINTS_TO_GENERALIZE = 16
+
+
+def band_tolerance(max_zoom):
+    """Simplification tolerance in degrees: about one 256px tile pixel at max_zoom."""
+    return 360.0 / (256 * 2 ** max_zoom)
+
+
+def zoom_band_for(zoom):
+    """Return the zoom band used for a map zoom level, or None for full resolution."""
+    if zoom is None:
+        return None
+    for band, max_zoom in ZOOM_BANDS:
+        if zoom <= max_zoom:
+            return band
+    return None
+
+
+def build_layer_generalization(layer):
+    """
+    (Re)build the generalized geometries for every line and polygon feature of a layer.
+
+    Runs as set-based SQL inside PostGIS using ST_SimplifyPreserveTopology,
+    one INSERT ... SELECT per zoom band. Returns the number of rows written.
+    """
+    data_table = ProjectLayerData._meta.db_table
+    generalized_table = GeneralizedGeometry._meta.db_table
+    written = 0
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {generalized_table} g USING {data_table} d "
+            f"WHERE g.feature_id = d.id AND d.project_layer_id = %s",
+            [layer.id]
+        )
+
+        for band, max_zoom in ZOOM_BANDS:
+            cursor.execute(
+                f"""
+                INSERT INTO {generalized_table} (feature_id, zoom_band, geometry)
+                SELECT id, %s, ST_SimplifyPreserveTopology(geometry, %s)
+                FROM {data_table}
+                WHERE project_layer_id = %s
+                  AND ST_Dimension(geometry) > 0
+                  AND ST_NPoints(geometry) >= %s
+                """,
+                [band, band_tolerance(max_zoom), layer.id, MIN_POINTS_TO_GENERALIZE]
+            )
+            written += cursor.rowcount
+
+    return written
+
+
+def rebuild_feature_generalization(feature):
+    """Rebuild the generalized geometries of a single edited feature."""
+    with transaction.atomic():
+        GeneralizedGeometry.objects.filter(feature=feature).delete()
+
+        geometry = feature.geometry
+        if not geometry or geometry.dims < 1 or geometry.num_points < MIN_POINTS_TO_GENERALIZE:
+            return
+
+        GeneralizedGeometry.objects.bulk_create([
+            GeneralizedGeometry(
+                feature=feature,
+                zoom_band=band,
+                geometry=simplify_geometry(geometry, tolerance=band_tolerance(max_zoom))
+            )
+            for band, max_zoom in ZOOM_BANDS
+        ])
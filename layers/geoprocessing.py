@@ -0,0 +1,199 @@
+# layers/geoprocessing.py
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .file_utils import delete_layer_features
+from .generalization import build_layer_generalization
+from .jobs import set_job_progress
+from .models import ProjectLayer, ProjectLayerData
+from .queries import numeric_property_sql
+from .search import build_layer_search_index
+
+BUFFER_BATCH_SIZE = 2000
+MAX_BUFFER_DISTANCE = 500000  # metres
+
+
+def unique_layer_name(group, name):
+    """Return ``name``, suffixed if needed to be unique within the layer group."""
+    name = name[:100]
+    candidate = name
+    suffix = 2
+    while ProjectLayer.objects.filter(project_layer_group=group, name=candidate).exists():
+        tail = f" ({suffix})"
+        candidate = f"{name[:100 - len(tail)]}{tail}"
+        suffix += 1
+    return candidate
+
+
+def _buffer_expression(segments):
+    # Buffering the geography type keeps the distance in metres anywhere on the globe
+    return f"ST_Buffer(d.geometry::geography, %s, {int(segments)})::geometry"
+
+
+def buffer_layer(job):
+    """
+    Buffer every feature of ``job.source_layer`` into a new layer.
+
+    Runs as set-based INSERT ... SELECT statements in PostGIS. Without
+    dissolve, features are buffered in id-ordered batches (each keeping its
+    properties) and progress is reported per batch; with dissolve, all
+    buffers are merged with ST_Union into a single feature. Returns the new
+    layer; if a batch fails, the partly written layer is deleted.
+    """
+    source = job.source_layer
+    params = job.parameters
+    distance = float(params['distance'])
+    dissolve = bool(params.get('dissolve', False))
+    segments = int(params.get('segments', 8))
+    table = ProjectLayerData._meta.db_table
+
+    target = ProjectLayer.objects.create(
+        project_layer_group=source.project_layer_group,
+        layer_type_id=params.get('layer_type_id') or source.layer_type_id,
+        name=unique_layer_name(
+            source.project_layer_group,
+            params.get('name') or f"{source.name} buffer {distance:g}m"
+        ),
+        description=f"{distance:g} m buffer of {source.name}",
+        style=source.style,
+        is_public=source.is_public,
+        data_source=source.data_source,
+        attribution=source.attribution,
+        popup_template_id=source.popup_template_id,
+        upload_status='importing',
+    )
+
+    try:
+        with connection.cursor() as cursor:
+            if dissolve:
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table} (project_layer_id, geometry, properties, feature_id, created_at, bbox)
+                    SELECT %s, u.geom, %s::jsonb, %s, now(), ST_Envelope(u.geom)
+                    FROM (
+                        SELECT ST_Multi(ST_Union({_buffer_expression(segments)})) AS geom
+                        FROM {table} d
+                        WHERE d.project_layer_id = %s
+                    ) u
+                    WHERE u.geom IS NOT NULL
+                    """,
+                    [target.id, '{"dissolved": true}', 'dissolved', distance, source.id]
+                )
+            else:
+                cursor.execute(f"SELECT id FROM {table} WHERE project_layer_id = %s ORDER BY id", [source.id])
+                ids = [row[0] for row in cursor.fetchall()]
+
+                for start in range(0, len(ids), BUFFER_BATCH_SIZE):
+                    batch = ids[start:start + BUFFER_BATCH_SIZE]
+                    with transaction.atomic():
+                        cursor.execute(
+                            f"""
+                            INSERT INTO {table} (project_layer_id, geometry, properties, feature_id, created_at, bbox)
+                            SELECT %s, b.geom, b.properties, b.feature_id, now(), ST_Envelope(b.geom)
+                            FROM (
+                                SELECT {_buffer_expression(segments)} AS geom, d.properties, d.feature_id
+                                FROM {table} d
+                                WHERE d.project_layer_id = %s AND d.id BETWEEN %s AND %s
+                            ) b
+                            """,
+                            [target.id, distance, source.id, batch[0], batch[-1]]
+                        )
+                    set_job_progress(job, 90 * (start + len(batch)) / len(ids))
+    except Exception:
+        # Don't leave a half-buffered layer behind; the job records the error
+        delete_layer_features(target)
+        target.delete()
+        raise
+
+    build_layer_generalization(target)
+    build_layer_search_index(target)
+
+    target.upload_status = 'complete'
+    target.feature_count = target.features.count()
+    target.last_data_update = timezone.now()
+    target.save(update_fields=['upload_status', 'feature_count', 'last_data_update', 'updated_at'])
+    return target
+
+
+def spatial_join_counts(polygon_layer, point_layer, count_property='point_count', sum_field=None,
+                        sum_property=None, output='properties', name=None):
+    """
+    Count (and optionally sum a numeric property of) ``point_layer`` features in each polygon.
+
+    Runs as one statement in PostGIS: a LATERAL subquery per polygon finds the
+    intersecting features through the geometry index. With
+    ``output='properties'`` the results are merged into the polygon features'
+    properties; with ``output='layer'`` the polygons are copied with the
+    results into a new layer in the same group. Returns (layer written to,
+    number of polygons written).
+    """
+    if output not in ('properties', 'layer'):
+        raise ValueError('output must be "properties" or "layer"')
+
+    table = ProjectLayerData._meta.db_table
+    sum_property = sum_property or (f"{sum_field}_sum" if sum_field else None)
+
+    if sum_field:
+        result_sql = 'jsonb_build_object(%s::text, j.n, %s::text, j.total)'
+        result_params = [count_property, sum_property]
+        total_sql = f"sum({numeric_property_sql('pt')})"
+        total_params = [sum_field, sum_field]
+    else:
+        result_sql = 'jsonb_build_object(%s::text, j.n)'
+        result_params = [count_property]
+        total_sql = 'NULL::double precision'
+        total_params = []
+
+    joined = f"""
+        FROM {table} p
+        CROSS JOIN LATERAL (
+            SELECT count(pt.id) AS n, {total_sql} AS total
+            FROM {table} pt
+            WHERE pt.project_layer_id = %s AND ST_Intersects(p.geometry, pt.geometry)
+        ) j
+        WHERE p.project_layer_id = %s
+    """
+    joined_params = [*total_params, point_layer.id, polygon_layer.id]
+
+    with transaction.atomic():
+        if output == 'layer':
+            target = ProjectLayer.objects.create(
+                project_layer_group=polygon_layer.project_layer_group,
+                layer_type_id=polygon_layer.layer_type_id,
+                name=unique_layer_name(
+                    polygon_layer.project_layer_group,
+                    name or f"{polygon_layer.name} x {point_layer.name}"
+                ),
+                description=f"{polygon_layer.name} joined with {point_layer.name}",
+                style=polygon_layer.style,
+                is_public=polygon_layer.is_public,
+                popup_template_id=polygon_layer.popup_template_id,
+                upload_status='complete',
+            )
+            sql = f"""
+                INSERT INTO {table} (project_layer_id, geometry, properties, feature_id, created_at, bbox)
+                SELECT %s, p.geometry, p.properties || {result_sql}, p.feature_id, now(), p.bbox
+                {joined}
+            """
+            params = [target.id, *result_params, *joined_params]
+        else:
+            target = polygon_layer
+            sql = f"""
+                UPDATE {table} d
+                SET properties = d.properties || r.result
+                FROM (SELECT p.id, {result_sql} AS result {joined}) r
+                WHERE d.id = r.id
+            """
+            params = [*result_params, *joined_params]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            written = cursor.rowcount
+
+        if output == 'layer':
+            build_layer_generalization(target)
+        build_layer_search_index(target)
+        # Refreshes last_data_update so cached renderings of the layer are rebuilt
+        target.update_feature_count()
+
+    return target, written
@@ -0,0 +1,115 @@
+# layers/jobs.py
+import logging
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import LayerJob
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'LAYER_JOB_WORKERS', 2),
+    thread_name_prefix='layer-job'
+)
+
+# Jobs created before this process started can't be on its executor
+_started_at = timezone.now()
+
+
+def _worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def set_job_progress(job, progress):
+    """Record a job's progress (0-100) without touching its other fields."""
+    job.progress = max(0, min(int(progress), 100))
+    LayerJob.objects.filter(pk=job.pk).update(progress=job.progress, updated_at=timezone.now())
+
+
+def _run(job_id, task):
+    close_old_connections()
+    try:
+        # A job already marked failed (e.g. as orphaned) is not started
+        if not LayerJob.objects.filter(pk=job_id, status='pending').update(
+                status='running', updated_at=timezone.now()):
+            return
+        job = LayerJob.objects.get(pk=job_id)
+
+        result_layer = task(job)
+
+        LayerJob.objects.filter(pk=job_id).update(
+            status='complete',
+            progress=100,
+            result_layer=result_layer,
+            completed_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+    except Exception as e:
+        logger.exception("Layer job %s failed", job_id)
+        LayerJob.objects.filter(pk=job_id).update(
+            status='failed',
+            error=str(e),
+            completed_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+    finally:
+        # Worker threads hold their own connections; don't leak them
+        connection.close()
+
+
+def submit_job(job, task):
+    """
+    Run ``task(job)`` on the background executor once the current transaction commits.
+
+    ``task`` returns the layer it produced (or None). The job's status,
+    progress, result and error are kept up to date on the LayerJob row.
+    """
+    job.worker = _worker_id()
+    LayerJob.objects.filter(pk=job.pk).update(worker=job.worker)
+    transaction.on_commit(lambda: _executor.submit(_run, job.pk, task))
+
+
+def fail_orphaned_jobs():
+    """
+    Mark pending or running jobs whose process has exited as failed.
+
+    Jobs run on an in-process executor and die with it. A job created before
+    this process started is orphaned when it has no worker, when it ran on
+    this host under a pid that no longer exists, or under this process's own
+    pid (reused after a restart). Jobs on other hosts are left to their own
+    processes. Returns the number of jobs marked failed.
+    """
+    host = socket.gethostname()
+    candidates = LayerJob.objects.filter(status__in=('pending', 'running'), created_at__lt=_started_at)
+
+    orphaned = []
+    for job_id, worker in candidates.values_list('id', 'worker'):
+        worker_host, _, pid = worker.rpartition(':')
+        if not worker:
+            orphaned.append(job_id)
+        elif worker_host == host and pid.isdigit() and (int(pid) == os.getpid() or not _process_alive(int(pid))):
+            orphaned.append(job_id)
+
+    if not orphaned:
+        return 0
+    return LayerJob.objects.filter(id__in=orphaned, status__in=('pending', 'running')).update(
+        status='failed',
+        error='Interrupted: the process running this job exited',
+        completed_at=timezone.now(),
+        updated_at=timezone.now()
+    )
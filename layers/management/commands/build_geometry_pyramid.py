@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from layers.generalization import build_layer_generalization
+from layers.models import ProjectLayer
+
+
+class Command(BaseCommand):
+    help = 'Builds the zoom-band generalized geometries for line and polygon layers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--layer-id',
+            type=int,
+            action='append',
+            help='Layer to rebuild (repeatable); defaults to every layer'
+        )
+
+    def handle(self, *args, **options):
+        layers = ProjectLayer.objects.all()
+        if options.get('layer_id'):
+            layers = layers.filter(id__in=options['layer_id'])
+            if not layers.exists():
+                raise CommandError('No matching layers found')
+
+        for layer in layers:
+            written = build_layer_generalization(layer)
+            self.stdout.write(f'Layer {layer.id} ({layer.name}): {written} generalized geometries')
+
+        self.stdout.write(self.style.SUCCESS('Geometry pyramid built'))
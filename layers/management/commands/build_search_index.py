@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from layers.models import ProjectLayer
+from layers.search import build_layer_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the trigram search text of layer features'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--layer-id',
+            type=int,
+            action='append',
+            help='Layer to rebuild (repeatable); defaults to every layer'
+        )
+
+    def handle(self, *args, **options):
+        layers = ProjectLayer.objects.all()
+        if options.get('layer_id'):
+            layers = layers.filter(id__in=options['layer_id'])
+            if not layers.exists():
+                raise CommandError('No matching layers found')
+
+        for layer in layers:
+            updated = build_layer_search_index(layer)
+            self.stdout.write(f'Layer {layer.id} ({layer.name}): {updated} features indexed')
+
+        self.stdout.write(self.style.SUCCESS('Search index built'))
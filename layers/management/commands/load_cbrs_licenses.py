@@ -0,0 +1,63 @@
+import csv
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from layers.cbrs import invalidate_cbrs_index
+from layers.models import CBRSLicense
+
+REQUIRED_COLUMNS = ('county_fips', 'county_name', 'state_abbr', 'channel', 'bidder')
+
+
+class Command(BaseCommand):
+    help = ("Loads CBRS PAL licenses from a CSV (county_fips, county_name, state_abbr, channel, bidder "
+            "and optional license_date, frequency_mhz), replacing the licenses of every state in the file")
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='License CSV file')
+
+    def handle(self, *args, **options):
+        path = options['csv_file']
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                rows = list(csv.DictReader(f))
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        if not rows:
+            raise CommandError(f'{path} has no licenses')
+        missing = [column for column in REQUIRED_COLUMNS if column not in rows[0]]
+        if missing:
+            raise CommandError(f"{path} is missing columns: {', '.join(missing)}")
+
+        licenses = {}
+        for line, row in enumerate(rows, start=2):
+            try:
+                license_date = date.fromisoformat(row['license_date']) if row.get('license_date') else None
+                frequency = float(row['frequency_mhz']) if row.get('frequency_mhz') else None
+            except ValueError as e:
+                raise CommandError(f'{path} line {line}: {e}')
+
+            license = CBRSLicense(
+                county_fips=row['county_fips'].strip(),
+                county_name=row['county_name'].strip(),
+                state_abbr=row['state_abbr'].strip().upper(),
+                channel=row['channel'].strip(),
+                bidder=row['bidder'].strip(),
+                license_date=license_date,
+                frequency_mhz=frequency,
+            )
+            # Later rows win on the unique (state, county, channel, bidder) key
+            licenses[(license.state_abbr, license.county_fips, license.channel, license.bidder)] = license
+
+        states = sorted({license.state_abbr for license in licenses.values()})
+        with transaction.atomic():
+            deleted, _ = CBRSLicense.objects.filter(state_abbr__in=states).delete()
+            CBRSLicense.objects.bulk_create(licenses.values(), batch_size=1000)
+
+        # Bulk writes don't send signals; rebuild this process's index now
+        invalidate_cbrs_index()
+
+        self.stdout.write(f"{', '.join(states)}: {deleted} licenses replaced by {len(licenses)}")
+        self.stdout.write(self.style.SUCCESS('CBRS licenses loaded'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:05
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('layers', '0007_remove_cbrslicense_cbrs_licens_state_f_4a8266_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectlayer',
+            name='coordinate_precision',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Decimal places for output coordinates (6 is sub-metre); empty for full precision', null=True, validators=[django.core.validators.MaxValueValidator(15)]),
+        ),
+    ]
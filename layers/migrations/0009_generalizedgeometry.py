@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:40
+
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('layers', '0008_projectlayer_coordinate_precision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneralizedGeometry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom_band', models.PositiveSmallIntegerField()),
+                ('geometry', django.contrib.gis.db.models.fields.GeometryField(srid=4326)),
+                ('feature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generalized_geometries', to='layers.projectlayerdata')),
+            ],
+            options={
+                'db_table': 'project_layer_data_generalized_wiroi_online',
+                'unique_together': {('feature', 'zoom_band')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:20
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('layers', '0010_layerjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectlayerdata',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['properties'], name='layer_data_props_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
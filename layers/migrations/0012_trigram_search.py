@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:05
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('layers', '0011_projectlayerdata_layer_data_props_gin'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='projectlayer',
+            name='search_fields',
+            field=models.JSONField(blank=True, default=list, help_text='Property keys matched by project search; empty searches every property'),
+        ),
+        migrations.AddField(
+            model_name='projectlayerdata',
+            name='search_text',
+            field=models.TextField(blank=True, null=True),
+        ),
+        # Existing layers have no search_fields yet, so index every property value
+        migrations.RunSQL(
+            sql="""
+                UPDATE project_layer_data_wiroi_online d
+                SET search_text = NULLIF(left(lower(
+                    (SELECT string_agg(value, ' ') FROM jsonb_each_text(d.properties))
+                ), 1000), '')
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='projectlayerdata',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='layer_data_search_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
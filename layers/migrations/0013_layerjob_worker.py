@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('layers', '0012_trigram_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='layerjob',
+            name='worker',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
@@ -1,10 +1,13 @@
 # layers/models.py
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 import uuid
 from django.contrib.gis.gdal import SpatialReference
 
+from .utils import build_search_text
+
 
 class LayerType(models.Model):
     """
@@ -104,6 +107,17 @@ class ProjectLayer(models.Model):
     clustering_options = models.JSONField(default=dict, blank=True)
     enable_labels = models.BooleanField(default=False)
     label_options = models.JSONField(default=dict, blank=True)
+    search_fields = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Property keys matched by project search; empty searches every property"
+    )
+    coordinate_precision = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        validators=[MaxValueValidator(15)],
+        help_text="Decimal places for output coordinates (6 is sub-metre); empty for full precision"
+    )
 
     # Foreign keys that will be implemented in other apps
     # These will be commented out until those apps exist
@@ -214,11 +228,17 @@ class ProjectLayerData(models.Model):
     # Optional bounding box for quick spatial queries
     bbox = models.PolygonField(null=True, blank=True, srid=4326)
 
+    # Lower-cased property text used by trigram search (see layers.search)
+    search_text = models.TextField(null=True, blank=True)
+
     class Meta:
         db_table = 'project_layer_data_wiroi_online'
         indexes = [
             models.Index(fields=['project_layer', 'feature_id']),
             models.Index(fields=['project_layer', 'created_at']),
+            # Serves JSONB containment filters on properties (see layers.filters)
+            GinIndex(fields=['properties'], opclasses=['jsonb_path_ops'], name='layer_data_props_gin'),
+            GinIndex(fields=['search_text'], opclasses=['gin_trgm_ops'], name='layer_data_search_trgm'),
         ]
 
     def __str__(self):
@@ -248,6 +268,11 @@ class ProjectLayerData(models.Model):
                 # For other geometry types, use the envelope
                 self.bbox = self.geometry.envelope
 
+        self.search_text = build_search_text(self.properties, self.project_layer.search_fields)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'properties' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
+
         # Save the feature
         super().save(*args, **kwargs)
 
@@ -311,4 +336,81 @@ class CBRSLicense(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.county_name}, {self.state_abbr} - Channel {self.channel} - {self.bidder}"
\ No newline at end of file
+        return f"{self.county_name}, {self.state_abbr} - Channel {self.channel} - {self.bidder}"
+
+
+class GeneralizedGeometry(models.Model):
+    """
+    Simplified copy of a feature's geometry for one zoom band.
+
+    Built at import time and served instead of the full-resolution geometry
+    when a client requests data for a low zoom level.
+    """
+    feature = models.ForeignKey(
+        ProjectLayerData,
+        on_delete=models.CASCADE,
+        related_name='generalized_geometries'
+    )
+    zoom_band = models.PositiveSmallIntegerField()
+    geometry = models.GeometryField(srid=4326)
+
+    class Meta:
+        db_table = 'project_layer_data_generalized_wiroi_online'
+        unique_together = ('feature', 'zoom_band')
+
+    def __str__(self):
+        return f"Feature {self.feature_id} - band {self.zoom_band}"
+
+
+class LayerJob(models.Model):
+    """
+    Long-running geoprocessing operation on a layer, run in the background.
+
+    Clients poll the job for status and progress; when it completes,
+    ``result_layer`` points at the layer it produced.
+    """
+    source_layer = models.ForeignKey(
+        ProjectLayer,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='jobs'
+    )
+    result_layer = models.ForeignKey(
+        ProjectLayer,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='created_by_jobs'
+    )
+    job_type = models.CharField(
+        max_length=50,
+        choices=[
+            ("buffer", "Buffer"),
+        ]
+    )
+    parameters = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        default="pending",
+        choices=[
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("complete", "Complete"),
+            ("failed", "Failed")
+        ]
+    )
+    progress = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    # host:pid of the process whose executor runs the job
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_by_user = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'layer_jobs_wiroi_online'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_job_type_display()} job {self.id} - {self.status}"
@@ -0,0 +1,90 @@
+# layers/popups.py
+from django.conf import settings
+from django.utils.html import conditional_escape
+
+from .formats import layer_data_version
+from .utils import LRUCache, TEMPLATE_PLACEHOLDER_RE, strip_property_prefix
+
+# Outer cache holds one LRU of feature popups per recently used layer
+_layer_caches = LRUCache(maxsize=getattr(settings, 'POPUP_CACHE_LAYERS', 64))
+
+
+def render_popup_html(template, properties):
+    """
+    Fill a PopupTemplate's {{placeholder}} slots from feature properties.
+
+    Placeholders are resolved through field_mappings, falling back to a
+    property of the same name. Values are HTML-escaped: properties come from
+    uploaded data and popups are served to anonymous viewers, so markup in a
+    property is shown as text rather than run.
+    """
+    mappings = template.field_mappings or {}
+
+    def replace(match):
+        placeholder = match.group(1)
+        target = mappings.get(placeholder, placeholder)
+        value = properties.get(strip_property_prefix(target)) if isinstance(target, str) else None
+        return '' if value is None else conditional_escape(str(value))
+
+    return TEMPLATE_PLACEHOLDER_RE.sub(replace, template.html_template or '')
+
+
+def _cache_for_layer(layer):
+    """Per-layer popup cache, dropped whenever the layer's data or template changes."""
+    template = layer.popup_template
+    version = (
+        layer_data_version(layer),
+        template.id if template else None,
+        template.updated_at if template else None,
+    )
+
+    entry = _layer_caches.get(layer.id)
+    if entry is None or entry[0] != version:
+        entry = (version, LRUCache(maxsize=getattr(settings, 'POPUP_CACHE_SIZE', 1000)))
+        _layer_caches.set(layer.id, entry)
+    return entry[1]
+
+
+def get_feature_popup(layer, feature_id, render=False):
+    """
+    Return the popup payload for one feature of a layer, or None if it does not exist.
+
+    The full properties (and the rendered template when ``render`` is set)
+    are cached per layer, so repeated clicks on the same features do not
+    touch the database.
+    """
+    cache = _cache_for_layer(layer)
+    payload = cache.get(feature_id)
+
+    if payload is None:
+        feature = (
+            layer.features.filter(feature_id=feature_id)
+            .order_by('id')
+            .values('feature_id', 'properties')
+            .first()
+        )
+        if feature is None:
+            return None
+
+        payload = {
+            'layer_id': layer.id,
+            'feature_id': feature['feature_id'],
+            'properties': feature['properties'] or {},
+        }
+        cache.set(feature_id, payload)
+
+    template = layer.popup_template
+    if render and template and 'html' not in payload:
+        payload = {
+            **payload,
+            'html': render_popup_html(template, payload['properties']),
+            'css_styles': template.css_styles,
+            'max_width': template.max_width,
+            'max_height': template.max_height,
+        }
+        cache.set(feature_id, payload)
+
+    if not render and 'html' in payload:
+        payload = {key: payload[key] for key in ('layer_id', 'feature_id', 'properties')}
+
+    return payload
@@ -0,0 +1,237 @@
+# layers/queries.py
+import json
+
+from django.db import connection
+
+from .models import ProjectLayerData, GeneralizedGeometry
+from .utils import get_referenced_property_keys
+
+# Digits used when neither the request nor the layer asks for rounding.
+# Matches the precision GEOS emits, so unrounded output is unchanged.
+FULL_PRECISION = 15
+MAX_PRECISION = 15
+
+
+def resolve_precision(raw_value, layer):
+    """
+    Work out the coordinate precision for a request.
+
+    An explicit ``precision`` query parameter wins, then the layer's
+    ``coordinate_precision`` default. Returns None for full precision and
+    raises ValueError for invalid input.
+    """
+    if raw_value in (None, ''):
+        return layer.coordinate_precision
+
+    precision = int(raw_value)
+    if precision < 0 or precision > MAX_PRECISION:
+        raise ValueError(f'precision must be between 0 and {MAX_PRECISION}')
+    return precision
+
+
+MAX_PROJECTED_FIELDS = 100
+
+
+def parse_fields(query_params, layer):
+    """
+    Work out which property keys a request wants.
+
+    ``fields=a,b,c`` selects keys explicitly. ``properties=referenced``
+    selects only the keys the layer's popup template, style and labels use,
+    and ``properties=style`` drops the popup keys so popups can be fetched
+    per feature on click. Returns None when all properties should be returned.
+    """
+    fields = query_params.get('fields')
+    mode = query_params.get('properties')
+    if fields:
+        keys = [key.strip() for key in fields.split(',') if key.strip()]
+    elif mode == 'referenced':
+        keys = get_referenced_property_keys(layer)
+    elif mode == 'style':
+        keys = get_referenced_property_keys(layer, include_popup=False)
+    elif mode in (None, '', 'all'):
+        return None
+    else:
+        raise ValueError(f'Unknown properties mode: {mode}')
+
+    if len(keys) > MAX_PROJECTED_FIELDS:
+        raise ValueError(f'At most {MAX_PROJECTED_FIELDS} fields can be selected')
+    return list(dict.fromkeys(keys))
+
+
+def properties_sql(fields, alias='d'):
+    """SQL expression (and params) for a feature's properties, projected to ``fields``."""
+    if fields is None:
+        return f"COALESCE({alias}.properties::text, '{{}}')", []
+    if not fields:
+        return "'{}'", []
+
+    pairs = ', '.join([f'%s::text, {alias}.properties -> %s::text'] * len(fields))
+    params = [value for key in fields for value in (key, key)]
+    return f'jsonb_build_object({pairs})::text', params
+
+
+def numeric_property_sql(alias='d'):
+    """
+    SQL expression for a property's value as a double, NULL when it isn't a JSON number.
+
+    Takes the property key twice as parameters.
+    """
+    return (
+        f"CASE WHEN jsonb_typeof({alias}.properties -> %s) = 'number' "
+        f"THEN ({alias}.properties ->> %s)::double precision END"
+    )
+
+
+def fetch_feature_json(layer, offset, limit, precision=None, zoom_band=None, fields=None, where=None):
+    """
+    Return the GeoJSON Feature strings for a slice of a layer's features.
+
+    Features are encoded entirely in PostGIS, with ST_AsGeoJSON rounding
+    coordinates to ``precision`` decimal places, so no geometry is parsed or
+    re-serialized in Python. When ``zoom_band`` is given, the generalized
+    geometry for that band is used where one exists, and ``fields`` limits
+    the properties to the listed keys. ``where`` is an extra (sql, params)
+    predicate over ``d``, as built by ``layers.filters.compile_filter``.
+    """
+    table = ProjectLayerData._meta.db_table
+    digits = FULL_PRECISION if precision is None else precision
+    properties, properties_params = properties_sql(fields)
+    params = [digits, *properties_params]
+
+    if zoom_band is not None:
+        geometry = 'COALESCE(g.geometry, d.geometry)'
+        join = (
+            f'LEFT JOIN {GeneralizedGeometry._meta.db_table} g '
+            f'ON g.feature_id = d.id AND g.zoom_band = %s'
+        )
+        params.append(zoom_band)
+    else:
+        geometry = 'd.geometry'
+        join = ''
+
+    sql = f"""
+        SELECT '{{"type":"Feature","geometry":' || ST_AsGeoJSON({geometry}, %s)
+               || ',"properties":' || {properties}
+               || COALESCE(',"id":' || to_json(NULLIF(d.feature_id, ''))::text, '')
+               || '}}'
+        FROM {table} d
+        {join}
+        WHERE d.project_layer_id = %s {'AND ' + where[0] if where else ''}
+        ORDER BY d.id
+        LIMIT %s OFFSET %s
+    """
+    params.append(layer.id)
+    if where:
+        params.extend(where[1])
+    params.extend([limit, offset])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def degrees_per_pixel(zoom):
+    """Width of one 256px-tile pixel in degrees of longitude at a zoom level."""
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def identify_features(layers, lng, lat, tolerance, limit_per_layer=10, with_geometry=False, precision=None):
+    """
+    Find the features of several layers within ``tolerance`` degrees of a point.
+
+    Runs one UNION ALL query with a branch per layer, each using ST_DWithin on
+    the geometry index and returning the ``limit_per_layer`` closest hits.
+    Returns dicts with layer_id, feature_id, properties, distance (metres) and,
+    if requested, the GeoJSON geometry, closest first within each layer.
+    """
+    if not layers:
+        return []
+
+    table = ProjectLayerData._meta.db_table
+    digits = FULL_PRECISION if precision is None else precision
+    geometry_sql = f'ST_AsGeoJSON(d.geometry, {int(digits)})' if with_geometry else 'NULL'
+    point = 'ST_SetSRID(ST_MakePoint(%s, %s), 4326)'
+
+    branches = []
+    params = []
+    for layer in layers:
+        branches.append(f"""
+            (SELECT d.project_layer_id, d.feature_id, d.properties::text, {geometry_sql},
+                    ST_Distance(d.geometry::geography, {point}::geography)
+             FROM {table} d
+             WHERE d.project_layer_id = %s AND ST_DWithin(d.geometry, {point}, %s)
+             ORDER BY d.geometry <-> {point}
+             LIMIT %s)
+        """)
+        params.extend([lng, lat, layer.id, lng, lat, tolerance, lng, lat, limit_per_layer])
+
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(branches), params)
+        rows = cursor.fetchall()
+
+    hits = []
+    for layer_id, feature_id, properties, geometry, distance in rows:
+        hit = {
+            'layer_id': layer_id,
+            'feature_id': feature_id,
+            'properties': json.loads(properties) if properties else {},
+            'distance': round(distance, 2),
+        }
+        if with_geometry:
+            hit['geometry'] = json.loads(geometry)
+        hits.append(hit)
+    return hits
+
+
+MAX_NEAREST = 100
+
+
+def nearest_features(layer, lng, lat, k=1, max_distance=None, with_geometry=False, precision=None):
+    """
+    Return the ``k`` features of a layer nearest to a point, with distances in metres.
+
+    Candidates come from a KNN (``<->``) scan of the geometry index in degrees;
+    a few extra are fetched and re-ranked by geodesic distance, since degree
+    distances are stretched east-west away from the equator. ``max_distance``
+    (metres) drops anything farther away.
+    """
+    table = ProjectLayerData._meta.db_table
+    digits = FULL_PRECISION if precision is None else precision
+    geometry_sql = f'ST_AsGeoJSON(c.geometry, {int(digits)})' if with_geometry else 'NULL'
+    point = 'ST_SetSRID(ST_MakePoint(%s, %s), 4326)'
+    candidates = k * 4 + 10
+
+    sql = f"""
+        SELECT c.feature_id, c.properties::text, {geometry_sql}, x.distance
+        FROM (
+            SELECT d.feature_id, d.properties, d.geometry
+            FROM {table} d
+            WHERE d.project_layer_id = %s
+            ORDER BY d.geometry <-> {point}
+            LIMIT %s
+        ) c
+        CROSS JOIN LATERAL (
+            SELECT ST_Distance(c.geometry::geography, {point}::geography) AS distance
+        ) x
+        WHERE %s::double precision IS NULL OR x.distance <= %s
+        ORDER BY x.distance
+        LIMIT %s
+    """
+    params = [layer.id, lng, lat, candidates, lng, lat, max_distance, max_distance, k]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    results = []
+    for feature_id, properties, geometry, distance in rows:
+        result = {
+            'feature_id': feature_id,
+            'properties': json.loads(properties) if properties else {},
+            'distance': round(distance, 2),
+        }
+        if with_geometry:
+            result['geometry'] = json.loads(geometry)
+        results.append(result)
+    return results
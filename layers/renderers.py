@@ -0,0 +1,43 @@
+# layers/renderers.py
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+
+class FlatGeobufRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept ?format=fgb.
+
+    Views answer these requests with a file response directly, so this renderer
+    only passes through already-encoded bytes; anything else (errors) is sent
+    as JSON.
+    """
+    media_type = 'application/flatgeobuf'
+    format = 'fgb'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, bytearray)):
+            return data
+
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = JSONRenderer.media_type
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+
+class ArrowRenderer(FlatGeobufRenderer):
+    """Lets content negotiation accept ?format=arrow (Arrow IPC stream)."""
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+
+
+class ParquetRenderer(FlatGeobufRenderer):
+    """Lets content negotiation accept ?format=parquet."""
+    media_type = 'application/vnd.apache.parquet'
+    format = 'parquet'
+
+
+LAYER_DATA_RENDERERS = list(api_settings.DEFAULT_RENDERER_CLASSES) + [
+    FlatGeobufRenderer, ArrowRenderer, ParquetRenderer
+]
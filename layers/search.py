@@ -0,0 +1,78 @@
+# layers/search.py
+import json
+
+from django.db import connection
+
+from .models import ProjectLayerData
+from .utils import MAX_SEARCH_TEXT_LENGTH
+
+MIN_QUERY_LENGTH = 2
+MAX_RESULTS = 50
+
+
+def search_text_sql(fields, alias='d'):
+    """SQL expression (and params) for a feature's search text; see ``utils.build_search_text``."""
+    if fields:
+        values = ', '.join([f'{alias}.properties ->> %s'] * len(fields))
+        expression = f'concat_ws(\' \', {values})'
+        params = list(fields)
+    else:
+        expression = f'(SELECT string_agg(value, \' \') FROM jsonb_each_text({alias}.properties))'
+        params = []
+    return f"NULLIF(left(lower({expression}), {MAX_SEARCH_TEXT_LENGTH}), '')", params
+
+
+def build_layer_search_index(layer):
+    """Recompute the search text of every feature in a layer. Returns the number of rows updated."""
+    table = ProjectLayerData._meta.db_table
+    expression, params = search_text_sql(layer.search_fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} d SET search_text = {expression} WHERE d.project_layer_id = %s",
+            [*params, layer.id]
+        )
+        return cursor.rowcount
+
+
+def search_features(layers, query, limit=20):
+    """
+    Rank features of ``layers`` against a search query with pg_trgm.
+
+    Matches substrings (ILIKE) and fuzzy word matches (``<%``), both answered
+    by the trigram GIN index on search_text, ranked by word similarity. Returns
+    dicts with layer_id, feature_id, score, centroid [lng, lat] and properties.
+    """
+    query = query.strip().lower()
+    if len(query) < MIN_QUERY_LENGTH:
+        raise ValueError(f'Search query must be at least {MIN_QUERY_LENGTH} characters')
+    if not layers:
+        return []
+
+    table = ProjectLayerData._meta.db_table
+    pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    sql = f"""
+        SELECT d.project_layer_id, d.feature_id, word_similarity(%s, d.search_text) AS score,
+               ST_X(ST_PointOnSurface(d.geometry)), ST_Y(ST_PointOnSurface(d.geometry)),
+               d.properties::text
+        FROM {table} d
+        WHERE d.project_layer_id = ANY(%s)
+          AND (d.search_text ILIKE %s OR %s <%% d.search_text)
+        ORDER BY score DESC, d.id
+        LIMIT %s
+    """
+    params = [query, [layer.id for layer in layers], pattern, query, max(1, min(limit, MAX_RESULTS))]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'layer_id': layer_id,
+            'feature_id': feature_id,
+            'score': round(score, 3),
+            'centroid': [lng, lat],
+            'properties': json.loads(properties) if properties else {},
+        }
+        for layer_id, feature_id, score, lng, lat, properties in rows
+    ]
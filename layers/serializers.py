@@ -1,7 +1,11 @@
 # layers/serializers.py
+import json
 from rest_framework import serializers
 from django.contrib.gis.geos import GEOSGeometry
-from .models import LayerType, ProjectLayerGroup, ProjectLayer, ProjectLayerData, LayerPermission, CBRSLicense
+from .models import (
+    LayerType, ProjectLayerGroup, ProjectLayer, ProjectLayerData, LayerPermission, CBRSLicense, LayerJob
+)
+from .utils import quantize_geometry
 
 
 class LayerTypeSerializer(serializers.ModelSerializer):
@@ -31,7 +35,7 @@ class ProjectLayerSerializer(serializers.ModelSerializer):
             'min_zoom_visibility', 'max_zoom_visibility', 'marker_type',
             'marker_image_url', 'marker_options', 'enable_clustering',
             'clustering_options', 'enable_labels', 'label_options',
-            'feature_count', 'data_source', 'attribution',
+            'coordinate_precision', 'search_fields', 'feature_count', 'data_source', 'attribution',
             'created_at', 'updated_at', 'last_data_update'
         )
         read_only_fields = ('created_at', 'updated_at', 'feature_count', 'last_data_update')
@@ -89,12 +93,17 @@ class GeoJSONFeatureCollectionSerializer(serializers.Serializer):
 
     def get_features(self, layer):
         """Convert all features to GeoJSON Feature objects."""
+        precision = self.context.get('precision')
         features = []
         for feature in layer.features.all():
+            geometry = feature.geometry.json
+            if precision is not None:
+                geometry = json.dumps(quantize_geometry(json.loads(geometry), precision))
+
             geo_feature = {
                 'type': 'Feature',
                 'id': feature.feature_id,
-                'geometry': feature.geometry.json,
+                'geometry': geometry,
                 'properties': feature.properties
             }
             features.append(geo_feature)
@@ -115,6 +124,19 @@ class LayerPermissionSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('created_at', 'updated_at')
 
+class LayerJobSerializer(serializers.ModelSerializer):
+    source_layer_name = serializers.ReadOnlyField(source='source_layer.name')
+    result_layer_name = serializers.ReadOnlyField(source='result_layer.name')
+
+    class Meta:
+        model = LayerJob
+        fields = (
+            'id', 'job_type', 'source_layer', 'source_layer_name', 'result_layer',
+            'result_layer_name', 'parameters', 'status', 'progress', 'error',
+            'created_at', 'updated_at', 'completed_at'
+        )
+        read_only_fields = fields
+
 class CBRSLicenseSerializer(serializers.ModelSerializer):
     class Meta:
         model = CBRSLicense
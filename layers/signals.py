@@ -1,9 +1,13 @@
 # layers/signals.py
-from django.db.models.signals import post_save, post_delete
+from django.core.signals import request_started
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .models import ProjectLayerData, ProjectLayer
+from .cbrs import invalidate_cbrs_index
+from .generalization import rebuild_feature_generalization
+from .jobs import fail_orphaned_jobs
+from .models import ProjectLayerData, ProjectLayer, CBRSLicense
 
 
 @receiver(post_save, sender=ProjectLayerData)
@@ -26,4 +30,43 @@ def update_layer_on_feature_delete(sender, instance, **kwargs):
     layer = instance.project_layer
     layer.last_data_update = timezone.now()
     layer.feature_count = layer.features.count()  # Recalculate
-    layer.save(update_fields=['last_data_update', 'feature_count'])
\ No newline at end of file
+    layer.save(update_fields=['last_data_update', 'feature_count'])
+
+
+@receiver(pre_save, sender=ProjectLayerData)
+def note_feature_geometry_change(sender, instance, **kwargs):
+    """Record whether a save changes the feature's geometry, so property-only edits skip the rebuild."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'geometry' not in update_fields:
+        instance._geometry_changed = False
+    elif instance.pk is None:
+        instance._geometry_changed = True
+    else:
+        previous = sender.objects.filter(pk=instance.pk).values_list('geometry', flat=True).first()
+        instance._geometry_changed = previous != instance.geometry
+
+
+@receiver(post_save, sender=ProjectLayerData)
+def rebuild_generalized_geometry_on_feature_save(sender, instance, created, **kwargs):
+    """
+    Keep a feature's zoom-band geometries in step with edits to its geometry.
+
+    Bulk writes (bulk_create, raw SQL) don't send this signal; those paths
+    call build_layer_generalization for the whole layer instead.
+    """
+    if created or getattr(instance, '_geometry_changed', True):
+        rebuild_feature_generalization(instance)
+
+
+@receiver(post_save, sender=CBRSLicense)
+@receiver(post_delete, sender=CBRSLicense)
+def invalidate_cbrs_index_on_change(sender, **kwargs):
+    """Rebuild the in-memory CBRS index after a license is edited (e.g. in the admin)."""
+    invalidate_cbrs_index()
+
+
+@receiver(request_started, dispatch_uid='layers_fail_orphaned_jobs')
+def fail_orphaned_jobs_on_startup(sender, **kwargs):
+    """Once per process, on its first request, fail the jobs a previous process left unfinished."""
+    request_started.disconnect(dispatch_uid='layers_fail_orphaned_jobs')
+    fail_orphaned_jobs()
@@ -1,9 +1,35 @@
 # layers/tests/test_layer_models.py
+import io
+import json
+import math
+import socket
+import zipfile
+from datetime import timedelta
+import geopandas as gpd
+import pyarrow as pa
 import pytest
+import shapely
 from django.contrib.gis.geos import Point, Polygon
-from layers.models import LayerType, ProjectLayerGroup, ProjectLayer, ProjectLayerData
+from django.urls import reverse
+from rest_framework.test import APIClient
+from layers.models import LayerType, ProjectLayerGroup, ProjectLayer, ProjectLayerData, LayerJob, CBRSLicense
+from layers.aggregation import aggregate_points
+from layers.cbrs import get_cbrs_index, state_licenses_json
+from layers.clustering import ClusterIndex, _index_options
+from layers.columnar import layer_columnar_stream
+from layers.file_utils import import_file_to_layer
+from layers.filters import apply_filter, parse_filter
+from layers.formats import layer_data_version
+from layers.generalization import ZOOM_BANDS, zoom_band_for
+from layers.jobs import fail_orphaned_jobs
+from layers.geoprocessing import buffer_layer, spatial_join_counts
+from layers.queries import nearest_features
+from layers.utils import quantize_geometry
 from projects.models import Project
+from users.models import AuditLog
+from styling.models import PopupTemplate
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -116,4 +142,303 @@ class TestLayerModels:
 
         assert feature.id is not None
         assert feature.geometry.equals(polygon)
-        assert feature.bbox is not None  # Should automatically create bounding box
\ No newline at end of file
+        assert feature.bbox is not None  # Should automatically create bounding box
+
+    def test_quantize_geometry(self):
+        """Test coordinates are rounded to the requested precision."""
+        geometry = {
+            'type': 'Polygon',
+            'coordinates': [[[-82.123456789012, 39.987654321098], [-82.1, 40.0], [-82.0, 39.9], [-82.123456789012, 39.987654321098]]]
+        }
+
+        quantized = quantize_geometry(geometry, 6)
+
+        assert quantized['coordinates'][0][0] == [-82.123457, 39.987654]
+        assert geometry['coordinates'][0][0][0] == -82.123456789012  # original untouched
+
+    def test_generalized_geometry_rebuilt_on_save(self, test_layer):
+        """Test detailed polygons get one simplified geometry per zoom band."""
+        ring = [(math.cos(i * math.pi / 50), math.sin(i * math.pi / 50)) for i in range(100)]
+        ring.append(ring[0])
+        feature = ProjectLayerData.objects.create(
+            project_layer=test_layer,
+            geometry=Polygon(ring),
+            properties={'name': 'Circle'}
+        )
+
+        generalized = feature.generalized_geometries.order_by('zoom_band')
+        assert [g.zoom_band for g in generalized] == [band for band, _ in ZOOM_BANDS]
+        assert generalized[0].geometry.num_points < feature.geometry.num_points
+
+        # Property-only edits keep the existing rows instead of rebuilding them
+        ids = sorted(g.id for g in generalized)
+        feature = ProjectLayerData.objects.get(pk=feature.pk)
+        feature.properties = {'name': 'Renamed circle'}
+        feature.save()
+        assert sorted(feature.generalized_geometries.values_list('id', flat=True)) == ids
+
+        assert zoom_band_for(6) == 1
+        assert zoom_band_for(14) is None
+
+    def test_cluster_index_merges_points_at_low_zoom(self):
+        """Test nearby points merge into one cluster at low zoom and split apart at high zoom."""
+        lngs = [-82.0, -82.0001, -82.0002, 10.0]
+        lats = [40.0, 40.0001, 40.0002, 50.0]
+        index = ClusterIndex(lngs, lats, ['a', 'b', 'c', 'd'], max_zoom=16)
+
+        low = index.get_clusters((-180, -85, 180, 85), 2)
+        clusters = [f for f in low if f['properties']['cluster']]
+        assert len(clusters) == 1
+        assert clusters[0]['properties']['point_count'] == 3
+        assert sum(f['properties']['point_count'] for f in low) == 4
+
+        high = index.get_clusters((-83, 39, -81, 41), 17)
+        assert sorted(f['id'] for f in high) == ['a', 'b', 'c']
+
+    def test_cluster_index_bbox_across_antimeridian(self, test_layer):
+        """Test a bbox with west > east covers both sides of the antimeridian, and bad options fall back."""
+        index = ClusterIndex([179.5, -179.5, 0.0], [10.0, 10.0, 10.0], ['east', 'west', 'zero'], max_zoom=16)
+        assert sorted(f['id'] for f in index.get_clusters((179, 0, -179, 20), 17)) == ['east', 'west']
+
+        test_layer.clustering_options = {'radius': 'wide', 'maxZoom': 99, 'minPoints': None}
+        assert _index_options(test_layer) == {
+            'radius': 60, 'extent': 512, 'min_zoom': 0, 'max_zoom': 22, 'min_points': 2,
+        }
+
+    def test_aggregate_points_counts_features_per_cell(self, test_layer):
+        """Test points are binned into grid cells with counts and sums."""
+        for value in (1, 2, 3):
+            ProjectLayerData.objects.create(
+                project_layer=test_layer,
+                geometry=Point(-82.0 + value * 0.0001, 40.0),
+                properties={'population': value}
+            )
+
+        result = aggregate_points(test_layer, (-83, 39, -81, 41), 8, shape='square', sum_field='population')
+
+        assert sum(f['properties']['count'] for f in result['features']) == 3
+        assert sum(f['properties']['sum'] for f in result['features']) == 6
+
+        with pytest.raises(ValueError):
+            aggregate_points(test_layer, (-180, -85, 180, 85), 12)
+
+    def test_buffer_layer_creates_buffered_layer(self, test_layer, admin_user):
+        """Test the buffer job writes one metre-based buffer per feature into a new layer."""
+        ProjectLayerData.objects.create(project_layer=test_layer, geometry=Point(-82.0, 40.0),
+                                        properties={'name': 'Tower A'})
+        ProjectLayerData.objects.create(project_layer=test_layer, geometry=Point(-82.5, 40.0),
+                                        properties={'name': 'Tower B'})
+        job = LayerJob.objects.create(source_layer=test_layer, job_type='buffer',
+                                      parameters={'distance': 1000}, created_by_user=admin_user)
+
+        result = buffer_layer(job)
+
+        assert result.id != test_layer.id
+        assert result.feature_count == 2
+        assert result.upload_status == 'complete'
+        buffered = result.features.get(properties__name='Tower A')
+        assert buffered.geometry.geom_type == 'Polygon'
+        # ~1 km in latitude degrees
+        assert abs(buffered.geometry.extent[3] - 40.0 - 0.009) < 0.001
+
+    def test_fail_orphaned_jobs_only_marks_dead_local_workers(self, test_layer):
+        """Test startup cleanup fails jobs of exited local processes and leaves other hosts alone."""
+        host = socket.gethostname()
+        dead = LayerJob.objects.create(source_layer=test_layer, job_type='buffer', status='running',
+                                       worker=f'{host}:999999999')
+        remote = LayerJob.objects.create(source_layer=test_layer, job_type='buffer', status='running',
+                                         worker='other-host:1')
+        LayerJob.objects.update(created_at=timezone.now() - timedelta(hours=1))
+
+        assert fail_orphaned_jobs() == 1
+        dead.refresh_from_db()
+        remote.refresh_from_db()
+        assert dead.status == 'failed'
+        assert remote.status == 'running'
+
+    def test_import_file_replaces_layer_features(self, test_layer, tmp_path):
+        """Test a zipped shapefile is imported in place and replace mode drops old features."""
+        ProjectLayerData.objects.create(project_layer=test_layer, geometry=Point(0, 0), properties={'old': True})
+
+        gdf = gpd.GeoDataFrame({'name': ['A', 'B']}, geometry=[shapely.Point(-82, 40), shapely.Point(-83, 41)],
+                               crs='EPSG:4326')
+        gdf.to_file(tmp_path / 'towers.shp')
+        archive = tmp_path / 'towers.zip'
+        with zipfile.ZipFile(archive, 'w') as zf:
+            for part in tmp_path.glob('towers.*'):
+                if part != archive:
+                    zf.write(part, f'towers/{part.name}')
+
+        success, count, error = import_file_to_layer(test_layer, str(archive), 'shp', mode='replace')
+
+        assert success, error
+        assert count == 2
+        assert sorted(test_layer.features.values_list('properties__name', flat=True)) == ['A', 'B']
+        test_layer.refresh_from_db()
+        assert test_layer.feature_count == 2
+
+    def test_import_file_in_batches_keeps_target_srid(self, test_layer, tmp_path, monkeypatch):
+        """Test imports read the file in batches and tag geometries with the target CRS."""
+        monkeypatch.setattr('layers.file_utils.IMPORT_BATCH_SIZE', 2)
+        gdf = gpd.GeoDataFrame({'name': ['A', 'B', 'C']},
+                               geometry=[shapely.Point(-82, 40), shapely.Point(-83, 41), shapely.Point(-84, 42)],
+                               crs='EPSG:4326')
+        gdf.to_file(tmp_path / 'sites.shp')
+
+        success, count, error = import_file_to_layer(test_layer, str(tmp_path / 'sites.shp'), 'shp',
+                                                     target_crs='EPSG:3857')
+
+        assert success, error
+        assert count == 3
+        feature = test_layer.features.get(properties__name='A')
+        assert abs(feature.geometry.x + 82) < 1e-6 and abs(feature.geometry.y - 40) < 1e-6
+
+    def test_spatial_join_counts_points_per_polygon(self, test_layer, test_layer_group, test_layer_type):
+        """Test point counts and sums are written into the polygon features' properties."""
+        points = ProjectLayer.objects.create(project_layer_group=test_layer_group, layer_type=test_layer_type,
+                                             name='Locations')
+        for x, units in ((0.5, 2), (0.25, 3), (5, 7)):
+            ProjectLayerData.objects.create(project_layer=points, geometry=Point(x, 0.5), properties={'units': units})
+        ProjectLayerData.objects.create(
+            project_layer=test_layer,
+            geometry=Polygon(((0, 0), (0, 1), (1, 1), (1, 0), (0, 0))),
+            properties={'name': 'Cell'}
+        )
+
+        target, written = spatial_join_counts(test_layer, points, sum_field='units')
+
+        assert target.id == test_layer.id
+        assert written == 1
+        cell = test_layer.features.get()
+        assert cell.properties == {'name': 'Cell', 'point_count': 2, 'units_sum': 5}
+
+    def test_nearest_features_orders_by_metres(self, test_layer):
+        """Test KNN search returns the closest features with geodesic distances."""
+        for name, x in (('near', -82.001), ('middle', -82.01), ('far', -82.5)):
+            ProjectLayerData.objects.create(project_layer=test_layer, geometry=Point(x, 40.0),
+                                            properties={'name': name}, feature_id=name)
+
+        nearest = nearest_features(test_layer, -82.0, 40.0, k=2)
+
+        assert [f['feature_id'] for f in nearest] == ['near', 'middle']
+        assert 80 < nearest[0]['distance'] < 90  # 0.001 degrees of longitude at 40N
+        assert nearest_features(test_layer, -82.0, 40.0, k=3, max_distance=1000)[-1]['feature_id'] == 'middle'
+
+    def test_attribute_filter_matches_properties(self, test_layer):
+        """Test eq/in/range/exists conditions compile to matching JSONB predicates."""
+        towers = [('AT&T', 120), ('Verizon', 80), ('T-Mobile', 200)]
+        for carrier, height in towers:
+            ProjectLayerData.objects.create(project_layer=test_layer, geometry=Point(-82.0, 40.0),
+                                            properties={'carrier': carrier, 'height': height}, feature_id=carrier)
+        ProjectLayerData.objects.create(project_layer=test_layer, geometry=Point(-82.0, 40.0),
+                                        properties={'carrier': 'AT&T'}, feature_id='no-height')
+
+        def matching(expression):
+            features = apply_filter(test_layer.features.all(), parse_filter(expression))
+            return sorted(features.values_list('feature_id', flat=True))
+
+        assert matching('[{"field": "carrier", "op": "eq", "value": "AT&T"}]') == ['AT&T', 'no-height']
+        assert matching('[{"field": "carrier", "op": "in", "value": ["Verizon", "T-Mobile"]}]') == ['T-Mobile', 'Verizon']
+        assert matching('[{"field": "height", "op": "range", "value": [100, null]}]') == ['AT&T', 'T-Mobile']
+        assert matching('[{"field": "height", "op": "exists"}, {"field": "carrier", "op": "eq", "value": "AT&T"}]') == ['AT&T']
+
+        with pytest.raises(ValueError):
+            parse_filter('[{"field": "height", "op": "like", "value": "1%"}]')
+
+    def test_layer_columnar_stream_types_properties(self, test_layer):
+        """Test Arrow output has a WKB geometry column and typed property columns."""
+        ProjectLayerData.objects.create(project_layer=test_layer, geometry=Point(-82.0, 40.0),
+                                        properties={'name': 'a', 'height': 120, 'lit': True}, feature_id='a')
+        ProjectLayerData.objects.create(project_layer=test_layer, geometry=Point(-82.5, 40.5),
+                                        properties={'name': 'b', 'height': 80.5, 'tags': ['x']}, feature_id='b')
+
+        data = b''.join(layer_columnar_stream(test_layer, 'arrow'))
+        table = pa.ipc.open_stream(io.BytesIO(data)).read_all()
+
+        assert table.column_names == ['feature_id', 'geometry', 'height', 'lit', 'name', 'tags']
+        assert table.schema.field('height').type == pa.float64()
+        assert table.schema.field('lit').type == pa.bool_()
+        assert table.column('tags').to_pylist() == [None, '["x"]']
+        assert shapely.from_wkb(table.column('geometry')[1].as_py()).equals(shapely.Point(-82.5, 40.5))
+
+    def test_state_licenses_grouped_by_county_and_invalidated(self):
+        """Test the by_state_abbr payload groups licenses by county and follows edits."""
+        CBRSLicense.objects.create(county_fips='001', county_name='Alpha', state_abbr='VA', channel='1', bidder='A')
+        CBRSLicense.objects.create(county_fips='001', county_name='Alpha', state_abbr='VA', channel='2', bidder='B')
+        CBRSLicense.objects.create(county_fips='003', county_name='Beta', state_abbr='va', channel='1', bidder='C')
+
+        payload = json.loads(state_licenses_json('va'))
+        assert payload['total_counties'] == 2
+        assert payload['total_licenses'] == 3
+        assert [c['county_name'] for c in payload['counties']] == ['Alpha', 'Beta']
+        assert [lic['channel'] for lic in payload['counties'][0]['licenses']] == ['1', '2']
+
+        license = CBRSLicense.objects.get(county_fips='003')
+        license.bidder = 'D'
+        license.save()
+        payload = json.loads(state_licenses_json('VA'))
+        assert payload['counties'][1]['licenses'][0]['bidder'] == 'D'
+
+        assert json.loads(state_licenses_json('TX'))['total_counties'] == 0
+
+    def test_cbrs_index_filters_and_invalidates(self):
+        """Test the in-memory CBRS index answers county and bidder lookups and follows edits."""
+        CBRSLicense.objects.create(county_fips='001', county_name='Alpha', state_abbr='VA', channel='2', bidder='Verizon')
+        CBRSLicense.objects.create(county_fips='001', county_name='Alpha', state_abbr='VA', channel='1', bidder='Dish')
+        CBRSLicense.objects.create(county_fips='005', county_name='Gamma', state_abbr='CA', channel='1', bidder='Verizon Wireless')
+
+        index = get_cbrs_index()
+        assert [l['channel'] for l in index.county('va', '001')] == ['1', '2']
+        assert [l['state_abbr'] for l in index.search(bidder='verizon')] == ['CA', 'VA']
+        assert [l['bidder'] for l in index.search(state_abbr='va', county_name='alp')] == ['Dish', 'Verizon']
+
+        CBRSLicense.objects.filter(bidder='Dish').delete()
+        assert [l['bidder'] for l in get_cbrs_index().county('VA', '001')] == ['Verizon']
+
+    def test_feature_popup_escapes_property_markup(self, test_layer, admin_user):
+        """Test rendered popups escape HTML in feature properties."""
+        test_layer.popup_template = PopupTemplate.objects.create(
+            name='Escaping Template', html_template='<div>{{name}}</div>', created_by_user=admin_user
+        )
+        test_layer.is_public = True
+        test_layer.save()
+        ProjectLayerData.objects.create(project_layer=test_layer, geometry=Point(-82.0, 40.0),
+                                        properties={'name': '<img src=x onerror=alert(1)>'}, feature_id='xss')
+
+        url = reverse('feature-popup', args=[test_layer.id, 'xss'])
+        response = APIClient().get(url, {'render': 'true'})
+
+        assert response.status_code == 200
+        assert response.data['html'] == '<div>&lt;img src=x onerror=alert(1)&gt;</div>'
+        assert response.data['properties']['name'] == '<img src=x onerror=alert(1)>'
+
+    def test_layer_data_bytes_logged_for_every_response(self, test_layer, admin_user):
+        """Test small chunks and streamed formats are audit-logged with their size."""
+        test_layer.is_public = True
+        test_layer.save()
+        ProjectLayerData.objects.create(project_layer=test_layer, geometry=Point(-82.0, 40.0), properties={})
+
+        api = APIClient()
+        chunk = api.get(reverse('layer-data', args=[test_layer.id]))
+        api.force_authenticate(user=admin_user)
+        arrow = api.get(reverse('projectlayer-data', args=[test_layer.id]), {'format': 'arrow'})
+        arrow_bytes = b''.join(arrow.streaming_content)
+
+        logs = AuditLog.objects.filter(action='Layer data accessed').order_by('id')
+        assert [log.action_details['bytes_served'] for log in logs] == [len(chunk.content), len(arrow_bytes)]
+        assert logs[0].action_details['feature_count'] == 1
+
+    def test_flatgeobuf_errors_as_json_and_revalidation(self, test_layer):
+        """Test ?format=fgb errors are JSON and a matching ETag gets 304 without a file."""
+        url = reverse('layer-data', args=[test_layer.id])
+        denied = APIClient().get(url, {'format': 'fgb'})
+        assert denied.status_code == 403
+        assert denied['Content-Type'] == 'application/json'
+        assert json.loads(denied.content) == {'error': 'Access denied'}
+
+        test_layer.is_public = True
+        test_layer.save()
+        etag = f'"{test_layer.id}-{layer_data_version(test_layer)}"'
+        response = APIClient().get(url, {'format': 'fgb'}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response['ETag'] == etag
@@ -3,7 +3,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 from .views import (
-    LayerDataView, ProjectLayerViewSet, FileUploadView, CompleteUploadView, CBRSLicenseViewSet
+    LayerDataView, ProjectLayerViewSet, FileUploadView, CompleteUploadView, CBRSLicenseViewSet,
+    FeaturePopupView, LayerClusterView, LayerAggregateView
 )
 
 router = DefaultRouter()
@@ -12,11 +13,16 @@ router.register(r'layer-groups', views.ProjectLayerGroupViewSet)
 router.register(r'layers', views.ProjectLayerViewSet)
 router.register(r'features', views.ProjectLayerDataViewSet)
 router.register(r'layer-permissions', views.LayerPermissionViewSet)
+router.register(r'layer-jobs', views.LayerJobViewSet)
 router.register(r'cbrs-licenses', views.CBRSLicenseViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
     path('data/<int:layer_id>/', LayerDataView.as_view(), name='layer-data'),
+    path('layers/<int:layer_id>/features/<str:feature_id>/popup/', FeaturePopupView.as_view(),
+         name='feature-popup'),
+    path('clusters/<int:layer_id>/', LayerClusterView.as_view(), name='layer-clusters'),
+    path('aggregate/<int:layer_id>/', LayerAggregateView.as_view(), name='layer-aggregate'),
     path('upload/', FileUploadView.as_view(), name='file-upload'),
     path('complete_upload/', CompleteUploadView.as_view(), name='complete-upload'),
 ]
\ No newline at end of file
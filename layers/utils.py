@@ -1,7 +1,11 @@
 # layers/utils.py
 from django.contrib.gis.geos import GEOSGeometry, Polygon, MultiPolygon
 from django.contrib.gis.gdal import SpatialReference, CoordTransform
+from collections import OrderedDict
+from django.http import FileResponse, HttpResponse
 import json
+import re
+import threading
 import zipfile
 import tempfile
 import os
@@ -30,6 +34,96 @@ def create_feature_collection(features):
     return feature_collection
 
 
+def quantize_coordinates(coordinates, precision):
+    """Round a (nested) GeoJSON coordinate array to the given decimal places."""
+    if isinstance(coordinates, (int, float)):
+        return round(coordinates, precision)
+    return [quantize_coordinates(c, precision) for c in coordinates]
+
+
+def quantize_geometry(geometry, precision):
+    """Return a copy of a GeoJSON geometry dict with rounded coordinates."""
+    quantized = dict(geometry)
+    if 'geometries' in quantized:
+        quantized['geometries'] = [quantize_geometry(g, precision) for g in quantized['geometries']]
+    elif 'coordinates' in quantized:
+        quantized['coordinates'] = quantize_coordinates(quantized['coordinates'], precision)
+    return quantized
+
+
+# Keys in style and label options whose values name a feature property
+_PROPERTY_REFERENCE_KEYS = {'property', 'field', 'attribute', 'value_field', 'valueField', 'label_field', 'labelField'}
+TEMPLATE_PLACEHOLDER_RE = re.compile(r'{{\s*([\w.]+)\s*}}')
+
+
+def strip_property_prefix(name):
+    """Turn 'feature.properties.name' style references into 'name'."""
+    for prefix in ('feature.properties.', 'properties.'):
+        if name.startswith(prefix):
+            return name[len(prefix):]
+    return name
+
+
+def _collect_style_references(value, keys):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in _PROPERTY_REFERENCE_KEYS and isinstance(item, str):
+                keys.append(strip_property_prefix(item))
+            else:
+                _collect_style_references(item, keys)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_style_references(item, keys)
+
+
+def get_referenced_property_keys(layer, include_popup=True):
+    """
+    Return the property keys a layer's popup template, style rules and labels use.
+
+    Popup placeholders without an explicit field mapping are taken to name the
+    property directly.
+    """
+    keys = []
+
+    template = layer.popup_template if include_popup else None
+    if template:
+        mappings = template.field_mappings or {}
+        for placeholder in TEMPLATE_PLACEHOLDER_RE.findall(template.html_template or ''):
+            target = mappings.get(placeholder, placeholder)
+            if isinstance(target, str):
+                keys.append(strip_property_prefix(target))
+        for target in mappings.values():
+            if isinstance(target, str):
+                keys.append(strip_property_prefix(target))
+
+    _collect_style_references(layer.style, keys)
+    if layer.enable_labels:
+        _collect_style_references(layer.label_options, keys)
+
+    return list(dict.fromkeys(keys))
+
+
+MAX_SEARCH_TEXT_LENGTH = 1000
+
+
+def build_search_text(properties, fields=None):
+    """
+    Lower-cased text a feature is found by in trigram search.
+
+    Uses the values of ``fields`` when given, otherwise every property value.
+    Mirrors the SQL in ``layers.search.search_text_sql``.
+    """
+    properties = properties or {}
+    keys = fields or list(properties)
+    values = []
+    for key in keys:
+        value = properties.get(key)
+        if value is None:
+            continue
+        values.append(value if isinstance(value, str) else json.dumps(value))
+    return ' '.join(values).lower()[:MAX_SEARCH_TEXT_LENGTH] or None
+
+
 def reproject_geometry(geometry, from_srid, to_srid=4326):
     """Reproject a geometry from one coordinate system to another."""
     source_srs = SpatialReference(from_srid)
@@ -72,4 +166,123 @@ def extract_shapefile(shapefile_zip):
 
 def cleanup_temp_dir(temp_dir):
     """Clean up temporary directory."""
-    shutil.rmtree(temp_dir)
\ No newline at end of file
+    shutil.rmtree(temp_dir)
+
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def not_modified(request, etag):
+    """A 304 response when If-None-Match lists ``etag`` (weak comparison) or ``*``, otherwise None."""
+    for candidate in request.META.get('HTTP_IF_NONE_MATCH', '').split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/').strip('"') == etag:
+            response = HttpResponse(status=304)
+            response['ETag'] = f'"{etag}"'
+            return response
+    return None
+
+
+def ranged_file_response(request, path, content_type, etag=None):
+    """
+    Serve a file with support for single HTTP byte ranges.
+
+    Returns 304 when If-None-Match matches ``etag``, 206 with the requested
+    slice when a valid Range header is present, 416 when the range cannot be
+    satisfied and the whole file otherwise.
+    """
+    if etag:
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+    size = os.path.getsize(path)
+    range_header = request.META.get('HTTP_RANGE', '').strip()
+    match = _RANGE_RE.match(range_header) if range_header else None
+
+    if match and (match.group(1) or match.group(2)):
+        start, end = match.group(1), match.group(2)
+        if start:
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(end), 0)
+            end = size - 1
+
+        if start >= size or start > end:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start + 1)
+
+        response = HttpResponse(data, status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(size)
+
+    response['Accept-Ranges'] = 'bytes'
+    if etag:
+        response['ETag'] = f'"{etag}"'
+    return response
+
+
+class LRUCache:
+    """
+    Small thread-safe least-recently-used cache for process-local lookups.
+
+    Bounded by entry count, or, when ``weigh`` is given, by the summed
+    ``weigh(value)`` of its entries (e.g. bytes) up to ``maxweight``.
+    """
+
+    def __init__(self, maxsize=1000, maxweight=None, weigh=None):
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self.weigh = weigh
+        self.weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _weigh(self, value):
+        return self.weigh(value) if self.weigh else 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            if key in self._data:
+                self.weight -= self._weigh(self._data[key])
+            self._data[key] = value
+            self.weight += self._weigh(value)
+            self._data.move_to_end(key)
+            while self._data and (
+                len(self._data) > self.maxsize
+                or (self.maxweight is not None and self.weight > self.maxweight)
+            ):
+                _, evicted = self._data.popitem(last=False)
+                self.weight -= self._weigh(evicted)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            value = self._data.pop(key)
+            self.weight -= self._weigh(value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self):
+        return len(self._data)
@@ -1,8 +1,10 @@
 from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.views import APIView
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.conf import settings
 from django.db import transaction
@@ -12,16 +14,94 @@ from django.core.files.storage import default_storage
 import json
 import os
 from users.views import create_audit_log
-from .models import LayerType, ProjectLayerGroup, ProjectLayer, ProjectLayerData, LayerPermission, CBRSLicense
+from .models import (
+    LayerType, ProjectLayerGroup, ProjectLayer, ProjectLayerData, LayerPermission, CBRSLicense, LayerJob
+)
 from .serializers import (
     LayerTypeSerializer, ProjectLayerGroupSerializer, ProjectLayerSerializer,
     SimpleFeatureSerializer, FeatureSerializer, GeoJSONFeatureCollectionSerializer,
-    LayerPermissionSerializer, CBRSLicenseSerializer
+    LayerPermissionSerializer, CBRSLicenseSerializer, LayerJobSerializer
 )
 from .file_utils import (
     get_crs_from_file, get_supported_crs_list, store_uploaded_file,
     detect_file_type, import_file_to_layer
 )
+from .aggregation import DEFAULT_CELL_PIXELS, aggregate_points
+from .cbrs import get_cbrs_index, state_licenses_json
+from .clustering import get_cluster_index
+from .columnar import COLUMNAR_CONTENT_TYPES, layer_columnar_stream
+from .filters import apply_filter, compile_filter, parse_filter
+from .formats import get_layer_flatgeobuf, layer_data_version
+from .generalization import build_layer_generalization, zoom_band_for
+from .geoprocessing import MAX_BUFFER_DISTANCE, buffer_layer, spatial_join_counts
+from .jobs import submit_job
+from .popups import get_feature_popup
+from .queries import MAX_NEAREST, fetch_feature_json, nearest_features, parse_fields, resolve_precision
+from .renderers import LAYER_DATA_RENDERERS
+from .search import build_layer_search_index
+from .utils import not_modified, ranged_file_response
+
+
+def log_layer_data_access(request, response, **details):
+    """
+    Audit-log a layer data response with the number of bytes it sends.
+
+    Rendered responses are measured once rendered and streams without a
+    Content-Length once fully sent. Returns the response.
+    """
+    if response.status_code not in (200, 206):
+        return response
+
+    user = request.user if request.user.is_authenticated else None
+
+    def log(bytes_served):
+        create_audit_log(
+            user=user,
+            action='Layer data accessed',
+            details={**details, 'bytes_served': bytes_served},
+            request=request
+        )
+
+    def counted(chunks):
+        sent = 0
+        for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+        log(sent)
+
+    if response.has_header('Content-Length'):
+        log(int(response['Content-Length']))
+    elif response.streaming:
+        response.streaming_content = counted(response.streaming_content)
+    elif isinstance(response, Response) and not response.is_rendered:
+        response.add_post_render_callback(lambda rendered: log(len(rendered.content)))
+    else:
+        log(len(response.content))
+    return response
+
+
+def flatgeobuf_response(request, layer):
+    """Serve a layer as a FlatGeobuf file with HTTP range support."""
+    etag = f"{layer.id}-{layer_data_version(layer)}"
+    # Revalidations don't need the file, which may not have been built yet
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    response = ranged_file_response(request, get_layer_flatgeobuf(layer), 'application/flatgeobuf', etag=etag)
+    response['Content-Disposition'] = f'inline; filename="layer_{layer.id}.fgb"'
+    return response
+
+
+def columnar_response(layer, output_format):
+    """Stream a layer as an Arrow IPC stream or a Parquet file."""
+    extension = 'arrow' if output_format == 'arrow' else 'parquet'
+    response = StreamingHttpResponse(
+        layer_columnar_stream(layer, output_format),
+        content_type=COLUMNAR_CONTENT_TYPES[output_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="layer_{layer.id}.{extension}"'
+    return response
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -127,11 +207,37 @@ class ProjectLayerViewSet(viewsets.ModelViewSet):
                 request=self.request
             )
 
-    @action(detail=True, methods=['get'])
+    def perform_update(self, serializer):
+        """Rebuild the layer's search text when its search fields change."""
+        previous_search_fields = serializer.instance.search_fields
+        layer = serializer.save()
+        if layer.search_fields != previous_search_fields:
+            build_layer_search_index(layer)
+
+    @action(detail=True, methods=['get'], renderer_classes=LAYER_DATA_RENDERERS)
     def data(self, request, pk=None):
-        """Get layer data in GeoJSON format."""
+        """
+        Get layer data in GeoJSON format, as FlatGeobuf with ?format=fgb, or
+        columnar with ?format=arrow / ?format=parquet (WKB geometry column).
+
+        ?precision rounds the GeoJSON coordinates. Pages requested with ?page
+        list features without geometry, so precision is validated but has no
+        effect on them.
+        """
         layer = self.get_object()
 
+        log_details = {'layer_id': layer.id, 'layer_name': layer.name}
+        output_format = request.query_params.get('format')
+        if output_format == 'fgb':
+            return log_layer_data_access(request, flatgeobuf_response(request, layer), **log_details)
+        if output_format in COLUMNAR_CONTENT_TYPES:
+            return log_layer_data_access(request, columnar_response(layer, output_format), **log_details)
+
+        try:
+            precision = resolve_precision(request.query_params.get('precision'), layer)
+        except ValueError:
+            return Response({'error': 'Invalid precision'}, status=status.HTTP_400_BAD_REQUEST)
+
         # Support pagination parameters
         page = request.query_params.get('page')
         size = request.query_params.get('size', 1000)
@@ -146,18 +252,18 @@ class ProjectLayerViewSet(viewsets.ModelViewSet):
             # Get total count for pagination
             total = layer.features.count()
 
-            return Response({
+            return log_layer_data_access(request, Response({
                 'count': total,
                 'page': int(page),
                 'size': int(size),
                 'pages': (total + int(size) - 1) // int(size),
                 'features': serializer.data
-            })
+            }), page=int(page), feature_count=len(serializer.data), **log_details)
 
         else:
             # Full GeoJSON response
-            serializer = GeoJSONFeatureCollectionSerializer(layer)
-            return Response(serializer.data)
+            serializer = GeoJSONFeatureCollectionSerializer(layer, context={'precision': precision})
+            return log_layer_data_access(request, Response(serializer.data), **log_details)
 
     # In layers/views.py - replace the existing import_geojson method
 
@@ -220,6 +326,8 @@ class ProjectLayerViewSet(viewsets.ModelViewSet):
             # Update layer metadata
             layer.last_data_update = timezone.now()
             layer.update_feature_count()
+            build_layer_generalization(layer)
+            build_layer_search_index(layer)
 
             # Create audit log
             create_audit_log(
@@ -275,57 +383,196 @@ class ProjectLayerViewSet(viewsets.ModelViewSet):
             'features_removed': count
         })
 
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser, FormParser])
     def upload_shapefile(self, request, pk=None):
-        """Import features from a shapefile."""
+        """
+        Import features from a shapefile (zipped or .shp), KML or SQLite upload.
+        Pass mode=replace to swap out the layer's existing features, otherwise they are appended.
+        """
         layer = self.get_object()
 
         if 'file' not in request.FILES:
             return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
 
         shapefile = request.FILES['file']
-
-        # For demo purposes, we'll simulate success
-        # In production, implement actual shapefile processing
+        file_type = detect_file_type(shapefile)
+        if not file_type:
+            return Response({'error': 'Unsupported file type'}, status=status.HTTP_400_BAD_REQUEST)
+
+        mode = request.data.get('mode', 'append')
+        if mode not in ('append', 'replace'):
+            return Response({'error': 'mode must be "append" or "replace"'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Read straight from Django's in-memory or temporary upload file
+        success, feature_count, error = import_file_to_layer(
+            layer, shapefile, file_type,
+            source_crs=request.data.get('source_crs'),
+            target_crs=request.data.get('target_crs', 'EPSG:4326'),
+            mode=mode
+        )
+        if not success:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
 
         # Create audit log
         create_audit_log(
             user=request.user,
             action='Shapefile uploaded',
-            details={'layer_id': layer.id, 'filename': shapefile.name},
+            details={'layer_id': layer.id, 'filename': shapefile.name, 'mode': mode,
+                     'feature_count': feature_count},
             request=request
         )
 
         return Response({
             'message': 'Shapefile uploaded successfully',
-            'simulated': True,
-            'feature_count': 10  # Simulated count
+            'features_imported': feature_count,
+            'total_features': layer.feature_count
         })
 
     @action(detail=True, methods=['post'])
     def buffer(self, request, pk=None):
-        """Create buffer around features."""
+        """
+        Start a background job that buffers the layer's features into a new layer.
+        Poll /api/v1/layer-jobs/<job_id>/ for progress and the resulting layer.
+        """
         layer = self.get_object()
 
         distance = request.data.get('distance')
         if not distance:
             return Response({'error': 'Distance is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # For demo purposes, we'll simulate success
-        # In production, implement actual buffer operation
+        try:
+            distance = float(distance)
+            segments = int(request.data.get('segments', 8))
+        except (TypeError, ValueError):
+            return Response({'error': 'Distance and segments must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not 0 < distance <= MAX_BUFFER_DISTANCE:
+            return Response({'error': f'Distance must be between 0 and {MAX_BUFFER_DISTANCE} metres'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= segments <= 64:
+            return Response({'error': 'Segments must be between 1 and 64'}, status=status.HTTP_400_BAD_REQUEST)
+
+        layer_type_id = request.data.get('layer_type_id') or None
+        if layer_type_id is not None:
+            try:
+                layer_type_id = int(layer_type_id)
+            except (TypeError, ValueError):
+                return Response({'error': 'layer_type_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            if not LayerType.objects.filter(id=layer_type_id).exists():
+                return Response({'error': 'Layer type not found'}, status=status.HTTP_400_BAD_REQUEST)
+
+        dissolve = request.data.get('dissolve', False)
+        if isinstance(dissolve, str):
+            dissolve = dissolve.lower() == 'true'
+
+        with transaction.atomic():
+            job = LayerJob.objects.create(
+                source_layer=layer,
+                job_type='buffer',
+                parameters={
+                    'distance': distance,
+                    'segments': segments,
+                    'dissolve': bool(dissolve),
+                    'name': request.data.get('name'),
+                    'layer_type_id': layer_type_id,
+                },
+                created_by_user=request.user
+            )
+            submit_job(job, buffer_layer)
+
+            # Create audit log
+            create_audit_log(
+                user=request.user,
+                action='Buffer operation',
+                details={'layer_id': layer.id, 'distance': distance, 'job_id': job.id},
+                request=request
+            )
+
+        return Response(LayerJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'])
+    def spatial_join(self, request, pk=None):
+        """
+        Count (and optionally sum a property of) another layer's features inside each polygon.
+        Results go into the polygons' properties, or into a new layer with output=layer.
+        """
+        layer = self.get_object()
+
+        join_layer_id = request.data.get('join_layer_id')
+        if not join_layer_id:
+            return Response({'error': 'join_layer_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            join_layer_id = int(join_layer_id)
+        except (TypeError, ValueError):
+            return Response({'error': 'join_layer_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Look the join layer up through the viewset's queryset so it gets the same scoping as the source
+        join_layer = self.get_queryset().filter(id=join_layer_id).first()
+        if join_layer is None:
+            return Response({'error': 'Join layer not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if join_layer.id == layer.id:
+            return Response({'error': 'A layer cannot be joined with itself'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            target, written = spatial_join_counts(
+                layer, join_layer,
+                count_property=request.data.get('count_property') or 'point_count',
+                sum_field=request.data.get('sum_field'),
+                sum_property=request.data.get('sum_property'),
+                output=request.data.get('output', 'properties'),
+                name=request.data.get('name')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         # Create audit log
         create_audit_log(
             user=request.user,
-            action='Buffer operation',
-            details={'layer_id': layer.id, 'distance': distance},
+            action='Spatial join',
+            details={'layer_id': layer.id, 'join_layer_id': join_layer.id, 'result_layer_id': target.id},
             request=request
         )
 
         return Response({
-            'message': 'Buffer operation completed successfully',
-            'simulated': True,
-            'feature_count': 5  # Simulated count
+            'message': 'Spatial join completed successfully',
+            'layer_id': target.id,
+            'features_updated': written
+        })
+
+    @action(detail=True, methods=['get'])
+    def nearest(self, request, pk=None):
+        """
+        Find the features nearest to a point, with distances in metres.
+        Usage: /api/v1/layers/<id>/nearest/?lng=-82.1&lat=39.9&k=5&max_distance=10000
+        """
+        layer = self.get_object()
+
+        try:
+            lng = float(request.query_params['lng'])
+            lat = float(request.query_params['lat'])
+            k = int(request.query_params.get('k', 1))
+            max_distance = request.query_params.get('max_distance')
+            max_distance = float(max_distance) if max_distance else None
+        except (KeyError, ValueError):
+            return Response({'error': 'lng and lat are required; k and max_distance must be numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if not 1 <= k <= MAX_NEAREST:
+            return Response({'error': f'k must be between 1 and {MAX_NEAREST}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        features = nearest_features(
+            layer, lng, lat, k=k,
+            max_distance=max_distance,
+            with_geometry=request.query_params.get('geometry', 'false').lower() == 'true'
+        )
+
+        return Response({
+            'layer_id': layer.id,
+            'lng': lng,
+            'lat': lat,
+            'features': features
         })
 
     # @action(detail=True, methods=['get'])
@@ -368,12 +615,17 @@ class ProjectLayerDataViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
 
     def get_queryset(self):
-        """Filter by layer."""
+        """Filter by layer and by an optional attribute filter expression."""
         queryset = ProjectLayerData.objects.all()
         layer_id = self.request.query_params.get('layer_id')
         if layer_id:
             queryset = queryset.filter(project_layer_id=layer_id)
-        return queryset
+
+        try:
+            conditions = parse_filter(self.request.query_params.get('filter'))
+        except ValueError as e:
+            raise ValidationError({'error': str(e)})
+        return apply_filter(queryset, conditions)
 
     def get_serializer_class(self):
         """Use the right serializer based on detail level."""
@@ -442,15 +694,38 @@ class LayerPermissionViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+class LayerJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Viewset for polling background geoprocessing jobs."""
+    queryset = LayerJob.objects.all()
+    serializer_class = LayerJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        """Users see their own jobs; admins see all. Filter by layer if specified."""
+        queryset = LayerJob.objects.select_related('source_layer', 'result_layer')
+        user = self.request.user
+        if not (user.is_admin or user.is_staff):
+            queryset = queryset.filter(created_by_user=user)
+
+        layer_id = self.request.query_params.get('layer_id')
+        if layer_id:
+            queryset = queryset.filter(source_layer_id=layer_id)
+
+        return queryset
+
 class LayerDataView(APIView):
     """
     Provides layer data in chunks for frontend consumption.
     """
     permission_classes = [permissions.AllowAny]  # Allow unauthenticated access
+    renderer_classes = LAYER_DATA_RENDERERS
 
     def get(self, request, layer_id):
         """
-        Get layer data in chunks.
+        Get layer data in chunks, or the whole layer as FlatGeobuf with ?format=fgb.
+
+        Optional parameters: precision, zoom, fields=a,b,c,
+        properties=referenced|style and filter (see layers.filters).
         """
         try:
             layer = ProjectLayer.objects.get(id=layer_id)
@@ -459,69 +734,84 @@ class LayerDataView(APIView):
             if not request.user.is_authenticated and not layer.is_public:
                 return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
 
+            if request.query_params.get('format') == 'fgb':
+                return log_layer_data_access(
+                    request, flatgeobuf_response(request, layer), layer_id=layer.id, layer_name=layer.name
+                )
+
             # Get chunk parameters
             chunk_id = request.query_params.get('chunk_id', 1)
             try:
                 chunk_id = int(chunk_id)
+                if chunk_id < 1:
+                    raise ValueError
             except ValueError:
                 return Response({'error': 'Invalid chunk_id'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Determine chunk size based on layer type
             chunk_size = self._get_chunk_size_for_layer(layer)
 
+            try:
+                precision = resolve_precision(request.query_params.get('precision'), layer)
+            except ValueError:
+                return Response({'error': 'Invalid precision'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Low zooms are served from the precomputed generalized geometries
+            zoom = request.query_params.get('zoom')
+            try:
+                zoom_band = zoom_band_for(int(zoom)) if zoom not in (None, '') else None
+            except ValueError:
+                return Response({'error': 'Invalid zoom'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Optional property projection (fields=a,b,c or properties=referenced|style)
+            try:
+                fields = parse_fields(request.query_params, layer)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Optional attribute filter, evaluated against the properties index
+            try:
+                conditions = parse_filter(request.query_params.get('filter'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
             # Calculate offsets
             start_idx = (chunk_id - 1) * chunk_size
-            end_idx = start_idx + chunk_size
-
-            # Get features for this chunk
-            features = layer.features.all()[start_idx:end_idx]
-            feature_count = features.count()
-
-            # Build GeoJSON response
-            feature_collection = {
-                "type": "FeatureCollection",
-                "features": [],
-                "chunk_info": {
-                    "chunk_id": chunk_id,
-                    "features_count": feature_count,
-                    "total_count": layer.features.count()
-                }
+
+            # Features for this chunk, already encoded as GeoJSON by PostGIS
+            features = fetch_feature_json(
+                layer, start_idx, chunk_size,
+                precision=precision, zoom_band=zoom_band, fields=fields,
+                where=compile_filter(conditions) if conditions else None
+            )
+            feature_count = len(features)
+            total_count = apply_filter(layer.features.all(), conditions).count()
+
+            chunk_info = {
+                "chunk_id": chunk_id,
+                "features_count": feature_count,
+                "total_count": total_count
             }
 
             # Add next chunk info if available
-            total_chunks = (layer.features.count() + chunk_size - 1) // chunk_size
+            total_chunks = (total_count + chunk_size - 1) // chunk_size
             if chunk_id < total_chunks:
-                feature_collection["chunk_info"]["next_chunk"] = chunk_id + 1
-
-            # Convert features to GeoJSON
-            for feature in features:
-                geojson_feature = {
-                    "type": "Feature",
-                    "geometry": json.loads(feature.geometry.json),
-                    "properties": feature.properties,
-                }
-
-                if feature.feature_id:
-                    geojson_feature["id"] = feature.feature_id
-
-                feature_collection["features"].append(geojson_feature)
-
-            # Log data access for larger chunks
-            if feature_count > 100:
-                log_user = request.user if request.user.is_authenticated else None
-                create_audit_log(
-                    user=log_user,
-                    action='Layer data accessed',
-                    details={
-                        'layer_id': layer.id,
-                        'layer_name': layer.name,
-                        'chunk_id': chunk_id,
-                        'feature_count': feature_count
-                    },
-                    request=request
-                )
-
-            return Response(feature_collection)
+                chunk_info["next_chunk"] = chunk_id + 1
+
+            # Build GeoJSON response around the pre-encoded features
+            payload = (
+                '{"type": "FeatureCollection", "features": [' + ','.join(features) + '], '
+                '"chunk_info": ' + json.dumps(chunk_info) + '}'
+            ).encode('utf-8')
+
+            return log_layer_data_access(
+                request,
+                HttpResponse(payload, content_type='application/json'),
+                layer_id=layer.id,
+                layer_name=layer.name,
+                chunk_id=chunk_id,
+                feature_count=feature_count
+            )
 
         except ProjectLayer.DoesNotExist:
             return Response({'error': 'Layer not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -543,6 +833,114 @@ class LayerDataView(APIView):
             return 10000  # Large chunks for points
 
 
+class FeaturePopupView(APIView):
+    """
+    Full properties of a single feature, fetched when its popup is opened.
+    """
+    permission_classes = [permissions.AllowAny]  # Allow unauthenticated access
+
+    def get(self, request, layer_id, feature_id):
+        """
+        Get one feature's popup data.
+        Usage: /api/v1/layers/<id>/features/<feature_id>/popup/?render=true
+        """
+        try:
+            layer = ProjectLayer.objects.select_related('popup_template').get(id=layer_id)
+        except ProjectLayer.DoesNotExist:
+            return Response({'error': 'Layer not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Check permissions for non-authenticated users
+        if not request.user.is_authenticated and not layer.is_public:
+            return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        render = request.query_params.get('render', 'false').lower() == 'true'
+        popup = get_feature_popup(layer, feature_id, render=render)
+        if popup is None:
+            return Response({'error': 'Feature not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(popup)
+
+
+class LayerClusterView(APIView):
+    """
+    Server-side point clusters for layers with clustering enabled.
+    """
+    permission_classes = [permissions.AllowAny]  # Allow unauthenticated access
+
+    def get(self, request, layer_id):
+        """
+        Get the clusters and unclustered points in a bounding box at a zoom level.
+        Usage: /api/v1/clusters/<id>/?bbox=west,south,east,north&zoom=8
+        """
+        try:
+            layer = ProjectLayer.objects.get(id=layer_id)
+        except ProjectLayer.DoesNotExist:
+            return Response({'error': 'Layer not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Check permissions for non-authenticated users
+        if not request.user.is_authenticated and not layer.is_public:
+            return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        if not layer.enable_clustering:
+            return Response({'error': 'Clustering is not enabled for this layer'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            zoom = int(request.query_params.get('zoom', 0))
+            bbox = [float(value) for value in request.query_params.get('bbox', '-180,-85,180,85').split(',')]
+            if len(bbox) != 4:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'bbox must be west,south,east,north and zoom an integer'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        index = get_cluster_index(layer)
+        return Response({
+            'type': 'FeatureCollection',
+            'features': index.get_clusters(bbox, zoom),
+            'zoom': zoom,
+            'point_count': index.point_count,
+        })
+
+
+class LayerAggregateView(APIView):
+    """
+    Hexagon or square grid counts over a layer, for density maps.
+    """
+    permission_classes = [permissions.AllowAny]  # Allow unauthenticated access
+
+    def get(self, request, layer_id):
+        """
+        Get per-cell feature counts (and optionally sums of a numeric property) for a bbox.
+        Usage: /api/v1/aggregate/<id>/?bbox=west,south,east,north&zoom=8&shape=hex&sum=population
+        """
+        try:
+            layer = ProjectLayer.objects.get(id=layer_id)
+        except ProjectLayer.DoesNotExist:
+            return Response({'error': 'Layer not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Check permissions for non-authenticated users
+        if not request.user.is_authenticated and not layer.is_public:
+            return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            zoom = int(request.query_params.get('zoom', 0))
+            cell_pixels = int(request.query_params.get('cell_size', DEFAULT_CELL_PIXELS))
+            bbox = [float(value) for value in request.query_params.get('bbox', '-180,-85,180,85').split(',')]
+            if len(bbox) != 4 or cell_pixels < 4:
+                raise ValueError('bbox must be west,south,east,north and cell_size at least 4')
+            result = aggregate_points(
+                layer, bbox, zoom,
+                shape=request.query_params.get('shape', 'hex'),
+                cell_pixels=cell_pixels,
+                sum_field=request.query_params.get('sum')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result)
+
+
 
 
 ## file upload complete upload functions below
@@ -778,6 +1176,17 @@ class CBRSLicenseViewSet(viewsets.ReadOnlyModelViewSet):
 
         return queryset.order_by('state_abbr', 'county_name', 'channel')
 
+    def list(self, request, *args, **kwargs):
+        """List licenses from the in-memory index, with the same filters as get_queryset."""
+        params = request.query_params
+        licenses = get_cbrs_index().search(
+            state_abbr=params.get('state_abbr'),
+            county_fips=params.get('county_fips'),
+            county_name=params.get('county_name'),
+            bidder=params.get('bidder'),
+        )
+        return Response(licenses)
+
     @action(detail=False, methods=['get'])
     def by_county(self, request):
         """
@@ -793,21 +1202,16 @@ class CBRSLicenseViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        licenses = CBRSLicense.objects.filter(
-            state_abbr__iexact=state_abbr,
-            county_fips=county_fips
-        ).order_by('channel')
-
-        serializer = CBRSLicenseSerializer(licenses, many=True)
+        licenses = get_cbrs_index().county(state_abbr, county_fips)
 
         # Group by county for response
-        if licenses.exists():
+        if licenses:
             county_info = {
                 'county_fips': county_fips,
                 'state_abbr': state_abbr.upper(),
-                'county_name': licenses.first().county_name,
-                'license_count': licenses.count(),
-                'licenses': serializer.data
+                'county_name': licenses[0]['county_name'],
+                'license_count': len(licenses),
+                'licenses': list(licenses)
             }
             return Response(county_info)
         else:
@@ -832,43 +1236,8 @@ class CBRSLicenseViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Convert to uppercase to handle case variations
-        state_abbr = state_abbr.upper()
-
-        licenses = CBRSLicense.objects.filter(
-            state_abbr__iexact=state_abbr
-        ).order_by('county_name', 'channel')
-
-        if not licenses.exists():
-            return Response({
-                'state_abbr': state_abbr,
-                'counties': [],
-                'total_counties': 0,
-                'total_licenses': 0,
-                'message': f'No CBRS licenses found for state {state_abbr}'
-            })
-
-        # Group by county
-        counties = {}
-        for license in licenses:
-            county_key = license.county_fips
-            if county_key not in counties:
-                counties[county_key] = {
-                    'county_fips': license.county_fips,
-                    'county_name': license.county_name,
-                    'state_abbr': license.state_abbr,
-                    'licenses': [],
-                    'license_count': 0
-                }
-            counties[county_key]['licenses'].append(CBRSLicenseSerializer(license).data)
-            counties[county_key]['license_count'] += 1
-
-        return Response({
-            'state_abbr': state_abbr,
-            'total_counties': len(counties),
-            'total_licenses': licenses.count(),
-            'counties': list(counties.values())
-        })
+        # Grouped and encoded in one query, cached until the licenses change
+        return HttpResponse(state_licenses_json(state_abbr), content_type='application/json')
 
     @action(detail=False, methods=['get'])
     def by_state(self, request):
@@ -4,6 +4,8 @@ from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.test import APIClient
+from django.contrib.gis.geos import Point
+from layers.models import LayerType, ProjectLayerGroup, ProjectLayer, ProjectLayerData
 from projects.models import Project
 from clients.models import Client, ClientProject
 
@@ -218,4 +220,49 @@ class TestProjectAPI:
 
         # Should contain the client
         client_names = [client['name'] for client in response.data]
-        assert test_client.name in client_names
\ No newline at end of file
+        assert test_client.name in client_names
+
+    def test_identify_returns_features_under_point(self, api_client, admin_user, test_project):
+        """Test identify finds features of visible layers within the click tolerance."""
+        group = ProjectLayerGroup.objects.create(project=test_project, name='Infrastructure')
+        layer_type = LayerType.objects.create(type_name='Point')
+        towers = ProjectLayer.objects.create(project_layer_group=group, layer_type=layer_type, name='Towers')
+        hidden = ProjectLayer.objects.create(project_layer_group=group, layer_type=layer_type, name='Hidden',
+                                             is_visible_by_default=False)
+        ProjectLayerData.objects.create(project_layer=towers, geometry=Point(-118.2437, 34.0522),
+                                        properties={'name': 'Tower 1'}, feature_id='t1')
+        ProjectLayerData.objects.create(project_layer=towers, geometry=Point(-118.0, 34.0),
+                                        properties={'name': 'Far Tower'}, feature_id='t2')
+        ProjectLayerData.objects.create(project_layer=hidden, geometry=Point(-118.2437, 34.0522),
+                                        properties={'name': 'Hidden'}, feature_id='h1')
+
+        api_client.force_authenticate(user=admin_user)
+        url = reverse('project-identify', args=[test_project.id])
+        response = api_client.get(url, {'lng': -118.2438, 'lat': 34.0522, 'zoom': 14})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [f['feature_id'] for f in response.data['features']] == ['t1']
+        assert response.data['features'][0]['layer_name'] == 'Towers'
+        assert response.data['features'][0]['distance'] < 20
+
+    def test_search_ranks_features_across_layers(self, api_client, admin_user, test_project):
+        """Test project search finds features by property text and returns centroids."""
+        group = ProjectLayerGroup.objects.create(project=test_project, name='Infrastructure')
+        layer_type = LayerType.objects.create(type_name='Point')
+        towers = ProjectLayer.objects.create(project_layer_group=group, layer_type=layer_type, name='Towers',
+                                             search_fields=['carrier', 'site_name'])
+        ProjectLayerData.objects.create(project_layer=towers, geometry=Point(-118.2, 34.1),
+                                        properties={'carrier': 'Verizon', 'site_name': 'Hilltop'}, feature_id='t1')
+        ProjectLayerData.objects.create(project_layer=towers, geometry=Point(-118.3, 34.2),
+                                        properties={'carrier': 'AT&T', 'site_name': 'Downtown'}, feature_id='t2')
+
+        api_client.force_authenticate(user=admin_user)
+        url = reverse('project-search', args=[test_project.id])
+        response = api_client.get(url, {'q': 'verizon'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [r['feature_id'] for r in response.data['results']] == ['t1']
+        assert response.data['results'][0]['centroid'] == [-118.2, 34.1]
+
+        response = api_client.get(url, {'q': 'v'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -10,6 +10,9 @@ from django.db import transaction
 from django.db.models import Q
 
 from layers.models import ProjectLayer, ProjectLayerGroup
+from layers.queries import degrees_per_pixel, identify_features
+from layers.search import MAX_RESULTS, search_features
+from layers.views import log_layer_data_access
 from .models import Project
 from .serializers import ProjectSerializer, ProjectCreateUpdateSerializer
 from users.views import create_audit_log
@@ -200,7 +203,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
                         enable_clustering=layer.enable_clustering,
                         clustering_options=layer.clustering_options,
                         enable_labels=layer.enable_labels,
-                        label_options=layer.label_options
+                        label_options=layer.label_options,
+                        coordinate_precision=layer.coordinate_precision,
+                        search_fields=layer.search_fields
                     )
 
             create_audit_log(
@@ -253,6 +258,97 @@ class ProjectViewSet(viewsets.ModelViewSet):
             'created_by': project.created_by_user.username if project.created_by_user else None
         })
 
+    @action(detail=True, methods=['get'])
+    def identify(self, request, pk=None):
+        """
+        Return the features of the project's visible layers under a clicked point.
+        Usage: /api/v1/projects/<id>/identify/?lng=-82.1&lat=39.9&zoom=12&tolerance=5
+        Pass layer_ids=1,2,3 to identify against the layers currently shown instead of the defaults.
+        """
+        project = self.get_object()
+
+        try:
+            lng = float(request.query_params['lng'])
+            lat = float(request.query_params['lat'])
+            zoom = int(request.query_params.get('zoom', 12))
+            tolerance_px = float(request.query_params.get('tolerance', 5))
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 100))
+        except (KeyError, ValueError):
+            return Response({'error': 'lng and lat are required; zoom, tolerance and limit must be numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        layers = ProjectLayer.objects.filter(project_layer_group__project=project)
+        layer_ids = request.query_params.get('layer_ids')
+        if layer_ids:
+            try:
+                layers = layers.filter(id__in=[int(value) for value in layer_ids.split(',') if value])
+            except ValueError:
+                return Response({'error': 'layer_ids must be a comma-separated list of integers'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        else:
+            layers = layers.filter(
+                is_visible_by_default=True,
+                project_layer_group__is_visible_by_default=True,
+                min_zoom_visibility__lte=zoom,
+                max_zoom_visibility__gte=zoom
+            )
+        layers = list(layers.order_by('-z_index'))
+
+        with_geometry = request.query_params.get('geometry', 'false').lower() == 'true'
+        hits = identify_features(
+            layers, lng, lat,
+            tolerance=degrees_per_pixel(zoom) * tolerance_px,
+            limit_per_layer=limit,
+            with_geometry=with_geometry
+        )
+
+        # Topmost layer first, closest feature first within a layer
+        layer_order = {layer.id: index for index, layer in enumerate(layers)}
+        layer_names = {layer.id: layer.name for layer in layers}
+        hits.sort(key=lambda hit: (layer_order[hit['layer_id']], hit['distance']))
+        for hit in hits:
+            hit['layer_name'] = layer_names[hit['layer_id']]
+
+        return log_layer_data_access(request, Response({
+            'lng': lng,
+            'lat': lat,
+            'zoom': zoom,
+            'layers_searched': len(layers),
+            'features': hits
+        }), project_id=project.id, layer_ids=[layer.id for layer in layers], feature_count=len(hits))
+
+    @action(detail=True, methods=['get'])
+    def search(self, request, pk=None):
+        """
+        Search the features of the project's layers by their property text.
+        Usage: /api/v1/projects/<id>/search/?q=verizon&limit=20&layer_ids=1,2
+        """
+        project = self.get_object()
+
+        layers = ProjectLayer.objects.filter(project_layer_group__project=project)
+        layer_ids = request.query_params.get('layer_ids')
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), MAX_RESULTS))
+            if layer_ids:
+                layers = layers.filter(id__in=[int(value) for value in layer_ids.split(',') if value])
+        except ValueError:
+            return Response({'error': 'limit and layer_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        layers = list(layers)
+        try:
+            results = search_features(layers, request.query_params.get('q', ''), limit=limit)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        layer_names = {layer.id: layer.name for layer in layers}
+        for result in results:
+            result['layer_name'] = layer_names[result['layer_id']]
+
+        return log_layer_data_access(request, Response({
+            'query': request.query_params.get('q'),
+            'results': results
+        }), project_id=project.id, layer_ids=[layer.id for layer in layers], feature_count=len(results))
+
 
 class ProjectConstructorView(APIView):
     """
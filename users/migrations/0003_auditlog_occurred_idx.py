@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_client'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['occurred_at'], name='audit_log_occurred_idx'),
+        ),
+    ]
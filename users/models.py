@@ -84,6 +84,9 @@ class AuditLog(models.Model):
         verbose_name = 'Audit Log'
         verbose_name_plural = 'Audit Logs'
         ordering = ['-occurred_at']
+        indexes = [
+            models.Index(fields=['occurred_at'], name='audit_log_occurred_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username if self.user else 'Unknown'} - {self.action} - {self.occurred_at}"
\ No newline at end of file